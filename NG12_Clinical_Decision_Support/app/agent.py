@@ -1,15 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
-from typing import Any, Dict, List
-
-import vertexai
-from vertexai.generative_models import GenerativeModel, GenerationConfig
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+from .canonical import generation_key, normalize_text
+from .citations import active_index
+from .clients import get_pool
 from .config import settings
+from .context import context_tokens, pack_context
+from .deadline import DeadlineExceeded, remaining, with_timeout
+from .health import mark_ok
 from .models import AgentOutput
+from .metrics import RETRIES, stage
 from .security import is_prompt_injection
-from .resilience import CircuitBreaker, RetryPolicy, ResponseCache
+from .tracing import span
+from .resilience import CircuitOpenError, RetryPolicy, ResponseCache, SingleFlight, breaker_for
 
 
 DISCLAIMER = "This tool supports clinical decision-making and does not provide diagnoses."
@@ -24,20 +32,22 @@ Rules:
 - ALL clinical statements must be supported by citations from the NG12 context.
 - Output must be valid JSON with keys: assessment, reasoning, citations, confidence.
 - citations must include source, page, chunk_id, excerpt.
+- A context block may list several comma-separated chunk ids; cite one of them.
 """.strip()
 
-_breaker = CircuitBreaker(
-    failure_threshold=settings.breaker_threshold,
-    reset_after_s=settings.breaker_reset_s,
-)
+_breaker = breaker_for("generation")
 _retry = RetryPolicy(
     max_attempts=settings.retry_max_attempts,
     backoff_s=settings.retry_backoff_s,
+    max_backoff_s=settings.retry_max_backoff_s,
+    min_attempt_s=settings.retry_min_attempt_s,
 )
 _cache = ResponseCache(
     max_items=settings.cache_max_items,
     ttl_s=settings.cache_ttl_s,
+    max_bytes=settings.cache_max_bytes,
 )
+_inflight = SingleFlight()
 
 
 def _format_context(chunks: List[Dict[str, Any]]) -> str:
@@ -69,39 +79,74 @@ def _validate_output(output: AgentOutput, chunks: List[Dict[str, Any]]) -> Agent
     if output.assessment != "Insufficient Evidence" and not output.citations:
         return _base_failure()
 
-    by_chunk = {c.get("metadata", {}).get("chunk_id"): c.get("text", "") for c in chunks}
+    # Merged context blocks answer for every chunk id they contain.
+    by_chunk: Dict[str, Dict[str, Any]] = {}
+    for c in chunks:
+        meta = c.get("metadata", {})
+        for chunk_id in [meta.get("chunk_id"), *meta.get("chunk_ids", [])]:
+            by_chunk[chunk_id] = c
+
+    index = active_index()
+    resolved = []
     for c in output.citations:
-        source_text = by_chunk.get(c.chunk_id, "")
-        if not source_text or c.excerpt not in source_text:
+        block = by_chunk.get(c.chunk_id)
+        found = index.resolve(block, c.chunk_id, c.excerpt) if block is not None else None
+        if found is None:
             return _base_failure()
-    return output
+        chunk_id, start, end = found
+        resolved.append(c.model_copy(update={"chunk_id": chunk_id, "start": start, "end": end}))
+    return output.model_copy(update={"citations": resolved})
 
 
-def generate_assessment(question: str, chunks: List[Dict[str, Any]]) -> tuple[AgentOutput, Dict[str, str]]:
-    meta: Dict[str, str] = {}
+def _cache_keys(question: str, chunks: List[Dict[str, Any]], cache_key: str | None) -> Tuple[str, str]:
+    # Degraded paths have no chunks to key on, so successes are also stored
+    # under the bare canonical question as a fallback.
+    fallback_key = cache_key or normalize_text(question)
+    return generation_key(fallback_key, chunks), fallback_key
+
+
+def _cached_fallback(fallback_key: str, meta: Dict[str, str]) -> AgentOutput:
+    cached = _cache.get(fallback_key)
+    if cached:
+        meta["cache"] = "hit"
+        return cached
+    return _base_failure()
+
+
+def _early_result(
+    question: str, chunks: List[Dict[str, Any]], keys: Tuple[str, str], meta: Dict[str, str]
+) -> Optional[AgentOutput]:
+    key, fallback_key = keys
     if is_prompt_injection(question):
         meta["reason"] = "prompt_injection"
-        return _base_failure(), meta
+        return _base_failure()
     if not chunks:
         meta["reason"] = "no_chunks"
-        cached = _cache.get(question)
-        if cached:
-            meta["cache"] = "hit"
-            return cached, meta
-        return _base_failure(), meta
+        return _cached_fallback(fallback_key, meta)
+
+    cached = _cache.get(key)
+    if cached:
+        # Same canonical question over the same chunks: an equivalent answer, not a fallback.
+        meta["cache"] = "reused"
+        return cached
 
     if _breaker.is_open():
         meta["reason"] = "breaker_open"
-        cached = _cache.get(question)
-        if cached:
-            meta["cache"] = "hit"
-            return cached, meta
-        return _base_failure(), meta
+        return _cached_fallback(fallback_key, meta)
+    return None
+
+
+def generation_stats() -> Dict[str, Dict[str, int]]:
+    return {"response_cache": _cache.stats(), "singleflight": _inflight.stats()}
+
+
+def clear_response_cache() -> None:
+    _cache.clear()
 
-    vertexai.init(project=settings.project_id, location=settings.location)
-    context = _format_context(chunks)
 
-    prompt = f"""
+def _build_prompt(question: str, chunks: List[Dict[str, Any]]) -> str:
+    context = _format_context(chunks)
+    return f"""
 {SYSTEM_PROMPT}
 
 NG12 context:
@@ -113,52 +158,220 @@ Question:
 Return JSON only.
 """.strip()
 
-    try:
-        response_text = _generate_with_retries(prompt)
+
+def _prepare(question: str, chunks: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+    with span("prompt_build", chunks=len(chunks)) as current:
+        context = pack_context(chunks, settings.context_token_budget)
+        prompt = _build_prompt(question, context)
+        if current is not None:
+            current.attributes.update(blocks=len(context), context_tokens=context_tokens(context))
+    return prompt, context
+
+
+def _finish(response_text: str, chunks: List[Dict[str, Any]], keys: Tuple[str, str]) -> AgentOutput:
+    with stage("parse"):
         output = _parse_output(response_text)
+    with stage("validate"):
         output = _validate_output(output, chunks)
-        if output.citations:
-            _cache.set(question, output)
-        _breaker.record_success()
-        return output, meta
+    if output.citations:
+        for key in keys:
+            _cache.set(key, output)
+    return output
+
+
+async def generate_assessment(
+    question: str, chunks: List[Dict[str, Any]], cache_key: str | None = None
+) -> tuple[AgentOutput, Dict[str, str]]:
+    meta: Dict[str, str] = {}
+    keys = _cache_keys(question, chunks, cache_key)
+    early = _early_result(question, chunks, keys, meta)
+    if early is not None:
+        return early, meta
+
+    prompt, context = _prepare(question, chunks)
+
+    async def _run() -> AgentOutput:
+        return _finish(await _generate_with_retries(prompt), context, keys)
+
+    try:
+        # Concurrent misses with the same prompt share one Gemini call. The cache
+        # key is not enough: callers may key different prompts alike.
+        return await _inflight.do(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), _run), meta
+    except CircuitOpenError:
+        # Half-open with every probe slot taken by other requests.
+        meta["reason"] = "breaker_open"
+        return _cached_fallback(keys[1], meta), meta
+    except DeadlineExceeded:
+        meta["reason"] = "deadline_exceeded"
+        return _cached_fallback(keys[1], meta), meta
     except Exception:
         meta["reason"] = "generation_failed"
-        cached = _cache.get(question)
-        if cached:
-            meta["cache"] = "hit"
-            return cached, meta
-        return _base_failure(), meta
-
-
-def _generate_with_retries(prompt: str) -> str:
-    attempt = 0
-    last_err: Exception | None = None
-    while attempt < _retry.max_attempts:
-        attempt += 1
+        return _cached_fallback(keys[1], meta), meta
+
+
+# Incrementally decodes the "reasoning" string value from a partial JSON answer.
+class ReasoningExtractor:
+    _START = re.compile(r'"reasoning"\s*:\s*"')
+    _ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._pos: Optional[int] = None
+        self._done = False
+
+    def feed(self, text: str) -> str:
+        self._buf += text
+        if self._done:
+            return ""
+        if self._pos is None:
+            match = self._START.search(self._buf)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        out: List[str] = []
+        buf, i = self._buf, self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if ch == "\\":
+                if i + 1 >= len(buf):
+                    break
+                esc = buf[i + 1]
+                if esc == "u":
+                    if i + 6 > len(buf):
+                        break
+                    out.append(chr(int(buf[i + 2:i + 6], 16)))
+                    i += 6
+                    continue
+                out.append(self._ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            if ch == '"':
+                self._done = True
+                i += 1
+                break
+            out.append(ch)
+            i += 1
+        self._pos = i
+        return "".join(out)
+
+
+async def stream_assessment(
+    question: str, chunks: List[Dict[str, Any]], cache_key: str | None = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    # Yields ("token", text) reasoning deltas, then ("final", (output, meta)).
+    meta: Dict[str, str] = {}
+    keys = _cache_keys(question, chunks, cache_key)
+    early = _early_result(question, chunks, keys, meta)
+    if early is not None:
+        yield "final", (early, meta)
+        return
+
+    prompt, context = _prepare(question, chunks)
+    extractor = ReasoningExtractor()
+    parts: List[str] = []
+
+    if not _breaker.allow():
+        meta["reason"] = "breaker_open"
+        yield "final", (_cached_fallback(keys[1], meta), meta)
+        return
+
+    try:
         try:
-            response = _call_gemini(prompt)
-            return response
-        except Exception as exc:
-            last_err = exc
+            # Includes time the client spends consuming tokens between chunks.
+            with stage("generate_stream"):
+                async for text in _stream_gemini(prompt):
+                    parts.append(text)
+                    delta = extractor.feed(text)
+                    if delta:
+                        yield "token", delta
+        except DeadlineExceeded:
+            _breaker.release()
+            raise
+        except Exception:
             _breaker.record_failure()
-            if attempt < _retry.max_attempts:
-                import time
-                time.sleep(_retry.backoff_s)
-    if last_err:
-        raise last_err
-    raise RuntimeError("Unknown generation failure")
-
-
-def _call_gemini(prompt: str) -> str:
-    model = GenerativeModel(settings.gemini_model)
-    response = model.generate_content(
-        prompt,
-        generation_config=GenerationConfig(
-            temperature=0.0,
-            top_p=0.0,
-            top_k=1,
-            max_output_tokens=512,
-        ),
-        request_options={"timeout": settings.request_timeout_s},
+            raise
+        _breaker.record_success()
+        mark_ok("generation")
+        output = _finish("".join(parts), context, keys)
+    except DeadlineExceeded:
+        meta["reason"] = "deadline_exceeded"
+        output = _cached_fallback(keys[1], meta)
+    except Exception:
+        meta["reason"] = "generation_failed"
+        output = _cached_fallback(keys[1], meta)
+    yield "final", (output, meta)
+
+
+async def _generate_with_retries(prompt: str) -> str:
+    with span("generation", model=settings.gemini_model) as current:
+        attempt = 0
+        last_err: Exception | None = None
+        while attempt < _retry.max_attempts:
+            attempt += 1
+            if current is not None:
+                current.attributes["attempts"] = attempt
+            if not _breaker.allow():
+                # Opened by earlier attempts or other requests; stop retrying.
+                raise last_err or CircuitOpenError(_breaker.name)
+            try:
+                with stage("generate", attempt=attempt):
+                    response = await _call_gemini(prompt)
+                _breaker.record_success()
+                mark_ok("generation")
+                return response
+            except DeadlineExceeded:
+                _breaker.release()
+                raise
+            except Exception as exc:
+                last_err = exc
+                _breaker.record_failure()
+                if attempt < _retry.max_attempts:
+                    delay = _retry.next_delay(attempt, remaining())
+                    if delay is None:
+                        # Not enough request budget left for another attempt.
+                        break
+                    RETRIES.inc(operation="generation")
+                    await asyncio.sleep(delay)
+        if last_err:
+            raise last_err
+        raise RuntimeError("Unknown generation failure")
+
+
+def _generation_config() -> Any:
+    from vertexai.generative_models import GenerationConfig
+
+    return GenerationConfig(
+        temperature=0.0,
+        top_p=0.0,
+        top_k=1,
+        max_output_tokens=512,
+    )
+
+
+def _model():
+    return get_pool(settings.project_id, settings.location).generative_model(settings.gemini_model)
+
+
+async def _call_gemini(prompt: str) -> str:
+    model = _model()
+    response = await with_timeout(
+        model.generate_content_async(prompt, generation_config=_generation_config()),
+        settings.request_timeout_s,
     )
     return response.text
+
+
+async def _stream_gemini(prompt: str) -> AsyncIterator[str]:
+    model = _model()
+    responses = await with_timeout(
+        model.generate_content_async(prompt, generation_config=_generation_config(), stream=True),
+        settings.request_timeout_s,
+    )
+    iterator = responses.__aiter__()
+    while True:
+        try:
+            response = await with_timeout(iterator.__anext__(), settings.request_timeout_s)
+        except StopAsyncIteration:
+            return
+        yield response.text
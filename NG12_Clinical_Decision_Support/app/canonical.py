@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import hashlib
+import unicodedata
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def symptom_set(symptoms: Iterable[str] | str) -> Tuple[str, ...]:
+    if isinstance(symptoms, str):
+        symptoms = [symptoms]
+    return tuple(sorted({normalize_text(str(s)) for s in symptoms} - {""}))
+
+
+def assess_question(symptoms: Iterable[str]) -> str:
+    return f"Assess NG12 risk for symptoms: {', '.join(symptoms)}"
+
+
+def standalone_question(question: str) -> str:
+    return normalize_text(question).rstrip("?.! ")
+
+
+def conversation_key(question: str, history: str = "") -> str:
+    # A follow-up ("what about under 40?") only means something together with
+    # the conversation before it, so history is part of its key.
+    key = standalone_question(question)
+    if not history:
+        return key
+    return f"{key}\x1fhistory:{hashlib.sha256(history.encode('utf-8')).hexdigest()}"
+
+
+def chunk_ids(chunks: List[Dict[str, Any]]) -> List[str]:
+    return sorted(str(c.get("metadata", {}).get("chunk_id", "")) for c in chunks)
+
+
+def generation_key(question_key: str, chunks: List[Dict[str, Any]]) -> str:
+    payload = "\x1f".join([question_key, *chunk_ids(chunks)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Unicode hyphens, dashes and minus sign, then curly quotes.
+_FOLD = str.maketrans(
+    {
+        **dict.fromkeys(["\u2010", "\u2011", "\u2012", "\u2013", "\u2014", "\u2212"], "-"),
+        "\u2018": "'",
+        "\u2019": "'",
+        "\u201c": '"',
+        "\u201d": '"',
+    }
+)
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    # Case, accents, dash and quote variants and whitespace runs are folded;
+    # a hyphen before a line break ("inves-\ntigation") joins the word halves.
+    # offsets[i] is the index in text of normalized character i.
+    out: List[str] = []
+    offsets: List[int] = []
+    pending_space = False
+    for i, ch in enumerate(text):
+        if ch.isspace():
+            pending_space = bool(out)
+            continue
+        folded = [
+            c for c in unicodedata.normalize("NFKD", ch).casefold().translate(_FOLD) if not unicodedata.combining(c)
+        ]
+        if not folded:
+            continue
+        if pending_space:
+            if len(out) >= 2 and out[-1] == "-" and out[-2].isalpha() and folded[0].isalpha():
+                out.pop()
+                offsets.pop()
+            else:
+                out.append(" ")
+                offsets.append(i - 1)
+            pending_space = False
+        for c in folded:
+            out.append(c)
+            offsets.append(i)
+    return "".join(out), offsets
+
+
+def drop_word_hyphens(text: str, offsets: Sequence[int]) -> Tuple[str, List[int]]:
+    # Removes hyphens between letters. Extraction can turn "gender-related"
+    # into "gender- related" (rejoined as "genderrelated") or the reverse, so
+    # the fallback match treats such a hyphen as optional on both sides.
+    out: List[str] = []
+    kept: List[int] = []
+    for i, ch in enumerate(text):
+        if ch == "-" and 0 < i < len(text) - 1 and text[i - 1].isalpha() and text[i + 1].isalpha():
+            continue
+        out.append(ch)
+        kept.append(offsets[i])
+    return "".join(out), kept
+
+
+@dataclass
+class IndexedChunk:
+    text: str
+    normalized: str
+    offsets: List[int]
+    unhyphenated: str
+    unhyphenated_offsets: List[int]
+
+    @classmethod
+    def of(cls, text: str) -> "IndexedChunk":
+        normalized, offsets = normalize_with_offsets(text)
+        unhyphenated, unhyphenated_offsets = (
+            drop_word_hyphens(normalized, offsets) if "-" in normalized else (normalized, offsets)
+        )
+        return cls(text, normalized, offsets, unhyphenated, unhyphenated_offsets)
+
+    def find(self, needle: str) -> Optional[Tuple[int, int]]:
+        pos = self.normalized.find(needle)
+        if pos >= 0:
+            return self.offsets[pos], self.offsets[pos + len(needle) - 1] + 1
+        needle, _ = drop_word_hyphens(needle, range(len(needle)))
+        pos = self.unhyphenated.find(needle)
+        if pos < 0:
+            return None
+        return self.unhyphenated_offsets[pos], self.unhyphenated_offsets[pos + len(needle) - 1] + 1
+
+
+class CitationIndex:
+    # Normalized text and offsets per chunk, built once per collection version.
+
+    def __init__(self, chunks: Optional[Dict[str, IndexedChunk]] = None, version: str = "") -> None:
+        self._chunks = chunks or {}
+        self.version = version
+
+    @classmethod
+    def build(cls, ids: Sequence[str], documents: Sequence[Optional[str]], version: str = "") -> "CitationIndex":
+        return cls({cid: IndexedChunk.of(doc) for cid, doc in zip(ids, documents) if doc is not None}, version)
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def chunk(self, chunk_id: str, text: str) -> IndexedChunk:
+        entry = self._chunks.get(chunk_id)
+        if entry is not None and entry.text == text:
+            return entry
+        # Not from the indexed collection (tests, stale ids): normalize on demand.
+        return IndexedChunk.of(text)
+
+    def resolve(self, block: Dict[str, Any], cited_id: str, excerpt: str) -> Optional[Tuple[str, int, int]]:
+        # Returns (chunk_id, start, end) with offsets into that chunk's stored text.
+        # An excerpt spanning merged chunks resolves to the chunk it starts in,
+        # with end running past that chunk's text.
+        needle, _ = normalize_with_offsets(excerpt)
+        if not needle:
+            return None
+        text = block.get("text", "")
+        meta = block.get("metadata", {})
+        ids = meta.get("chunk_ids") or [meta.get("chunk_id", "")]
+        members = list(zip(ids, meta.get("chunk_spans") or [[0, len(text)]]))
+        members.sort(key=lambda member: member[0] != cited_id)
+        for chunk_id, (start, end) in members:
+            found = self.chunk(chunk_id, text[start:end]).find(needle)
+            if found is not None:
+                return chunk_id, found[0], found[1]
+        if len(members) == 1:
+            return None
+
+        found = IndexedChunk.of(text).find(needle)
+        if found is None:
+            return None
+        chunk_id, (start, _) = max(
+            ((cid, span) for cid, span in members if span[0] <= found[0]), key=lambda member: member[1][0]
+        )
+        return chunk_id, found[0] - start, found[1] - start
+
+
+_lock = threading.Lock()
+_by_version: Dict[str, CitationIndex] = {}
+_active = CitationIndex()
+
+
+def index_for_collection(ids: Sequence[str], documents: Sequence[Optional[str]], version: str) -> CitationIndex:
+    global _active
+    with _lock:
+        index = _by_version.get(version)
+        if index is None:
+            index = CitationIndex.build(ids, documents, version)
+            # Only the current collection version is kept.
+            _by_version.clear()
+            _by_version[version] = index
+        _active = index
+    return index
+
+
+def active_index() -> CitationIndex:
+    return _active
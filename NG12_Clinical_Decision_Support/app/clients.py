@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Replacement model factories (generative, embedding), e.g. offline stand-ins.
+_backends: Optional[Tuple[Callable[[str], Any], Callable[[str], Any]]] = None
+
+
+# vertexai takes seconds to import, so it is only loaded when a client is first built.
+def _init_vertex(project: str, location: str) -> None:
+    if _backends is not None:
+        return
+    import vertexai
+
+    vertexai.init(project=project, location=location)
+
+
+def _create_generative(name: str) -> Any:
+    if _backends is not None:
+        return _backends[0](name)
+    from vertexai.generative_models import GenerativeModel
+
+    return GenerativeModel(name)
+
+
+def _create_embedding(name: str) -> Any:
+    if _backends is not None:
+        return _backends[1](name)
+    from vertexai.language_models import TextEmbeddingModel
+
+    return TextEmbeddingModel.from_pretrained(name)
+
+
+class ModelClientPool:
+    def __init__(self, project: str, location: str) -> None:
+        self.project = project
+        self.location = location
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._generative: Dict[str, Any] = {}
+        self._embedding: Dict[str, Any] = {}
+        self._counts: Counter = Counter()
+
+    def _ensure_init(self) -> None:
+        if not self._initialized:
+            _init_vertex(self.project, self.location)
+            self._initialized = True
+            self._counts["vertex_init"] += 1
+
+    def generative_model(self, name: str) -> Any:
+        model = self._generative.get(name)
+        if model is None:
+            with self._lock:
+                model = self._generative.get(name)
+                if model is None:
+                    self._ensure_init()
+                    model = _create_generative(name)
+                    self._generative[name] = model
+                    self._counts["generative_created"] += 1
+        self._counts["generative_requests"] += 1
+        return model
+
+    def embedding_model(self, name: str) -> Any:
+        model = self._embedding.get(name)
+        if model is None:
+            with self._lock:
+                model = self._embedding.get(name)
+                if model is None:
+                    self._ensure_init()
+                    model = _create_embedding(name)
+                    self._embedding[name] = model
+                    self._counts["embedding_created"] += 1
+        self._counts["embedding_requests"] += 1
+        return model
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._counts)
+
+
+_pools: Dict[Tuple[str, str], ModelClientPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(project: str, location: str) -> ModelClientPool:
+    key = (project, location)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(key, ModelClientPool(project, location))
+    return pool
+
+
+def use_backends(
+    generative: Optional[Callable[[str], Any]] = None, embedding: Optional[Callable[[str], Any]] = None
+) -> None:
+    # Builds models with the given factories instead of Vertex AI; call with no
+    # arguments to restore Vertex. Pooled clients are dropped either way.
+    global _backends
+    with _pools_lock:
+        _backends = (generative, embedding) if generative and embedding else None
+        _pools.clear()
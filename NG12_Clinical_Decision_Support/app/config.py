@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -16,22 +16,67 @@ class Settings(BaseSettings):
 
     chroma_path: str = Field("data/chroma", description="ChromaDB persistent path")
     collection_name: str = Field("ng12", description="ChromaDB collection name")
+    vector_backend: Literal["chroma", "numpy"] = Field("chroma", description="Dense retrieval backend")
+    vector_index_path: str = Field("data/vector_index", description="Memory-mapped export used by the numpy backend")
+
+    patient_store: Literal["json", "sqlite"] = Field("json", description="Patient lookup backend")
+    patient_db_path: str = Field("data/patients.sqlite", description="SQLite patient index for the sqlite backend")
 
     top_k: int = Field(5, ge=1, le=20)
     min_similarity: Optional[float] = Field(None, description="Optional similarity threshold")
+    hybrid_retrieval: bool = Field(True, description="Fuse BM25 with vector results; chunk scores become RRF scores")
+    rrf_k: int = Field(60, ge=1, le=1000, description="Reciprocal rank fusion constant")
+    context_token_budget: int = Field(
+        2000, ge=0, le=32000, description="Approximate prompt context budget in tokens; 0 disables the limit"
+    )
 
     log_level: str = Field("INFO")
+    trace_exporter: Literal["jsonl", "none"] = Field("jsonl", description="Where request spans are exported")
+    trace_path: str = Field("data/traces.jsonl", description="JSON-lines file for the jsonl trace exporter")
+    trace_max_bytes: int = Field(
+        50_000_000, ge=0, description="Rotate the trace file once it would exceed this size; 0 never rotates"
+    )
+    trace_backups: int = Field(3, ge=0, le=20, description="Rotated trace files kept next to trace_path")
+    trace_queue_size: int = Field(1000, ge=1, le=100_000, description="Traces waiting to be written; more are dropped")
     read_only: bool = Field(True, description="Prevent writes to vector DB at runtime")
 
-    request_timeout_s: int = Field(30, ge=1, le=120)
+    preload_on_startup: bool = Field(True, description="Load Chroma, embedder and Gemini client before serving")
+    preload_max_attempts: int = Field(3, ge=1, le=10)
+    preload_backoff_s: float = Field(1.0, ge=0.1, le=30.0)
+    rag_retry_interval_s: int = Field(30, ge=1, le=600, description="Minimum gap between lazy retrieval rebuilds")
+
+    request_timeout_s: int = Field(30, ge=1, le=120, description="Cap on any single Vertex call")
+    assess_deadline_s: float = Field(45.0, ge=1.0, le=600.0, description="Total budget for one /assess request")
+    chat_deadline_s: float = Field(45.0, ge=1.0, le=600.0, description="Total budget for one /chat request")
+    chat_stream_deadline_s: float = Field(90.0, ge=1.0, le=600.0, description="Total budget for /chat/stream")
+    batch_deadline_s: float = Field(120.0, ge=1.0, le=600.0, description="Total budget for /assess/batch")
     max_history_turns: int = Field(6, ge=0, le=20)
+    chat_history_token_budget: int = Field(
+        600, ge=50, le=8000, description="Prompt budget for summarised and recent chat turns"
+    )
+    session_store: Literal["memory", "sqlite"] = Field("memory", description="Chat session backend")
+    session_db_path: str = Field("data/sessions.sqlite", description="SQLite file for the sqlite session backend")
+    session_ttl_s: int = Field(1800, ge=60, le=86400, description="Idle seconds before a chat session expires")
+    session_max_items: int = Field(1000, ge=1, le=1_000_000, description="Sessions kept before the oldest is evicted")
+    batch_max_concurrency: int = Field(4, ge=1, le=32, description="Distinct symptom sets assessed in parallel")
 
     retry_max_attempts: int = Field(2, ge=1, le=5)
-    retry_backoff_s: float = Field(0.5, ge=0.1, le=5.0)
-    breaker_threshold: int = Field(3, ge=1, le=10)
-    breaker_reset_s: int = Field(30, ge=5, le=300)
+    retry_backoff_s: float = Field(0.5, ge=0.1, le=5.0, description="First backoff step; doubles per retry")
+    retry_max_backoff_s: float = Field(8.0, ge=0.1, le=60.0)
+    retry_min_attempt_s: float = Field(1.0, ge=0.0, le=60.0, description="Skip retries with less budget left")
+    breaker_threshold: int = Field(3, ge=1, le=10, description="Minimum failures in the window before opening")
+    breaker_reset_s: int = Field(30, ge=5, le=300, description="Seconds open before half-open probes")
+    breaker_window_s: float = Field(60.0, ge=1.0, le=3600.0, description="Rolling window for the error rate")
+    breaker_error_rate: float = Field(0.5, gt=0.0, le=1.0, description="Failure ratio in the window that opens")
+    breaker_half_open_probes: int = Field(1, ge=1, le=20, description="Concurrent probes admitted when half-open")
     cache_ttl_s: int = Field(600, ge=60, le=3600)
     cache_max_items: int = Field(128, ge=10, le=1000)
+    cache_max_bytes: int = Field(8_000_000, ge=0, description="Response cache byte budget; 0 disables the limit")
+    embedding_cache_max_items: int = Field(1024, ge=0, le=100000)
+    embedding_cache_path: Optional[str] = Field(None, description="Optional SQLite file for persistent query embeddings")
+    embedding_cache_disk_max_items: int = Field(
+        100_000, ge=1, le=10_000_000, description="Newest query embeddings kept in the SQLite tier"
+    )
 
 
 settings = Settings()
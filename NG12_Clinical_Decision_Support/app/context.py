@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+# Ingestion ids are "<prefix>_c<index>"; consecutive indices on a page are contiguous text.
+_CHUNK_ID = re.compile(r"^(?P<prefix>.+)_c(?P<index>\d+)$")
+# Shorter suffix/prefix matches are more likely coincidence than chunk overlap.
+MIN_OVERLAP_CHARS = 20
+# The widest overlap ingestion ever wrote (fixed windows, --overlap 200); the
+# recommendation chunker writes none.
+MAX_OVERLAP_CHARS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English prose; no tokenizer round trip.
+    return estimate_tokens_for(len(text))
+
+
+def estimate_tokens_for(length: int) -> int:
+    return math.ceil(length / 4)
+
+
+def _position(chunk: Dict[str, Any]) -> Optional[Tuple[Tuple[Any, Any, str], int]]:
+    meta = chunk.get("metadata", {})
+    match = _CHUNK_ID.match(str(meta.get("chunk_id", "")))
+    if not match:
+        return None
+    return (meta.get("source"), meta.get("page"), match.group("prefix")), int(match.group("index"))
+
+
+@lru_cache(maxsize=1024)
+def overlap_length(left: str, right: str) -> int:
+    # Longest suffix of left that starts right. Only the last MAX_OVERLAP_CHARS
+    # of left are searched, starting from each place right's opening appears.
+    head = right[:MIN_OVERLAP_CHARS]
+    if len(head) < MIN_OVERLAP_CHARS:
+        return 0
+    tail = left[-min(MAX_OVERLAP_CHARS, len(right)):]
+    start = tail.find(head)
+    while start != -1:
+        if right.startswith(tail[start:]):
+            return len(tail) - start
+        start = tail.find(head, start + 1)
+    return 0
+
+
+def _seam(left: str, right: str) -> int:
+    # Length change from joining two adjacent chunks: the overlap is dropped,
+    # otherwise a space goes between them.
+    size = overlap_length(left, right)
+    return -size if size else 1
+
+
+def _block(members: List[Tuple[int, Dict[str, Any]]]) -> Tuple[int, Dict[str, Any]]:
+    # members are (rank, chunk) in text order; the block keeps its best rank.
+    if len(members) == 1:
+        return members[0]
+    previous = members[0][1].get("text", "")
+    parts = [previous]
+    length = len(previous)
+    spans = [[0, length]]
+    for _, chunk in members[1:]:
+        chunk_text = chunk.get("text", "")
+        size = overlap_length(previous, chunk_text)
+        parts.append(chunk_text[size:] if size else f" {chunk_text}")
+        start = length - size if size else length + 1
+        length = start + len(chunk_text)
+        spans.append([start, length])
+        previous = chunk_text
+    text = "".join(parts)
+    ids = [chunk.get("metadata", {}).get("chunk_id", "") for _, chunk in members]
+    rank, best = min(members, key=lambda member: member[0])
+    metadata = {
+        **members[0][1].get("metadata", {}),
+        "chunk_id": ",".join(ids),
+        "chunk_ids": ids,
+        # Each member's text is text[start:end], so citations can be resolved per chunk.
+        "chunk_spans": spans,
+    }
+    last = members[-1][1].get("metadata", {})
+    if "page_end" in last:
+        metadata["page_end"] = last["page_end"]
+    return rank, {"text": text, "metadata": metadata, "score": best.get("score")}
+
+
+def merge_adjacent(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    groups: Dict[Any, List[Tuple[int, int, Dict[str, Any]]]] = {}
+    blocks: List[Tuple[int, Dict[str, Any]]] = []
+    for rank, chunk in enumerate(chunks):
+        position = _position(chunk)
+        if position is None:
+            blocks.append((rank, chunk))
+            continue
+        key, index = position
+        groups.setdefault(key, []).append((index, rank, chunk))
+
+    for members in groups.values():
+        members.sort(key=lambda member: member[0])
+        run: List[Tuple[int, Dict[str, Any]]] = []
+        last_index: Optional[int] = None
+        for index, rank, chunk in members:
+            if index == last_index:
+                # Retrieved twice; the better-ranked copy sorts first.
+                continue
+            if run and index != last_index + 1:
+                blocks.append(_block(run))
+                run = []
+            run.append((rank, chunk))
+            last_index = index
+        if run:
+            blocks.append(_block(run))
+
+    blocks.sort(key=lambda block: block[0])
+    return [chunk for _, chunk in blocks]
+
+
+def context_tokens(blocks: List[Dict[str, Any]]) -> int:
+    return sum(estimate_tokens(block.get("text", "")) for block in blocks)
+
+
+def pack_context(chunks: List[Dict[str, Any]], budget_tokens: int) -> List[Dict[str, Any]]:
+    # Chunks arrive in retrieval rank order. Each is kept if the merged context
+    # still fits the budget, so a neighbour of a kept chunk only costs its new text.
+    if budget_tokens <= 0:
+        return merge_adjacent(chunks)
+
+    # Runs of kept chunks that will merge, as [first index, last index, length],
+    # reachable from both ends; the cost of a chunk is worked out from its
+    # neighbouring runs alone, without rebuilding any text.
+    first: Dict[Tuple[Any, int], List[Any]] = {}
+    last: Dict[Tuple[Any, int], List[Any]] = {}
+    texts: Dict[Tuple[Any, int], str] = {}
+    selected: List[Dict[str, Any]] = []
+    used = 0
+    for chunk in chunks:
+        text = chunk.get("text", "")
+        position = _position(chunk)
+        if position is None:
+            if used + estimate_tokens(text) <= budget_tokens:
+                used += estimate_tokens(text)
+                selected.append(chunk)
+            continue
+        key, index = position
+        if (key, index) in texts:
+            continue
+        left, right = last.get((key, index - 1)), first.get((key, index + 1))
+        length, freed = len(text), 0
+        if left is not None:
+            length += left[2] + _seam(texts[(key, index - 1)], text)
+            freed += estimate_tokens_for(left[2])
+        if right is not None:
+            length += right[2] + _seam(text, texts[(key, index + 1)])
+            freed += estimate_tokens_for(right[2])
+        cost = estimate_tokens_for(length) - freed
+        if used + cost > budget_tokens:
+            continue
+        used += cost
+        selected.append(chunk)
+        texts[(key, index)] = text
+        run = [left[0] if left else index, right[1] if right else index, length]
+        for end in (left, right):
+            if end is not None:
+                first.pop((key, end[0]), None)
+                last.pop((key, end[1]), None)
+        first[(key, run[0])] = run
+        last[(key, run[1])] = run
+
+    if not selected and chunks:
+        # Even the best chunk is over budget: send its leading text rather than nothing.
+        top = chunks[0]
+        selected = [{**top, "text": top.get("text", "")[: budget_tokens * 4]}]
+    return merge_adjacent(selected)
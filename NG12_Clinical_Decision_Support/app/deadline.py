@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Absolute time.monotonic() by which the current request must finish.
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    # Nested scopes can only shorten the budget, never extend it.
+    current = _deadline.get()
+    target = None if seconds is None else time.monotonic() + seconds
+    if current is not None and (target is None or current < target):
+        target = current
+    token = _deadline.set(target)
+    try:
+        yield
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            pass
+
+
+def remaining() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+async def with_timeout(awaitable: Awaitable[T], cap_s: float) -> T:
+    # Waits at most cap_s or whatever is left of the request budget.
+    budget = remaining()
+    if budget is not None and budget <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Request deadline exceeded")
+    timeout = cap_s if budget is None else min(cap_s, budget)
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        if budget is not None and budget < cap_s:
+            raise DeadlineExceeded("Request deadline exceeded") from None
+        raise
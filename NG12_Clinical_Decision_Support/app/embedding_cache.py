@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .canonical import normalize_text
+
+
+class EmbeddingCache:
+    def __init__(
+        self, model_name: str, max_items: int = 1024, path: Optional[str] = None, disk_max_items: int = 100_000
+    ) -> None:
+        self.model_name = model_name
+        self.max_items = max_items
+        self.disk_max_items = disk_max_items
+        self._store: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Separate, so memory hits never wait behind disk I/O.
+        self._db_lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            # Optional persistent tier; memory misses fall through to it.
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, text_key TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, text_key))"
+            )
+            self._db.commit()
+
+    def _key(self, text: str) -> Tuple[str, str]:
+        return self.model_name, normalize_text(text)
+
+    # get/set block on SQLite; request paths use aget/aset, which run the disk
+    # tier in a worker thread so the event loop only ever touches memory.
+    def get(self, text: str) -> Optional[List[float]]:
+        key = self._key(text)
+        vector = self._memory_get(key)
+        if vector is None and self._db is not None:
+            vector = self._disk_get(key)
+        if vector is None:
+            self._miss()
+        return vector
+
+    async def aget(self, text: str) -> Optional[List[float]]:
+        key = self._key(text)
+        vector = self._memory_get(key)
+        if vector is None and self._db is not None:
+            vector = await asyncio.to_thread(self._disk_get, key)
+        if vector is None:
+            self._miss()
+        return vector
+
+    def set(self, text: str, vector: List[float]) -> None:
+        key = self._key(text)
+        with self._lock:
+            self._remember(key, list(vector))
+        if self._db is not None:
+            self._disk_put(key, vector)
+
+    async def aset(self, text: str, vector: List[float]) -> None:
+        key = self._key(text)
+        with self._lock:
+            self._remember(key, list(vector))
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, key, vector)
+
+    def _memory_get(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._store.get(key)
+            if vector is not None:
+                self._store.move_to_end(key)
+                self._hits += 1
+            return vector
+
+    def _miss(self) -> None:
+        with self._lock:
+            self._misses += 1
+
+    def _disk_get(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        with self._db_lock:
+            row = self._db.execute("SELECT vector FROM embeddings WHERE model = ? AND text_key = ?", key).fetchone()
+        if row is None:
+            return None
+        vector = array("f", row[0]).tolist()
+        with self._lock:
+            self._remember(key, vector)
+            self._disk_hits += 1
+        return vector
+
+    def _disk_put(self, key: Tuple[str, str], vector: List[float]) -> None:
+        with self._db_lock:
+            cursor = self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (model, text_key, vector) VALUES (?, ?, ?)",
+                (*key, array("f", vector).tobytes()),
+            )
+            # Rowids grow with every write, so this keeps about the newest
+            # disk_max_items rows with one indexed range delete.
+            self._db.execute("DELETE FROM embeddings WHERE rowid <= ?", (cursor.lastrowid - self.disk_max_items,))
+            self._db.commit()
+
+    def _remember(self, key: Tuple[str, str], vector: List[float]) -> None:
+        if self.max_items <= 0:
+            return
+        self._store[key] = vector
+        self._store.move_to_end(key)
+        while len(self._store) > self.max_items:
+            self._store.popitem(last=False)
+
+    def clear(self) -> None:
+        # Memory tier only; the persistent tier is left as it is.
+        with self._lock:
+            self._store.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "size": len(self._store),
+            }
@@ -1,9 +1,41 @@
 from __future__ import annotations
 
-from typing import Dict
+import threading
+import time
+from typing import Any, Dict, Tuple
 
 from .config import settings
 
+DEPENDENCIES = ("generation", "embedding", "vector_store")
+
+_lock = threading.Lock()
+_state: Dict[str, Dict[str, Any]] = {name: {"status": "pending"} for name in DEPENDENCIES}
+
 
 def health_payload() -> Dict[str, str]:
     return {"status": "ok", "collection": settings.collection_name}
+
+
+def mark_ready(name: str, **details: Any) -> None:
+    with _lock:
+        _state[name] = {"status": "ready", "since": time.time(), **details}
+
+
+def mark_ok(name: str) -> None:
+    # Called after successful traffic, so a dependency that failed at boot or
+    # was never preloaded recovers; one that is already ready is left as is.
+    with _lock:
+        if _state[name]["status"] != "ready":
+            _state[name] = {"status": "ready", "since": time.time(), "via": "request"}
+
+
+def mark_failed(name: str, error: BaseException, **details: Any) -> None:
+    with _lock:
+        _state[name] = {"status": "failed", "error": type(error).__name__, "since": time.time(), **details}
+
+
+def readiness_payload() -> Tuple[bool, Dict[str, Any]]:
+    with _lock:
+        dependencies = {name: dict(state) for name, state in _state.items()}
+    ready = all(d["status"] == "ready" for d in dependencies.values())
+    return ready, {"status": "ready" if ready else "not_ready", "dependencies": dependencies}
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Keeps recommendation numbers ("1.3.1") and hyphenated terms ("non-visible") whole.
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or that the this to was were with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return [t for t in _TOKEN.findall(text) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._doc_len: List[int] = []
+        self._idf: Dict[str, float] = {}
+        self._avgdl = 0.0
+
+    @classmethod
+    def build(
+        cls, ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[Dict[str, Any]]
+    ) -> "BM25Index":
+        index = cls()
+        for chunk_id, doc, meta in zip(ids, documents, metadatas):
+            if doc is None:
+                continue
+            terms = Counter(tokenize(doc))
+            doc_idx = len(index.ids)
+            index.ids.append(chunk_id)
+            index.documents.append(doc)
+            index.metadatas.append(meta or {})
+            index._doc_len.append(sum(terms.values()))
+            for term, tf in terms.items():
+                index._postings[term].append((doc_idx, tf))
+        n = len(index.ids)
+        index._avgdl = (sum(index._doc_len) / n) if n else 0.0
+        index._idf = {
+            term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in index._postings.items()
+        }
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc_idx, tf in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_idx] / self._avgdl)
+                scores[doc_idx] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    fused: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            fused[chunk_id] += 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
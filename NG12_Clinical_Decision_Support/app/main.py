@@ -1,27 +1,48 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import time
 import uuid
-from typing import Dict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
 
-from fastapi import FastAPI, Header, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
-from .agent import DISCLAIMER, generate_assessment
+from .agent import DISCLAIMER, generate_assessment, generation_stats, stream_assessment
+from .canonical import assess_question, conversation_key, symptom_set
+from .clients import get_pool
 from .config import settings
-from .health import health_payload
-from .memory import trim_history
-from .models import AssessRequest, AssessResponse, ChatRequest, ChatResponse, ErrorInfo, AgentOutput
-from .rag import ChromaRAG
+from .deadline import deadline_scope
+from .health import health_payload, mark_failed, mark_ready, readiness_payload
+from .memory import Session, session_store, trim_history
+from .metrics import DEGRADED, REGISTRY, REQUEST_LATENCY, RESPONSES, current_endpoint, stats_samples
+from .models import (
+    AgentOutput,
+    AssessRequest,
+    AssessResponse,
+    BatchAssessItem,
+    BatchAssessRequest,
+    BatchAssessResponse,
+    ChatRequest,
+    ChatResponse,
+    ErrorInfo,
+)
+from .rag import ChromaRAG, Retrieval
+from .resilience import CLOSED, HALF_OPEN, OPEN, breakers
 from .security import sanitize_for_logging
-from .tools import get_patient
+from .tools import get_patient, get_patients
+from .tracing import correlation_id, export_trace, flush_traces, get_exporter, start_trace
 
-app = FastAPI(title="Clinical Reasoning Platform", version="1.0")
 _rag_instance: ChromaRAG | None = None
+_rag_retry_at = 0.0
+_rag_lock = asyncio.Lock()
+_probe_at = 0.0
 
 
-def _cid(correlation_id: str | None) -> str:
-    return correlation_id or str(uuid.uuid4())
+def _cid(header_value: str | None) -> str:
+    return header_value or correlation_id() or str(uuid.uuid4())
 
 
 def _log(event: str, data: Dict[str, str]) -> None:
@@ -29,15 +50,157 @@ def _log(event: str, data: Dict[str, str]) -> None:
     print(json.dumps(payload))
 
 
-def _get_rag() -> ChromaRAG | None:
-    global _rag_instance
+async def _with_retries(name: str, fn) -> Any:
+    delay = settings.preload_backoff_s
+    for attempt in range(1, settings.preload_max_attempts + 1):
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(fn)
+        except Exception as exc:
+            mark_failed(name, exc, attempts=attempt)
+            _log("preload_failed", {"dependency": name, "attempt": str(attempt), "error": type(exc).__name__})
+            if attempt < settings.preload_max_attempts:
+                await asyncio.sleep(delay)
+                delay *= 2
+            continue
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        mark_ready(name, attempts=attempt, load_ms=elapsed_ms)
+        _log("preload_ready", {"dependency": name, "load_ms": str(elapsed_ms)})
+        return result
+    return None
+
+
+async def _preload() -> None:
+    global _rag_instance, _rag_retry_at
+    pool = get_pool(settings.project_id, settings.location)
+    await _with_retries("generation", lambda: pool.generative_model(settings.gemini_model))
+    await _with_retries("embedding", lambda: pool.embedding_model(settings.embedding_model))
+    rag = await _with_retries("vector_store", ChromaRAG)
+    if rag is not None:
+        _rag_instance = rag
+    else:
+        _rag_retry_at = time.monotonic() + settings.rag_retry_interval_s
+    _log("client_pool", {k: str(v) for k, v in pool.stats().items()})
+
+
+@asynccontextmanager
+async def _lifespan(_: FastAPI) -> AsyncIterator[None]:
+    if settings.preload_on_startup:
+        await _preload()
+    yield
+    # Spans still queued for the background writer.
+    await asyncio.to_thread(flush_traces, 2.0)
+
+
+app = FastAPI(title="Clinical Reasoning Platform", version="1.0", lifespan=_lifespan)
+
+_CACHE_EVENTS = ("hits", "disk_hits", "misses", "evictions", "expirations")
+
+
+def _cache_samples() -> list:
+    samples = stats_samples(
+        {k: v for k, v in generation_stats()["response_cache"].items() if k in _CACHE_EVENTS}, cache="response"
+    )
     if _rag_instance is not None:
-        return _rag_instance
+        embedding = _rag_instance.stats()["embedding_cache"]
+        samples += stats_samples({k: v for k, v in embedding.items() if k in _CACHE_EVENTS}, cache="embedding")
+    return samples
+
+
+def _singleflight_samples() -> list:
+    samples = stats_samples(generation_stats()["singleflight"], scope="generation")
+    if _rag_instance is not None:
+        samples += stats_samples(_rag_instance.stats()["singleflight"], scope="retrieval")
+    return samples
+
+
+REGISTRY.register_callback("cds_cache_events_total", "counter", "Cache lookups by outcome", _cache_samples)
+REGISTRY.register_callback(
+    "cds_singleflight", "gauge", "Calls, coalesced calls and calls in flight", _singleflight_samples
+)
+REGISTRY.register_callback(
+    "cds_breaker_state",
+    "gauge",
+    "1 for the current state of each dependency circuit breaker",
+    lambda: [
+        ({"breaker": name, "state": state}, 1.0 if breaker.state == state else 0.0)
+        for name, breaker in sorted(breakers().items())
+        for state in (CLOSED, HALF_OPEN, OPEN)
+    ],
+)
+REGISTRY.register_callback(
+    "cds_chat_sessions", "gauge", "Chat session store size and evictions", lambda: stats_samples(_sessions().stats())
+)
+REGISTRY.register_callback(
+    "cds_trace_export",
+    "gauge",
+    "Spans written, dropped on a full queue, and traces waiting to be written",
+    lambda: stats_samples(get_exporter().stats()) if hasattr(get_exporter(), "stats") else [],
+)
+REGISTRY.register_callback(
+    "cds_client_pool",
+    "gauge",
+    "Vertex client pool construction and reuse counts",
+    lambda: stats_samples(get_pool(settings.project_id, settings.location).stats()),
+)
+
+
+async def _traced_body(body: AsyncIterator[bytes], trace) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        # Streaming endpoints keep adding spans until the last event is sent.
+        export_trace(trace)
+
+
+# Total time budget per endpoint, shared by retrieval, embedding and generation.
+_DEADLINES = {
+    "/assess": "assess_deadline_s",
+    "/assess/batch": "batch_deadline_s",
+    "/chat": "chat_deadline_s",
+    "/chat/stream": "chat_stream_deadline_s",
+}
+
+
+@app.middleware("http")
+async def _observe(request: Request, call_next):
+    # Label by route template rather than raw path to keep label cardinality bounded.
+    route_paths = {getattr(r, "path", "") for r in app.routes}
+    endpoint = request.url.path if request.url.path in route_paths else "other"
+    token = current_endpoint.set(endpoint)
+    started = time.perf_counter()
     try:
-        _rag_instance = ChromaRAG()
+        budget = getattr(settings, _DEADLINES[endpoint]) if endpoint in _DEADLINES else None
+        with start_trace(request.headers.get("x-correlation-id") or str(uuid.uuid4())) as trace:
+            with deadline_scope(budget):
+                response = await call_next(request)
+    finally:
+        current_endpoint.reset(token)
+    # For streaming responses this is time to first byte, not to the final event.
+    REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+    RESPONSES.inc(endpoint=endpoint, status=str(response.status_code))
+    response.headers["Server-Timing"] = trace.server_timing()
+    response.body_iterator = _traced_body(response.body_iterator, trace)
+    return response
+
+
+async def _get_rag() -> ChromaRAG | None:
+    global _rag_instance, _rag_retry_at
+    if _rag_instance is not None:
+        return _rag_instance
+    async with _rag_lock:
+        # Failed builds are retried at most once per interval, not on every request.
+        if _rag_instance is not None or time.monotonic() < _rag_retry_at:
+            return _rag_instance
+        try:
+            _rag_instance = await asyncio.to_thread(ChromaRAG)
+            mark_ready("vector_store")
+        except Exception as exc:
+            _rag_retry_at = time.monotonic() + settings.rag_retry_interval_s
+            mark_failed("vector_store", exc)
+            _log("rag_init_failed", {"error": type(exc).__name__})
         return _rag_instance
-    except Exception:
-        return None
 
 
 @app.get("/health")
@@ -45,53 +208,115 @@ def health() -> Dict[str, str]:
     return health_payload()
 
 
+async def _recover(states: Dict[str, Any]) -> None:
+    # Builds whatever preload skipped or failed to build. Successful requests
+    # also mark their dependency ready, so this only matters while idle.
+    global _probe_at
+    if time.monotonic() < _probe_at:
+        return
+    _probe_at = time.monotonic() + settings.rag_retry_interval_s
+    pool = get_pool(settings.project_id, settings.location)
+    builders = {
+        "generation": lambda: pool.generative_model(settings.gemini_model),
+        "embedding": lambda: pool.embedding_model(settings.embedding_model),
+    }
+    for name, build in builders.items():
+        if states[name]["status"] == "ready":
+            continue
+        try:
+            await asyncio.to_thread(build)
+            mark_ready(name, via="probe")
+        except Exception as exc:
+            mark_failed(name, exc)
+    if states["vector_store"]["status"] != "ready":
+        await _get_rag()
+
+
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    is_ready, payload = readiness_payload()
+    if not is_ready:
+        await _recover(payload["dependencies"])
+        is_ready, payload = readiness_payload()
+    return JSONResponse(content=payload, status_code=200 if is_ready else 503)
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 def _unwrap_result(value) -> tuple[AgentOutput, dict]:
     if isinstance(value, tuple) and len(value) == 2:
         return value[0], value[1] or {}
     return value, {}
 
 
-@app.post("/assess", response_model=AssessResponse)
-def assess(req: AssessRequest, x_correlation_id: str | None = Header(default=None)) -> JSONResponse:
-    correlation_id = _cid(x_correlation_id)
-    patient = get_patient(req.patient_id)
-    if not patient:
-        raise HTTPException(status_code=400, detail="Invalid patient_id")
-
-    symptoms = patient.get("symptoms", [])
-    if not symptoms:
-        raise HTTPException(status_code=400, detail="Empty symptoms list")
-
-    question = f"Assess NG12 risk for symptoms: {', '.join(symptoms)}"
-
-    errors: list[ErrorInfo] = []
-    rag = _get_rag()
+async def _retrieve(query: str, errors: list[ErrorInfo]) -> list[dict]:
+    rag = await _get_rag()
     try:
-        chunks = [
-            {"text": c.text, "metadata": c.metadata, "score": c.score}
-            for c in (rag.query(question, settings.top_k) if rag else [])
-        ]
+        hits = await rag.query(query, settings.top_k) if rag else []
+        chunks = [{"text": c.text, "metadata": c.metadata, "score": c.score} for c in hits]
+        if isinstance(hits, Retrieval) and hits.lexical_only:
+            errors.append(ErrorInfo(code="RETRIEVAL_LEXICAL_ONLY", message="Dense retrieval unavailable; lexical only"))
     except Exception:
         errors.append(ErrorInfo(code="RETRIEVAL_FAILED", message="Vector retrieval failed"))
         chunks = []
     if not chunks:
         errors.append(ErrorInfo(code="RETRIEVAL_EMPTY", message="No retrieval results"))
+    return chunks
 
+
+async def _generate(
+    question: str, chunks: list[dict], errors: list[ErrorInfo], cache_key: str | None = None
+) -> AgentOutput:
     try:
-        result, meta = _unwrap_result(generate_assessment(question, chunks))
+        result, meta = _unwrap_result(await generate_assessment(question, chunks, cache_key=cache_key))
     except Exception:
         errors.append(ErrorInfo(code="GENERATION_FAILED", message="Generation failed"))
-        result, meta = _unwrap_result(generate_assessment("", []))
+        result, meta = _unwrap_result(await generate_assessment("", []))
+
+    _meta_errors(meta, errors)
+    return result
+
+
+def _status(errors: list[ErrorInfo]) -> str:
+    for error in errors:
+        DEGRADED.inc(endpoint=current_endpoint.get(), code=error.code)
+    return "ok" if not errors else "degraded"
 
+
+def _meta_errors(meta: dict, errors: list[ErrorInfo]) -> None:
     if meta.get("reason") == "prompt_injection":
         errors.append(ErrorInfo(code="PROMPT_INJECTION", message="Prompt injection detected"))
     if meta.get("reason") == "breaker_open":
         errors.append(ErrorInfo(code="CIRCUIT_OPEN", message="Circuit breaker open"))
     if meta.get("reason") == "generation_failed":
         errors.append(ErrorInfo(code="GENERATION_FAILED", message="Generation failed"))
+    if meta.get("reason") == "deadline_exceeded":
+        errors.append(ErrorInfo(code="DEADLINE_EXCEEDED", message="Request time budget exhausted"))
     if meta.get("cache") == "hit":
         errors.append(ErrorInfo(code="CACHE_HIT", message="Returned cached response"))
 
+
+@app.post("/assess", response_model=AssessResponse)
+async def assess(req: AssessRequest, x_correlation_id: str | None = Header(default=None)) -> JSONResponse:
+    correlation_id = _cid(x_correlation_id)
+    # A JSON reload or SQLite query is blocking I/O; keep it off the event loop.
+    patient = await asyncio.to_thread(get_patient, req.patient_id)
+    if not patient:
+        raise HTTPException(status_code=400, detail="Invalid patient_id")
+
+    symptoms = symptom_set(patient.get("symptoms", []))
+    if not symptoms:
+        raise HTTPException(status_code=400, detail="Empty symptoms list")
+
+    question = assess_question(symptoms)
+
+    errors: list[ErrorInfo] = []
+    chunks = await _retrieve(question, errors)
+    result = await _generate(question, chunks, errors)
+
     _log(
         "assess",
         {
@@ -103,7 +328,7 @@ def assess(req: AssessRequest, x_correlation_id: str | None = Header(default=Non
         },
     )
 
-    status = "ok" if not errors else "degraded"
+    status = _status(errors)
     response = AssessResponse(
         correlation_id=correlation_id,
         disclaimer=DISCLAIMER,
@@ -114,48 +339,140 @@ def assess(req: AssessRequest, x_correlation_id: str | None = Header(default=Non
     return JSONResponse(content=response.model_dump())
 
 
-@app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest, x_correlation_id: str | None = Header(default=None)) -> JSONResponse:
+@app.post("/assess/batch", response_model=BatchAssessResponse)
+async def assess_batch(req: BatchAssessRequest, x_correlation_id: str | None = Header(default=None)) -> JSONResponse:
     correlation_id = _cid(x_correlation_id)
-    history = [m.model_dump() for m in req.history] if req.history else []
-    history = trim_history(history, settings.max_history_turns)
-
-    question = req.question
-    if history:
-        history_block = "\n".join([f"{h['role']}: {h['content']}" for h in history])
-        question = (
-            "Conversation so far:\n"
-            f"{history_block}\n\n"
-            f"User question: {req.question}"
-        )
+    items: dict[str, BatchAssessItem] = {}
+    groups: dict[tuple[str, ...], list[str]] = {}
 
-    errors: list[ErrorInfo] = []
-    rag = _get_rag()
-    try:
-        chunks = [
-            {"text": c.text, "metadata": c.metadata, "score": c.score}
-            for c in (rag.query(req.question, settings.top_k) if rag else [])
-        ]
-    except Exception:
-        errors.append(ErrorInfo(code="RETRIEVAL_FAILED", message="Vector retrieval failed"))
-        chunks = []
-    if not chunks:
-        errors.append(ErrorInfo(code="RETRIEVAL_EMPTY", message="No retrieval results"))
+    patient_ids = list(dict.fromkeys(req.patient_ids))
+    patients = await asyncio.to_thread(get_patients, patient_ids)
+    for patient_id in patient_ids:
+        patient = patients.get(patient_id)
+        if not patient:
+            items[patient_id] = BatchAssessItem(
+                patient_id=patient_id,
+                status="error",
+                errors=[ErrorInfo(code="INVALID_PATIENT", message="Invalid patient_id")],
+            )
+            continue
+        key = symptom_set(patient.get("symptoms", []))
+        if not key:
+            items[patient_id] = BatchAssessItem(
+                patient_id=patient_id,
+                status="error",
+                errors=[ErrorInfo(code="EMPTY_SYMPTOMS", message="Empty symptoms list")],
+            )
+            continue
+        groups.setdefault(key, []).append(patient_id)
 
-    try:
-        result, meta = _unwrap_result(generate_assessment(question, chunks))
-    except Exception:
-        errors.append(ErrorInfo(code="GENERATION_FAILED", message="Generation failed"))
-        result, meta = _unwrap_result(generate_assessment("", []))
+    # Patients with identical symptom sets share one retrieval and generation.
+    limit = asyncio.Semaphore(settings.batch_max_concurrency)
 
-    if meta.get("reason") == "prompt_injection":
-        errors.append(ErrorInfo(code="PROMPT_INJECTION", message="Prompt injection detected"))
-    if meta.get("reason") == "breaker_open":
-        errors.append(ErrorInfo(code="CIRCUIT_OPEN", message="Circuit breaker open"))
-    if meta.get("reason") == "generation_failed":
-        errors.append(ErrorInfo(code="GENERATION_FAILED", message="Generation failed"))
-    if meta.get("cache") == "hit":
-        errors.append(ErrorInfo(code="CACHE_HIT", message="Returned cached response"))
+    async def _assess_group(key: tuple[str, ...]) -> tuple[AgentOutput, list[ErrorInfo]]:
+        async with limit:
+            errors: list[ErrorInfo] = []
+            question = assess_question(key)
+            chunks = await _retrieve(question, errors)
+            return await _generate(question, chunks, errors), errors
+
+    outcomes = await asyncio.gather(*[_assess_group(key) for key in groups])
+    for (key, patient_ids), (result, errors) in zip(groups.items(), outcomes):
+        status = _status(errors)
+        for patient_id in patient_ids:
+            response = AssessResponse(
+                correlation_id=correlation_id,
+                disclaimer=DISCLAIMER,
+                result=result,
+                status=status,
+                errors=list(errors) or None,
+            )
+            items[patient_id] = BatchAssessItem(patient_id=patient_id, status=status, response=response)
+
+    _log(
+        "assess_batch",
+        {
+            "correlation_id": correlation_id,
+            "patient_count": str(len(items)),
+            "distinct_symptom_sets": str(len(groups)),
+        },
+    )
+
+    response = BatchAssessResponse(
+        correlation_id=correlation_id,
+        items=[items[patient_id] for patient_id in dict.fromkeys(req.patient_ids)],
+        distinct_symptom_sets=len(groups),
+    )
+    return JSONResponse(content=response.model_dump())
+
+
+def _sessions():
+    return session_store(
+        settings.session_store, settings.session_db_path, settings.session_max_items, settings.session_ttl_s
+    )
+
+
+def _remember(session: Session, role: str, content: str) -> None:
+    session.add(role, content, settings.max_history_turns, settings.chat_history_token_budget)
+
+
+async def _chat_session(req: ChatRequest) -> Session:
+    # The store may be SQLite, so its calls run off the event loop.
+    session = await asyncio.to_thread(_sessions().get, req.session_id) if req.session_id else None
+    if session is None:
+        # A new (or expired) session starts from whatever history the client sent.
+        # Ids are always issued here, so an unknown one cannot claim a session.
+        session = Session(uuid.uuid4().hex)
+        history = [m.model_dump() for m in req.history] if req.history else []
+        for h in trim_history(history, settings.max_history_turns):
+            _remember(session, h["role"], h["content"])
+    return session
+
+
+def _session_errors(req: ChatRequest, session: Session) -> list[ErrorInfo]:
+    # Expired, evicted, or held by another replica's in-memory store. The
+    # conversation restarts, so say so rather than answer without its context.
+    if req.session_id and session.session_id != req.session_id:
+        return [ErrorInfo(code="SESSION_NOT_FOUND", message="Unknown or expired session; started a new one")]
+    return []
+
+
+def _chat_question(req: ChatRequest, session: Session) -> str:
+    if not session.turns and not session.summary:
+        return req.question
+    return (
+        "Conversation so far:\n"
+        f"{session.render()}\n\n"
+        f"User question: {req.question}"
+    )
+
+
+async def _end_turn(session: Session, req: ChatRequest, result: AgentOutput) -> None:
+    def _add_turn(current: Session) -> None:
+        _remember(current, "user", req.question)
+        _remember(current, "assistant", f"{result.assessment}. {result.reasoning}")
+
+    # Applied to the stored session rather than this request's copy, so a
+    # concurrent turn on the same session is not overwritten.
+    await asyncio.to_thread(_sessions().update, session, _add_turn)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest, x_correlation_id: str | None = Header(default=None)) -> JSONResponse:
+    correlation_id = _cid(x_correlation_id)
+    session = await _chat_session(req)
+    question = _chat_question(req, session)
+    # History changes the prompt but not the retrieval; it is part of the cache key, not the query.
+    cache_key = conversation_key(req.question, session.render())
+
+    errors = _session_errors(req, session)
+    chunks = await _retrieve(req.question, errors)
+    result = await _generate(question, chunks, errors, cache_key=cache_key)
+    await _end_turn(session, req, result)
 
     _log(
         "chat",
@@ -167,12 +484,81 @@ def chat(req: ChatRequest, x_correlation_id: str | None = Header(default=None))
         },
     )
 
-    status = "ok" if not errors else "degraded"
+    status = _status(errors)
     response = ChatResponse(
         correlation_id=correlation_id,
+        session_id=session.session_id,
         disclaimer=DISCLAIMER,
         result=result,
         status=status,
         errors=errors or None,
     )
     return JSONResponse(content=response.model_dump())
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, x_correlation_id: str | None = Header(default=None)) -> StreamingResponse:
+    correlation_id = _cid(x_correlation_id)
+    session = await _chat_session(req)
+    question = _chat_question(req, session)
+    cache_key = conversation_key(req.question, session.render())
+
+    async def _events() -> AsyncIterator[str]:
+        errors = _session_errors(req, session)
+        chunks = await _retrieve(req.question, errors)
+        yield _sse(
+            "citations",
+            {
+                "correlation_id": correlation_id,
+                "session_id": session.session_id,
+                "citations": [
+                    {
+                        "source": c["metadata"].get("source", ""),
+                        "page": c["metadata"].get("page"),
+                        "chunk_id": c["metadata"].get("chunk_id", ""),
+                    }
+                    for c in chunks
+                ],
+            },
+        )
+
+        result, meta = None, {}
+        try:
+            async for kind, payload in stream_assessment(question, chunks, cache_key=cache_key):
+                if kind == "token":
+                    yield _sse("token", {"text": payload})
+                else:
+                    result, meta = payload
+        except Exception:
+            result = None
+        if result is None:
+            errors.append(ErrorInfo(code="GENERATION_FAILED", message="Generation failed"))
+            result, meta = _unwrap_result(await generate_assessment("", []))
+        _meta_errors(meta, errors)
+        await _end_turn(session, req, result)
+
+        _log(
+            "chat_stream",
+            {
+                "correlation_id": correlation_id,
+                "retrieval_count": str(len(chunks)),
+                "citation_count": str(len(result.citations)),
+                "confidence": result.confidence,
+            },
+        )
+
+        response = ChatResponse(
+            correlation_id=correlation_id,
+            session_id=session.session_id,
+            disclaimer=DISCLAIMER,
+            result=result,
+            status=_status(errors),
+            errors=errors or None,
+        )
+        yield _sse("final", response.model_dump())
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
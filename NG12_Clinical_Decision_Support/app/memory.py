@@ -1,6 +1,20 @@
 from __future__ import annotations
 
-from typing import List, Dict
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .context import estimate_tokens
+
+# Each compacted turn keeps about its first sentence.
+SUMMARY_LINE_CHARS = 160
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
 
 
 def trim_history(history: List[Dict[str, str]], max_turns: int) -> List[Dict[str, str]]:
@@ -9,3 +23,200 @@ def trim_history(history: List[Dict[str, str]], max_turns: int) -> List[Dict[str
     if max_turns <= 0:
         return []
     return history[-max_turns:]
+
+
+def digest(role: str, content: str) -> str:
+    text = " ".join(content.split())
+    match = _SENTENCE_END.search(text)
+    if match and match.start() < SUMMARY_LINE_CHARS:
+        text = text[: match.start()]
+    elif len(text) > SUMMARY_LINE_CHARS:
+        text = text[: SUMMARY_LINE_CHARS - 3].rstrip() + "..."
+    return f"{role}: {text}"
+
+
+@dataclass
+class Session:
+    # Recent turns verbatim plus one digest line per older turn. Compaction is
+    # incremental: each new turn moves at most a few old ones into the summary.
+    session_id: str
+    summary: List[str] = field(default_factory=list)
+    turns: List[Dict[str, str]] = field(default_factory=list)
+    updated_at: float = 0.0
+
+    def add(self, role: str, content: str, max_turns: int, budget_tokens: int) -> None:
+        # Recent turns get two thirds of the budget and the summary the rest.
+        summary_budget = budget_tokens // 3
+        turn_budget = budget_tokens - summary_budget
+        self.turns.append({"role": role, "content": content})
+        while self.turns and (len(self.turns) > max_turns or self._turn_tokens() > turn_budget):
+            if len(self.turns) == 1:
+                # A single turn over budget is cut rather than dropped.
+                turn = self.turns[0]
+                turn["content"] = turn["content"][: max(0, turn_budget * 4 - len(turn["role"]) - 2)]
+                break
+            oldest = self.turns.pop(0)
+            self.summary.append(digest(oldest["role"], oldest["content"]))
+        while self.summary and estimate_tokens("\n".join(self.summary)) > summary_budget:
+            self.summary.pop(0)
+
+    def _turn_tokens(self) -> int:
+        return sum(estimate_tokens(f"{t['role']}: {t['content']}") for t in self.turns)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        if self.summary:
+            lines.append("Earlier turns (summarised):")
+            lines.extend(f"- {line}" for line in self.summary)
+        lines.extend(f"{t['role']}: {t['content']}" for t in self.turns)
+        return "\n".join(lines)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Session":
+        return cls(**json.loads(raw))
+
+
+class InMemorySessionStore:
+    def __init__(self, max_items: int = 1000, ttl_s: int = 1800, clock: Callable[[], float] = time.time) -> None:
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Least recently used first.
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if self._clock() - session.updated_at > self.ttl_s:
+                del self._sessions[session_id]
+                self._expirations += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            # A copy, so a request only changes the stored session by saving it.
+            return replace(session, summary=list(session.summary), turns=[dict(t) for t in session.turns])
+
+    def save(self, session: Session) -> None:
+        with self._lock:
+            session.updated_at = self._clock()
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.max_items:
+                self._sessions.popitem(last=False)
+                self._evictions += 1
+
+    def update(self, session: Session, change: Callable[[Session], None]) -> Session:
+        # Applies change to the stored session (or to session if there is none)
+        # and saves, atomically, so concurrent turns are merged instead of the
+        # last save overwriting the others.
+        with self._lock:
+            current = self._sessions.get(session.session_id)
+            if current is None or self._clock() - current.updated_at > self.ttl_s:
+                current = session
+            change(current)
+            current.updated_at = self._clock()
+            self._sessions[current.session_id] = current
+            self._sessions.move_to_end(current.session_id)
+            while len(self._sessions) > self.max_items:
+                self._sessions.popitem(last=False)
+                self._evictions += 1
+            return replace(current, summary=list(current.summary), turns=[dict(t) for t in current.turns])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._sessions), "evictions": self._evictions, "expirations": self._expirations}
+
+
+class SqliteSessionStore:
+    def __init__(
+        self, path: Path, max_items: int = 1000, ttl_s: int = 1800, clock: Callable[[], float] = time.time
+    ) -> None:
+        self.path = Path(path)
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+        self._conn.commit()
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE session_id = ? AND updated_at >= ?",
+                (session_id, self._clock() - self.ttl_s),
+            ).fetchone()
+        return Session.from_json(row[0]) if row else None
+
+    def save(self, session: Session) -> None:
+        with self._lock:
+            self._write(session)
+            self._conn.commit()
+
+    def update(self, session: Session, change: Callable[[Session], None]) -> Session:
+        # Read, change and write in one write transaction, so turns saved by
+        # other requests (or other processes sharing the file) are kept.
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data FROM sessions WHERE session_id = ? AND updated_at >= ?",
+                    (session.session_id, self._clock() - self.ttl_s),
+                ).fetchone()
+                current = Session.from_json(row[0]) if row else session
+                change(current)
+                self._write(current)
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+            return current
+
+    def _write(self, session: Session) -> None:
+        now = self._clock()
+        session.updated_at = now
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+            (session.session_id, session.to_json(), now),
+        )
+        self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_s,))
+        self._conn.execute(
+            "DELETE FROM sessions WHERE session_id IN "
+            "(SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_items,),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]}
+
+
+_stores: Dict[Tuple[str, str], object] = {}
+_stores_lock = threading.Lock()
+
+
+def session_store(backend: str, path: str, max_items: int, ttl_s: int):
+    key = (backend, path if backend == "sqlite" else "")
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                if backend == "sqlite":
+                    store = SqliteSessionStore(Path(path), max_items=max_items, ttl_s=ttl_s)
+                else:
+                    store = InMemorySessionStore(max_items=max_items, ttl_s=ttl_s)
+                _stores[key] = store
+    return store
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from .tracing import span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Set per request by the HTTP middleware so stage timings can be split by endpoint.
+current_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("current_endpoint", default="none")
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # Per label set: [count per bucket (non-cumulative) + overflow, sum, count]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, totals = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0, 0.0]))
+            counts[idx] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def count(self, **labels: str) -> int:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            item = self._values.get(key)
+            return int(item[1][1]) if item else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(c), list(t))) for k, (c, t) in self._values.items())
+        for key, (counts, (total, count)) in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                le = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(count)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[object] = []
+        self._callbacks: List[Tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_callback(self, name: str, kind: str, help: str, fn: Callable[[], Iterable[Sample]]) -> None:
+        # For values owned elsewhere (cache and pool stats), read at scrape time.
+        self._callbacks = [c for c in self._callbacks if c[0] != name]
+        self._callbacks.append((name, kind, help, fn))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, kind, help, fn in self._callbacks:
+            lines.extend([f"# HELP {name} {help}", f"# TYPE {name} {kind}"])
+            for labels, value in fn():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "cds_stage_latency_seconds", "Latency of each pipeline stage", ("endpoint", "stage")
+)
+REQUEST_LATENCY = REGISTRY.histogram(
+    "cds_request_latency_seconds", "End-to-end HTTP request latency", ("endpoint", "method")
+)
+RESPONSES = REGISTRY.counter("cds_responses_total", "Responses by endpoint and status", ("endpoint", "status"))
+DEGRADED = REGISTRY.counter(
+    "cds_degraded_responses_total", "Degraded responses by endpoint and error code", ("endpoint", "code")
+)
+RETRIES = REGISTRY.counter("cds_retries_total", "Retry attempts after a failed dependency call", ("operation",))
+BREAKER_TRANSITIONS = REGISTRY.counter(
+    "cds_breaker_transitions_total", "Circuit breaker state changes", ("breaker", "state")
+)
+
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[None]:
+    # Every timed stage is also a span in the request trace.
+    started = time.perf_counter()
+    try:
+        with span(name, **attributes):
+            yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - started, endpoint=current_endpoint.get(), stage=name)
+
+
+def stats_samples(stats: Dict[str, int], **labels: str) -> List[Sample]:
+    return [({**labels, "event": key}, float(value)) for key, value in stats.items()]
@@ -18,6 +18,8 @@ class Citation(BaseModel):
     page: int = Field(..., ge=1)
     chunk_id: str
     excerpt: str
+    start: Optional[int] = Field(None, ge=0, description="Excerpt start offset in the chunk text")
+    end: Optional[int] = Field(None, ge=0, description="Excerpt end offset in the chunk text")
 
 
 class AgentOutput(BaseModel):
@@ -36,6 +38,12 @@ class AssessRequest(BaseModel):
     patient_id: constr(strip_whitespace=True, min_length=1, max_length=64)
 
 
+class BatchAssessRequest(BaseModel):
+    patient_ids: List[constr(strip_whitespace=True, min_length=1, max_length=64)] = Field(
+        ..., min_length=1, max_length=500
+    )
+
+
 class ChatMessage(BaseModel):
     role: constr(strip_whitespace=True, min_length=1, max_length=16)
     content: constr(strip_whitespace=True, min_length=1, max_length=4000)
@@ -43,7 +51,9 @@ class ChatMessage(BaseModel):
 
 class ChatRequest(BaseModel):
     question: constr(strip_whitespace=True, min_length=1, max_length=4000)
-    history: Optional[List[ChatMessage]] = None
+    session_id: Optional[constr(strip_whitespace=True, min_length=1, max_length=64)] = None
+    # Only read when a session starts; later turns come from the server-side session.
+    history: Optional[List[ChatMessage]] = Field(None, max_length=20)
 
 
 class AssessResponse(BaseModel):
@@ -56,7 +66,21 @@ class AssessResponse(BaseModel):
 
 class ChatResponse(BaseModel):
     correlation_id: str
+    session_id: Optional[str] = None
     disclaimer: str
     result: AgentOutput
     status: constr(strip_whitespace=True, min_length=1) = "ok"
     errors: Optional[List[ErrorInfo]] = None
+
+
+class BatchAssessItem(BaseModel):
+    patient_id: str
+    status: constr(strip_whitespace=True, min_length=1)
+    response: Optional[AssessResponse] = None
+    errors: Optional[List[ErrorInfo]] = None
+
+
+class BatchAssessResponse(BaseModel):
+    correlation_id: str
+    items: List[BatchAssessItem]
+    distinct_symptom_sets: int
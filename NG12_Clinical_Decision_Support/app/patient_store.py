@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class JsonPatientRepository:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._version: Optional[Tuple[int, int]] = None
+        self._patients: Dict[str, Any] = {}
+        self.loads = 0
+
+    def all(self) -> Dict[str, Any]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return {}
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self._version:
+            return self._patients
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock.
+            if version != self._version:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self._patients = {p.get("patient_id"): p for p in data}
+                self._version = version
+                self.loads += 1
+        return self._patients
+
+    def get(self, patient_id: str) -> Dict[str, Any]:
+        return self.all().get(patient_id, {})
+
+
+class SqlitePatientRepository:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._version: Optional[Tuple[int, int]] = None
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        # Rebuilds replace the file, so reopen when it is a different inode.
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if self._conn is None or version != self._version:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+            )
+            self._version = version
+        return self._conn
+
+    def get(self, patient_id: str) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return {}
+            row = conn.execute(
+                "SELECT record FROM patients WHERE patient_id = ?", (patient_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def get_many(self, patient_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        ids = list(dict.fromkeys(patient_ids))
+        found: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return {}
+            # One query per 500 ids keeps under SQLite's bound-parameter limit.
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT patient_id, record FROM patients WHERE patient_id IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                found.update((pid, json.loads(record)) for pid, record in rows)
+        return found
+
+
+def build_patient_index(json_path: Path, db_path: Path) -> int:
+    data = json.loads(Path(json_path).read_text(encoding="utf-8"))
+    db_path = Path(db_path)
+    tmp_path = db_path.with_suffix(db_path.suffix + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("CREATE TABLE patients (patient_id TEXT PRIMARY KEY, record TEXT NOT NULL)")
+        conn.executemany(
+            "INSERT OR REPLACE INTO patients (patient_id, record) VALUES (?, ?)",
+            ((p["patient_id"], json.dumps(p)) for p in data if p.get("patient_id")),
+        )
+        conn.commit()
+        count = conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+    finally:
+        conn.close()
+    # Swap in atomically so readers never see a half-built index.
+    tmp_path.replace(db_path)
+    return count
@@ -1,14 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
-from typing import Any, Dict, List
-
-import chromadb
-import vertexai
-from vertexai.language_models import TextEmbeddingModel
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
 
+from .clients import get_pool
+from .canonical import normalize_text
+from .citations import index_for_collection
 from .config import settings
-from .resilience import CircuitBreaker, RetryPolicy
+from .deadline import DeadlineExceeded, remaining, with_timeout
+from .embedding_cache import EmbeddingCache
+from .health import mark_ok
+from .lexical import BM25Index, reciprocal_rank_fusion
+from .metrics import RETRIES, stage
+from .tracing import span
+from .vector_index import NumpyVectorIndex, collection_fingerprint
+from .resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, SingleFlight, breaker_for
 
 
 @dataclass
@@ -18,53 +26,180 @@ class Chunk:
     score: float
 
 
+class Retrieval(list):
+    # Ranked chunks; lexical_only is set when dense retrieval was unavailable.
+    def __init__(self, chunks: Iterable[Chunk] = (), lexical_only: bool = False) -> None:
+        super().__init__(chunks)
+        self.lexical_only = lexical_only
+
+
+class EmbeddingError(RuntimeError):
+    pass
+
+
+class VectorStoreError(RuntimeError):
+    pass
+
+
 class VertexEmbeddingClient:
-    def __init__(self) -> None:
-        vertexai.init(project=settings.project_id, location=settings.location)
-        self._model = TextEmbeddingModel.from_pretrained(settings.embedding_model)
+    def __init__(self, cache: Optional[EmbeddingCache] = None, breaker: Optional[CircuitBreaker] = None) -> None:
+        self._model = get_pool(settings.project_id, settings.location).embedding_model(settings.embedding_model)
+        self._cache = cache
+        self._breaker = breaker or breaker_for("embedding")
+
+    async def embed(self, text: str) -> List[float]:
+        if self._cache is not None:
+            cached = await self._cache.aget(text)
+            if cached is not None:
+                return cached
+        # Cache hits say nothing about the endpoint, so only remote calls touch the breaker.
+        if not self._breaker.allow():
+            raise CircuitOpenError(self._breaker.name)
+        try:
+            with stage("embed"):
+                embeddings = await with_timeout(self._model.get_embeddings_async([text]), settings.request_timeout_s)
+        except DeadlineExceeded:
+            self._breaker.release()
+            raise
+        except Exception as exc:
+            self._breaker.record_failure()
+            raise EmbeddingError(f"{type(exc).__name__}: {exc}") from exc
+        self._breaker.record_success()
+        mark_ok("embedding")
+        vector = embeddings[0].values
+        if self._cache is not None:
+            await self._cache.aset(text, vector)
+        return vector
 
-    def embed(self, text: str) -> List[float]:
-        embeddings = self._model.get_embeddings([text])
-        return embeddings[0].values
+    def cache_stats(self) -> Dict[str, int]:
+        return self._cache.stats() if self._cache is not None else {}
+
+    def clear_cache(self) -> None:
+        if self._cache is not None:
+            self._cache.clear()
 
 
 class ChromaRAG:
     def __init__(self) -> None:
+        import chromadb
+
         self._client = chromadb.PersistentClient(path=settings.chroma_path)
         self._collection = self._client.get_collection(settings.collection_name)
-        self._embedder = VertexEmbeddingClient()
-        self._breaker = CircuitBreaker(
-            failure_threshold=settings.breaker_threshold,
-            reset_after_s=settings.breaker_reset_s,
+        if settings.vector_backend == "numpy":
+            self._collection = self._load_vector_index(self._collection)
+        self._embedder = VertexEmbeddingClient(
+            cache=EmbeddingCache(
+                model_name=settings.embedding_model,
+                max_items=settings.embedding_cache_max_items,
+                path=settings.embedding_cache_path,
+                disk_max_items=settings.embedding_cache_disk_max_items,
+            )
         )
+        self._breaker = breaker_for("vector_store")
         self._retry = RetryPolicy(
             max_attempts=settings.retry_max_attempts,
             backoff_s=settings.retry_backoff_s,
+            max_backoff_s=settings.retry_max_backoff_s,
+            min_attempt_s=settings.retry_min_attempt_s,
         )
+        self._build_text_indexes()
+        self._inflight = SingleFlight()
 
-    def query(self, question: str, top_k: int) -> List[Chunk]:
+    @staticmethod
+    def _load_vector_index(collection) -> NumpyVectorIndex:
+        path = Path(settings.vector_index_path)
+        current = collection.get(include=["metadatas"])
+        fingerprint = collection_fingerprint(current.get("ids", []), current.get("metadatas") or [])
+        if NumpyVectorIndex.exists(path):
+            index = NumpyVectorIndex.load(path)
+            if index.fingerprint == fingerprint:
+                return index
+        # Missing or built from an older ingestion run: re-export from Chroma.
+        NumpyVectorIndex.export_from_collection(collection, path)
+        return NumpyVectorIndex.load(path)
+
+    def _build_text_indexes(self) -> None:
+        data = self._collection.get(include=["documents", "metadatas"])
+        ids, documents, metadatas = data.get("ids", []), data.get("documents") or [], data.get("metadatas") or []
+        self._citations = index_for_collection(ids, documents, collection_fingerprint(ids, metadatas))
+        self._lexical = BM25Index.build(ids, documents, metadatas) if settings.hybrid_retrieval else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "embedding_cache": self._embedder.cache_stats(),
+            "lexical_documents": len(self._lexical) if self._lexical is not None else 0,
+            "citation_index_chunks": len(self._citations),
+            "singleflight": self._inflight.stats(),
+        }
+
+    async def query(self, question: str, top_k: int) -> Retrieval:
+        with span("retrieval", top_k=top_k, hybrid=self._lexical is not None) as current:
+            result = await self._inflight.do((normalize_text(question), top_k), lambda: self._query(question, top_k))
+            if current is not None and result.lexical_only:
+                current.attributes["lexical_only"] = True
+            return result
+
+    async def _query(self, question: str, top_k: int) -> Retrieval:
+        if self._lexical is None:
+            return Retrieval(await self._dense_query(question, top_k))
+
+        candidates = top_k * 2
+        lexical = self._lexical_query(question, candidates)
+        try:
+            dense = await self._dense_query(question, candidates)
+        except (CircuitOpenError, DeadlineExceeded, EmbeddingError, VectorStoreError):
+            # Embedding or vector store outage: answer from the lexical index
+            # alone, and say so. Anything else is a bug and propagates.
+            return Retrieval(self._fuse([[], lexical], top_k), lexical_only=True)
+        return Retrieval(self._fuse([dense, lexical], top_k))
+
+    def _lexical_query(self, question: str, top_k: int) -> List[Chunk]:
+        index = self._lexical
+        with stage("lexical_query"):
+            hits = index.search(question, top_k)
+        return [
+            Chunk(text=index.documents[i], metadata=index.metadatas[i], score=score)
+            for i, score in hits
+        ]
+
+    def _fuse(self, rankings: List[List[Chunk]], top_k: int) -> List[Chunk]:
+        by_id: Dict[str, Chunk] = {}
+        ranked_ids: List[List[str]] = []
+        for chunks in rankings:
+            ids: List[str] = []
+            for chunk in chunks:
+                chunk_id = chunk.metadata.get("chunk_id", "")
+                by_id.setdefault(chunk_id, chunk)
+                ids.append(chunk_id)
+            ranked_ids.append(ids)
+        fused = reciprocal_rank_fusion(ranked_ids, k=settings.rrf_k)[:top_k]
+        return [
+            Chunk(text=by_id[chunk_id].text, metadata=by_id[chunk_id].metadata, score=score)
+            for chunk_id, score in fused
+        ]
+
+    async def _dense_query(self, question: str, top_k: int) -> List[Chunk]:
         if self._breaker.is_open():
-            return []
+            raise CircuitOpenError(self._breaker.name)
 
         attempt = 0
         last_err: Exception | None = None
         while attempt < self._retry.max_attempts:
             attempt += 1
             try:
-                embedding = self._embedder.embed(question)
-                results = self._collection.query(
-                    query_embeddings=[embedding],
-                    n_results=top_k,
-                    include=["documents", "metadatas", "distances"],
-                )
-                self._breaker.record_success()
+                embedding = await self._embedder.embed(question)
+                results = await self._vector_query(embedding, top_k, attempt)
                 break
+            except (CircuitOpenError, DeadlineExceeded):
+                raise
             except Exception as exc:
                 last_err = exc
-                self._breaker.record_failure()
                 if attempt < self._retry.max_attempts:
-                    import time
-                    time.sleep(self._retry.backoff_s)
+                    delay = self._retry.next_delay(attempt, remaining())
+                    if delay is None:
+                        raise
+                    RETRIES.inc(operation="retrieval")
+                    await asyncio.sleep(delay)
         else:
             if last_err:
                 raise last_err
@@ -79,3 +214,27 @@ class ChromaRAG:
                 continue
             chunks.append(Chunk(text=doc, metadata=meta, score=dist))
         return chunks
+
+    async def _vector_query(self, embedding: List[float], top_k: int, attempt: int) -> Dict[str, Any]:
+        if not self._breaker.allow():
+            raise CircuitOpenError(self._breaker.name)
+        try:
+            with stage("vector_query", attempt=attempt):
+                results = await with_timeout(
+                    asyncio.to_thread(
+                        self._collection.query,
+                        query_embeddings=[embedding],
+                        n_results=top_k,
+                        include=["documents", "metadatas", "distances"],
+                    ),
+                    settings.request_timeout_s,
+                )
+        except DeadlineExceeded:
+            self._breaker.release()
+            raise
+        except Exception as exc:
+            self._breaker.record_failure()
+            raise VectorStoreError(f"{type(exc).__name__}: {exc}") from exc
+        self._breaker.record_success()
+        mark_ok("vector_store")
+        return results
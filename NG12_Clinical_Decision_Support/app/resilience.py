@@ -1,60 +1,328 @@
 from __future__ import annotations
 
+import asyncio
+import random
+import sys
+import threading
 import time
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from .config import settings
+from .metrics import BREAKER_TRANSITIONS
 
 
 @dataclass
 class RetryPolicy:
     max_attempts: int = 2
     backoff_s: float = 0.5
+    max_backoff_s: float = 8.0
+    min_attempt_s: float = 1.0
+
+    def next_delay(self, attempt: int, remaining: Optional[float] = None) -> Optional[float]:
+        # Exponential backoff with jitter between half and all of the step. Returns
+        # None when the remaining budget cannot fit the wait plus min_attempt_s.
+        step = min(self.backoff_s * (2 ** (attempt - 1)), self.max_backoff_s)
+        delay = random.uniform(step / 2, step)
+        if remaining is None:
+            return delay
+        spare = remaining - self.min_attempt_s
+        if spare <= 0:
+            return None
+        return min(delay, spare)
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, name: str) -> None:
+        super().__init__(f"Circuit breaker '{name}' is open")
+        self.name = name
+
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
 
 
 class CircuitBreaker:
-    def __init__(self, failure_threshold: int = 3, reset_after_s: int = 30) -> None:
+    # Opens when the failure rate over the last window_s seconds reaches
+    # error_rate with at least failure_threshold failures. After reset_after_s
+    # it goes half-open and admits half_open_probes calls; that many successes
+    # close it, any failure reopens it.
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_after_s: float = 30,
+        name: str = "default",
+        window_s: float = 60.0,
+        error_rate: float = 0.5,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
         self.failure_threshold = failure_threshold
         self.reset_after_s = reset_after_s
+        self.name = name
+        self.window_s = window_s
+        self.error_rate = error_rate
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._events: Deque[Tuple[float, bool]] = deque()
         self._failures = 0
-        self._opened_at: Optional[float] = None
+        self._probes: List[float] = []
+        self._probe_successes = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh(self._clock())
+            return self._state
 
     def is_open(self) -> bool:
-        if self._opened_at is None:
-            return False
-        if (time.time() - self._opened_at) >= self.reset_after_s:
-            self._opened_at = None
-            self._failures = 0
-            return False
-        return True
+        # True when a call would be rejected; does not reserve a probe.
+        with self._lock:
+            now = self._clock()
+            self._refresh(now)
+            if self._state == HALF_OPEN:
+                return len(self._probes) >= self.half_open_probes
+            return self._state == OPEN
+
+    def allow(self) -> bool:
+        # Call immediately before the dependency call. In half-open this takes
+        # a probe slot, released by record_success or record_failure.
+        with self._lock:
+            now = self._clock()
+            self._refresh(now)
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN or len(self._probes) >= self.half_open_probes:
+                return False
+            self._probes.append(now)
+            return True
 
     def record_success(self) -> None:
-        self._failures = 0
-        self._opened_at = None
+        with self._lock:
+            now = self._clock()
+            if self._state == HALF_OPEN:
+                if self._probes:
+                    self._probes.pop(0)
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._reset()
+                    self._transition(CLOSED)
+            elif self._state == CLOSED:
+                self._record(now, True)
 
     def record_failure(self) -> None:
-        self._failures += 1
-        if self._failures >= self.failure_threshold:
-            self._opened_at = time.time()
+        with self._lock:
+            now = self._clock()
+            if self._state == HALF_OPEN:
+                self._open(now)
+            elif self._state == CLOSED:
+                self._record(now, False)
+                total = len(self._events)
+                if self._failures >= self.failure_threshold and self._failures / total >= self.error_rate:
+                    self._open(now)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh(self._clock())
+            return {"state": self._state, "window_calls": len(self._events), "window_failures": self._failures}
+
+    def release(self) -> None:
+        # The call ended without telling us anything about the dependency
+        # (e.g. the request ran out of time first); free a half-open probe slot.
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes.pop(0)
+
+    def _record(self, now: float, ok: bool) -> None:
+        self._events.append((now, ok))
+        if not ok:
+            self._failures += 1
+        while self._events and self._events[0][0] <= now - self.window_s:
+            _, old_ok = self._events.popleft()
+            if not old_ok:
+                self._failures -= 1
+
+    def _refresh(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= self.reset_after_s:
+            self._state = HALF_OPEN
+            self._probes = []
+            self._probe_successes = 0
+            self._transition(HALF_OPEN)
+        elif self._state == HALF_OPEN:
+            # A probe whose caller never reported back (e.g. cancelled) frees its slot.
+            self._probes = [t for t in self._probes if now - t < self.reset_after_s]
+
+    def _open(self, now: float) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._transition(OPEN)
+
+    def _reset(self) -> None:
+        self._state = CLOSED
+        self._events.clear()
+        self._failures = 0
+        self._probes = []
+        self._probe_successes = 0
+
+    def _transition(self, state: str) -> None:
+        BREAKER_TRANSITIONS.inc(breaker=self.name, state=state)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(name: str) -> CircuitBreaker:
+    # One shared breaker per dependency ("generation", "embedding", "vector_store").
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    failure_threshold=settings.breaker_threshold,
+                    reset_after_s=settings.breaker_reset_s,
+                    name=name,
+                    window_s=settings.breaker_window_s,
+                    error_rate=settings.breaker_error_rate,
+                    half_open_probes=settings.breaker_half_open_probes,
+                )
+                _breakers[name] = breaker
+    return breaker
+
+
+def breakers() -> Dict[str, CircuitBreaker]:
+    return dict(_breakers)
+
+
+def _estimate_size(value: Any) -> int:
+    if hasattr(value, "model_dump_json"):
+        return len(value.model_dump_json().encode("utf-8"))
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return sys.getsizeof(value)
 
 
 class ResponseCache:
-    def __init__(self, max_items: int = 128, ttl_s: int = 600) -> None:
+    def __init__(
+        self,
+        max_items: int = 128,
+        ttl_s: int = 600,
+        max_bytes: int = 0,
+        size_of: Callable[[Any], int] = _estimate_size,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
         self.max_items = max_items
         self.ttl_s = ttl_s
-        self._store: Dict[str, Dict[str, Any]] = {}
+        self.max_bytes = max_bytes
+        self._size_of = size_of
+        self._clock = clock
+        self._lock = threading.Lock()
+        # LRU order: least recently used first.
+        self._store: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        # Write order: with a single TTL this is also expiry order.
+        self._expires: "OrderedDict[str, float]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
 
     def get(self, key: str) -> Optional[Any]:
-        item = self._store.get(key)
-        if not item:
-            return None
-        if time.time() - item["ts"] > self.ttl_s:
-            self._store.pop(key, None)
-            return None
-        return item["value"]
+        with self._lock:
+            self._expire(self._clock())
+            item = self._store.get(key)
+            if item is None:
+                self._misses += 1
+                return None
+            self._store.move_to_end(key)
+            self._hits += 1
+            return item[0]
 
     def set(self, key: str, value: Any) -> None:
-        if len(self._store) >= self.max_items:
-            # Remove oldest item
-            oldest_key = min(self._store, key=lambda k: self._store[k]["ts"])
-            self._store.pop(oldest_key, None)
-        self._store[key] = {"value": value, "ts": time.time()}
+        size = self._size_of(value)
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            self._remove(key)
+            if self.max_bytes and size > self.max_bytes:
+                return
+            self._store[key] = (value, size)
+            self._expires[key] = now + self.ttl_s
+            self._bytes += size
+            while self._store and (
+                len(self._store) > self.max_items or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                oldest_key = next(iter(self._store))
+                self._remove(oldest_key)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._store.clear()
+            self._expires.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._expire(self._clock())
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "size": len(self._store),
+                "bytes": self._bytes,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(self._clock())
+            return len(self._store)
+
+    def _expire(self, now: float) -> None:
+        while self._expires:
+            key, expires_at = next(iter(self._expires.items()))
+            if expires_at > now:
+                break
+            self._remove(key)
+            self._expirations += 1
+
+    def _remove(self, key: str) -> None:
+        item = self._store.pop(key, None)
+        if item is not None:
+            self._bytes -= item[1]
+        self._expires.pop(key, None)
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self._calls = 0
+        self._coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            # The shared work runs as its own task so one caller's cancellation
+            # does not fail everyone else waiting on it.
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._finished(key, t))
+            self._calls += 1
+        else:
+            self._coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self._calls, "coalesced": self._coalesced, "in_flight": len(self._inflight)}
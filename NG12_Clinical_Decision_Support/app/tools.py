@@ -1,20 +1,49 @@
 from __future__ import annotations
 
-import json
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
+
+from .config import settings
+from .patient_store import JsonPatientRepository, SqlitePatientRepository
+from .tracing import span
 
 
 DATA_PATH = Path("data/patients.json")
 
+_json_repos: Dict[Path, JsonPatientRepository] = {}
+_sqlite_repos: Dict[Path, SqlitePatientRepository] = {}
+
+
+def _json_repository(path: Path) -> JsonPatientRepository:
+    repo = _json_repos.get(path)
+    if repo is None:
+        repo = _json_repos.setdefault(path, JsonPatientRepository(path))
+    return repo
+
+
+def _sqlite_repository(path: Path) -> SqlitePatientRepository:
+    repo = _sqlite_repos.get(path)
+    if repo is None:
+        repo = _sqlite_repos.setdefault(path, SqlitePatientRepository(path))
+    return repo
+
 
 def load_patients() -> Dict[str, Any]:
-    if not DATA_PATH.exists():
-        return {}
-    data = json.loads(DATA_PATH.read_text(encoding="utf-8"))
-    return {p.get("patient_id"): p for p in data}
+    return _json_repository(DATA_PATH).all()
 
 
 def get_patient(patient_id: str) -> Dict[str, Any]:
-    patients = load_patients()
-    return patients.get(patient_id, {})
+    with span("get_patient", backend=settings.patient_store):
+        if settings.patient_store == "sqlite":
+            return _sqlite_repository(Path(settings.patient_db_path)).get(patient_id)
+        patients = load_patients()
+        return patients.get(patient_id, {})
+
+
+def get_patients(patient_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    # One lookup for a whole batch; ids that are not found are left out.
+    with span("get_patient", backend=settings.patient_store, patients=len(patient_ids)):
+        if settings.patient_store == "sqlite":
+            return _sqlite_repository(Path(settings.patient_db_path)).get_many(patient_ids)
+        patients = load_patients()
+        return {pid: patients[pid] for pid in patient_ids if pid in patients}
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Protocol
+
+from .config import settings
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start: float
+    duration_ms: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+class Trace:
+    # One per request. Spans from tasks and threads spawned by the request share it.
+    def __init__(self, trace_id: str) -> None:
+        self.trace_id = trace_id
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def server_timing(self) -> str:
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration_ms
+        entries = [f"{name};dur={ms:.1f}" for name, ms in totals.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: List[Span]) -> None: ...
+
+
+class JsonLinesExporter:
+    # Requests only enqueue; one background thread does the file I/O, so export
+    # never blocks the event loop. A full queue drops traces instead of waiting.
+    def __init__(self, path: Path, max_bytes: int = 0, backups: int = 3, queue_size: int = 1000) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._written = 0
+        self._dropped = 0
+
+    def export(self, spans: List[Span]) -> None:
+        if not spans:
+            return
+        lines = "".join(json.dumps(asdict(span)) + "\n" for span in spans)
+        self._start()
+        try:
+            self._queue.put_nowait(lines)
+        except queue.Full:
+            with self._lock:
+                self._dropped += len(spans)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        # True once everything queued so far is on disk.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(left)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"queued": self._queue.qsize(), "written": self._written, "dropped": self._dropped}
+
+    def _start(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            lines = self._queue.get()
+            try:
+                self._write(lines)
+            except Exception:
+                # Tracing must never fail a request, nor stop the writer.
+                pass
+            finally:
+                self._queue.task_done()
+
+    def _write(self, lines: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.max_bytes and self.path.exists() and self.path.stat().st_size + len(lines) > self.max_bytes:
+            self._rotate()
+        with self.path.open("a", encoding="utf-8") as fh:
+            fh.write(lines)
+        with self._lock:
+            self._written += lines.count("\n")
+
+    def _rotate(self) -> None:
+        # traces.jsonl -> traces.jsonl.1 -> traces.jsonl.2 ...; the oldest falls off.
+        if self.backups <= 0:
+            self.path.unlink(missing_ok=True)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{i}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+
+
+class InMemoryExporter:
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]) -> None:
+        self.spans.extend(spans)
+
+
+class NullExporter:
+    def export(self, spans: List[Span]) -> None:
+        return None
+
+
+_exporter: Optional[SpanExporter] = None
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_parent: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("parent_span", default=None)
+
+
+def get_exporter() -> SpanExporter:
+    global _exporter
+    if _exporter is None:
+        if settings.trace_exporter == "jsonl":
+            _exporter = JsonLinesExporter(
+                Path(settings.trace_path),
+                max_bytes=settings.trace_max_bytes,
+                backups=settings.trace_backups,
+                queue_size=settings.trace_queue_size,
+            )
+        else:
+            _exporter = NullExporter()
+    return _exporter
+
+
+def set_exporter(exporter: SpanExporter) -> None:
+    global _exporter
+    _exporter = exporter
+
+
+def flush_traces(timeout: float) -> None:
+    flush = getattr(_exporter, "flush", None)
+    if flush is not None:
+        flush(timeout)
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+def correlation_id() -> Optional[str]:
+    trace = _trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+@contextmanager
+def start_trace(trace_id: str) -> Iterator[Trace]:
+    trace = Trace(trace_id)
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+def export_trace(trace: Trace) -> None:
+    try:
+        get_exporter().export(list(trace.spans))
+    except Exception:
+        # Tracing must never fail a request.
+        pass
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+    current = Span(
+        trace_id=trace.trace_id,
+        span_id=os.urandom(8).hex(),
+        parent_id=_parent.get(),
+        name=name,
+        start=time.time(),
+        attributes=dict(attributes),
+    )
+    token = _parent.set(current.span_id)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as exc:
+        current.attributes["error"] = type(exc).__name__
+        raise
+    finally:
+        current.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        try:
+            _parent.reset(token)
+        except ValueError:
+            # Async generators can be closed from another context.
+            pass
+        trace.add(current)
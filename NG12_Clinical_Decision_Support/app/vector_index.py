@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.json"
+LOAD_ATTEMPTS = 5
+
+
+def collection_space(collection: Any) -> str:
+    config = getattr(collection, "configuration", None) or {}
+    space = (config.get("hnsw") or {}).get("space") if isinstance(config, dict) else None
+    return space or (collection.metadata or {}).get("hnsw:space", "l2")
+
+
+def collection_fingerprint(ids: Sequence[str], metadatas: Sequence[Optional[Dict[str, Any]]]) -> str:
+    digest = hashlib.sha256()
+    for chunk_id, meta in sorted(zip(ids, metadatas), key=lambda item: item[0]):
+        digest.update(f"{chunk_id}\x1f{(meta or {}).get('content_hash', '')}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _read_chunks(path: Path) -> Dict[str, Any]:
+    return json.loads((Path(path) / CHUNKS_FILE).read_text(encoding="utf-8"))
+
+
+@contextmanager
+def _export_lock(path: Path) -> Iterator[None]:
+    with open(path.with_name(f".{path.name}.lock"), "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _adopt_legacy_directory(path: Path) -> str:
+    # Returns the version `path` points at. Indexes exported before versioning
+    # are plain directories; they are renamed into a version once so the
+    # symlink can replace them.
+    if path.is_symlink():
+        return os.readlink(path)
+    if not path.exists():
+        return ""
+    legacy = Path(tempfile.mkdtemp(prefix=f".{path.name}.v-", dir=path.parent))
+    os.replace(path, legacy)
+    return legacy.name
+
+
+def _prune_versions(path: Path, keep: Set[str]) -> None:
+    # The previous version is kept for readers that resolved the link just
+    # before the swap; anything older, or left by a failed export, goes.
+    for candidate in path.parent.glob(f".{path.name}.v-*"):
+        if candidate.name not in keep:
+            if candidate.is_symlink():
+                candidate.unlink()
+            else:
+                shutil.rmtree(candidate, ignore_errors=True)
+
+
+class NumpyVectorIndex:
+    # Exact top-k over a contiguous float32 matrix. query() and get() return
+    # Chroma-shaped results so ChromaRAG can use it in place of a collection.
+
+    def __init__(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        matrix: np.ndarray,
+        space: str = "l2",
+        fingerprint: str = "",
+    ) -> None:
+        if space not in {"l2", "cosine", "ip"}:
+            raise ValueError(f"Unsupported distance space: {space}")
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.matrix = matrix
+        self.space = space
+        self.fingerprint = fingerprint
+        self._norms_sq = np.einsum("ij,ij->i", matrix, matrix)
+        self._norms = np.sqrt(self._norms_sq)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def export_from_collection(collection: Any, path: Path) -> int:
+        data = collection.get(include=["embeddings", "documents", "metadatas"])
+        embeddings = data.get("embeddings")
+        if embeddings is None or len(embeddings) == 0:
+            raise ValueError("Collection has no embeddings to export")
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        ids = list(data.get("ids", []))
+        metadatas = [m or {} for m in (data.get("metadatas") or [])]
+        chunks = {
+            "space": collection_space(collection),
+            "fingerprint": collection_fingerprint(ids, metadatas),
+            "ids": ids,
+            "documents": list(data.get("documents") or []),
+            "metadatas": metadatas,
+        }
+        # Each export is written to its own version directory and `path` is a
+        # symlink that is swapped in one rename, so readers always resolve a
+        # complete pair. The lock serialises exports from concurrent workers.
+        with _export_lock(path):
+            if NumpyVectorIndex.exists(path) and _read_chunks(path).get("fingerprint") == chunks["fingerprint"]:
+                return matrix.shape[0]
+            version = Path(tempfile.mkdtemp(prefix=f".{path.name}.v-", dir=path.parent))
+            link = version.with_name(version.name + ".link")
+            try:
+                np.save(version / EMBEDDINGS_FILE, matrix)
+                (version / CHUNKS_FILE).write_text(json.dumps(chunks), encoding="utf-8")
+                os.symlink(version.name, link)
+                previous = _adopt_legacy_directory(path)
+                os.replace(link, path)
+            except BaseException:
+                shutil.rmtree(version, ignore_errors=True)
+                if link.is_symlink():
+                    link.unlink()
+                raise
+            _prune_versions(path, keep={version.name, previous})
+        return matrix.shape[0]
+
+    @classmethod
+    def load(cls, path: Path) -> "NumpyVectorIndex":
+        # Resolved once so both files come from the same version. A version is
+        # only pruned once two newer ones are live, so a reader that raced that
+        # just resolves the link again.
+        for attempt in range(LOAD_ATTEMPTS):
+            version = Path(path).resolve()
+            try:
+                matrix = np.load(version / EMBEDDINGS_FILE, mmap_mode="r")
+                chunks = _read_chunks(version)
+                break
+            except FileNotFoundError:
+                if attempt == LOAD_ATTEMPTS - 1 or not Path(path).is_symlink():
+                    raise
+        return cls(
+            chunks["ids"],
+            chunks["documents"],
+            chunks["metadatas"],
+            matrix,
+            space=chunks.get("space", "l2"),
+            fingerprint=chunks.get("fingerprint", ""),
+        )
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return (Path(path) / EMBEDDINGS_FILE).exists() and (Path(path) / CHUNKS_FILE).exists()
+
+    def search(self, queries: Sequence[Sequence[float]], top_k: int) -> List[List[Tuple[int, float]]]:
+        q = np.asarray(queries, dtype=np.float32)
+        if q.ndim == 1:
+            q = q[None, :]
+        k = min(top_k, len(self.ids))
+        if k <= 0:
+            return [[] for _ in range(q.shape[0])]
+
+        dots = q @ self.matrix.T
+        if self.space == "l2":
+            # Squared L2, matching Chroma's reported distances.
+            dist = np.einsum("ij,ij->i", q, q)[:, None] + self._norms_sq[None, :] - 2.0 * dots
+        elif self.space == "cosine":
+            denom = np.linalg.norm(q, axis=1)[:, None] * self._norms[None, :]
+            dist = 1.0 - dots / np.maximum(denom, np.finfo(np.float32).tiny)
+        else:
+            dist = 1.0 - dots
+
+        if k < dist.shape[1]:
+            part = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        else:
+            part = np.broadcast_to(np.arange(dist.shape[1]), dist.shape)
+        rows = np.arange(dist.shape[0])[:, None]
+        order = np.argsort(dist[rows, part], axis=1)
+        top = part[rows, order]
+        return [[(int(i), float(dist[r, i])) for i in top[r]] for r in range(dist.shape[0])]
+
+    def query(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        n_results: int = 10,
+        include: Optional[Sequence[str]] = None,
+    ) -> Dict[str, List[List[Any]]]:
+        hits = self.search(query_embeddings, n_results)
+        return {
+            "ids": [[self.ids[i] for i, _ in row] for row in hits],
+            "documents": [[self.documents[i] for i, _ in row] for row in hits],
+            "metadatas": [[self.metadatas[i] for i, _ in row] for row in hits],
+            "distances": [[d for _, d in row] for row in hits],
+        }
+
+    def get(self, include: Optional[Sequence[str]] = None) -> Dict[str, List[Any]]:
+        return {"ids": list(self.ids), "documents": list(self.documents), "metadatas": list(self.metadatas)}
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import chromadb
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import agent, clients, main as app_main, tools, tracing  # noqa: E402
+from app.config import settings  # noqa: E402
+from benchmarks.standins import (  # noqa: E402
+    Profile,
+    RecordedEmbeddingModel,
+    RecordedGenerativeModel,
+    Recording,
+    StandInEmbeddingModel,
+    StandInGenerativeModel,
+)
+
+SYMPTOMS = [
+    "persistent hoarseness",
+    "visible haematuria",
+    "unexplained weight loss",
+    "dyspepsia",
+    "rectal bleeding",
+    "breast lump",
+    "dysphagia",
+    "haemoptysis",
+    "postmenopausal bleeding",
+    "change in bowel habit",
+    "iron-deficiency anaemia",
+    "unexplained lymphadenopathy",
+    "persistent cough",
+    "abdominal mass",
+    "skin lesion",
+    "testicular swelling",
+]
+
+
+def build_corpus(pages: int, chunks_per_page: int) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+    ids, docs, metas = [], [], []
+    for page in range(1, pages + 1):
+        for j in range(chunks_per_page):
+            symptom = SYMPTOMS[(page * chunks_per_page + j) % len(SYMPTOMS)]
+            chunk_id = f"ng12_p{page}_c{j}"
+            # The chunk id and a unique term keep every chunk's text, and so its
+            # stand-in embedding, distinct.
+            ids.append(chunk_id)
+            docs.append(
+                f"Recommendation 1.{page}.{j + 1} ({chunk_id}) Refer people using a suspected cancer pathway "
+                f"referral for an appointment within 2 weeks if they have {symptom}. Consider urgent investigation "
+                f"where {symptom} persists for more than 3 weeks in people aged 40 and over. Marker ref{page}x{j}."
+            )
+            metas.append({"source": "NG12 PDF", "page": page, "chunk_id": chunk_id})
+    return ids, docs, metas
+
+
+def install_backends(args: argparse.Namespace) -> Optional[Recording]:
+    recording = None
+    if args.replay:
+        recording = Recording(Path(args.replay), replay=True, latency_scale=args.replay_latency_scale)
+    elif args.record:
+        recording = Recording(Path(args.record))
+
+    if args.replay:
+        generative: Callable[[str], Any] = lambda name: None  # noqa: E731
+        embedding: Callable[[str], Any] = lambda name: None  # noqa: E731
+    elif args.backend == "vertex":
+        # Live Vertex AI, typically with --record to capture a replayable run.
+        clients.use_backends()
+        clients._init_vertex(settings.project_id, settings.location)
+        generative, embedding = clients._create_generative, clients._create_embedding
+    else:
+        generative = lambda name: StandInGenerativeModel(  # noqa: E731
+            Profile(args.gen_latency, args.gen_jitter, args.gen_error_rate, args.seed),
+            stream_delay_s=args.stream_delay,
+        )
+        embedding = lambda name: StandInEmbeddingModel(  # noqa: E731
+            Profile(args.embed_latency, args.embed_jitter, args.embed_error_rate, args.seed)
+        )
+
+    if recording is None:
+        clients.use_backends(generative, embedding)
+    else:
+        clients.use_backends(
+            lambda name: RecordedGenerativeModel(generative(name), recording),
+            lambda name: RecordedEmbeddingModel(embedding(name), recording),
+        )
+    return recording
+
+
+def prepare_environment(workdir: Path, args: argparse.Namespace) -> None:
+    settings.chroma_path = str(workdir / "chroma")
+    settings.collection_name = "ng12_bench"
+    settings.embedding_cache_path = None
+    settings.patient_store = "json"
+    settings.preload_on_startup = True
+    tracing.set_exporter(tracing.NullExporter())
+
+    ids, docs, metas = build_corpus(args.pages, args.chunks_per_page)
+    embedder = clients.get_pool(settings.project_id, settings.location).embedding_model(settings.embedding_model)
+    embeddings: List[List[float]] = []
+    for start in range(0, len(docs), 100):
+        embeddings.extend(e.values for e in embedder.get_embeddings(docs[start:start + 100]))
+    collection = chromadb.PersistentClient(path=settings.chroma_path).get_or_create_collection(
+        settings.collection_name
+    )
+    collection.add(ids=ids, documents=docs, metadatas=metas, embeddings=embeddings)
+
+    patients = [
+        {"patient_id": f"bench_{i}", "symptoms": [SYMPTOMS[i % len(SYMPTOMS)], SYMPTOMS[(i * 7) % len(SYMPTOMS)]]}
+        for i in range(args.distinct)
+    ]
+    patients_path = workdir / "patients.json"
+    patients_path.write_text(json.dumps(patients), encoding="utf-8")
+    tools.DATA_PATH = patients_path
+
+
+def payload_factory(endpoint: str, distinct: int) -> Callable[[int], Dict[str, Any]]:
+    # distinct bounds how many different questions are asked, and so the cache hit rate.
+    if endpoint == "/assess":
+        return lambda i: {"patient_id": f"bench_{i % distinct}"}
+    return lambda i: {"question": f"Does {SYMPTOMS[i % len(SYMPTOMS)]} need referral? (variant {i % distinct})"}
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    stages: Dict[str, float] = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        if params.startswith("dur="):
+            stages[name] = float(params[4:])
+    return stages
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "mean": round(statistics.fmean(ordered), 3) if ordered else 0.0,
+        "p50": round(percentile(ordered, 0.50), 3),
+        "p95": round(percentile(ordered, 0.95), 3),
+        "p99": round(percentile(ordered, 0.99), 3),
+    }
+
+
+def reset_caches() -> None:
+    # Each scenario starts cold so earlier scenarios' answers and embeddings
+    # don't hide the generate and embed stages.
+    agent.clear_response_cache()
+    if app_main._rag_instance is not None:
+        app_main._rag_instance._embedder.clear_cache()
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    concurrency: int,
+    requests: int,
+    payload: Callable[[int], Dict],
+    recording: Optional[Recording] = None,
+) -> Dict[str, Any]:
+    # The app turns a replay miss into an ordinary degraded answer, so misses
+    # are counted at the recording instead.
+    misses_before = recording.misses if recording is not None else 0
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = defaultdict(list)
+    statuses: Counter = Counter()
+    outcomes: Counter = Counter()
+    errors: Counter = Counter()
+    counter = iter(range(requests))
+
+    async def _worker() -> None:
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                res = await client.post(endpoint, json=payload(i))
+            except Exception as exc:
+                statuses[type(exc).__name__] += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(res.status_code)] += 1
+            if res.status_code == 200:
+                body = res.json()
+                outcomes[body.get("status", "ok")] += 1
+                for error in body.get("errors") or []:
+                    errors[error["code"]] += 1
+            for name, ms in parse_server_timing(res.headers.get("server-timing", "")).items():
+                stages[name].append(ms)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[_worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": summarize(latencies),
+        "stages_ms": {name: summarize(values) for name, values in sorted(stages.items())},
+        "status_counts": dict(statuses),
+        "outcomes": dict(outcomes),
+        "error_codes": dict(errors),
+        "replay_misses": (recording.misses if recording is not None else 0) - misses_before,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    previous = {(r["endpoint"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result["endpoint"], result["concurrency"]))
+        if before is None:
+            continue
+        for q in ("p95", "p99"):
+            old, new = before["latency_ms"][q], result["latency_ms"][q]
+            if old and new > old * (1 + max_regression):
+                regressions.append(
+                    f"{result['endpoint']} c={result['concurrency']} {q}: {old:.1f} ms -> {new:.1f} ms"
+                )
+        if before["rps"] and result["rps"] < before["rps"] * (1 - max_regression):
+            regressions.append(
+                f"{result['endpoint']} c={result['concurrency']} rps: {before['rps']} -> {result['rps']}"
+            )
+    return regressions
+
+
+async def run(args: argparse.Namespace, recording: Optional[Recording] = None) -> Dict[str, Any]:
+    results = []
+    async with app_main.app.router.lifespan_context(app_main.app):
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for endpoint in args.endpoints:
+                for concurrency in args.concurrency:
+                    payload = payload_factory(endpoint, args.distinct)
+                    if not args.keep_caches:
+                        reset_caches()
+                    if args.warmup:
+                        await run_scenario(client, endpoint, concurrency, args.warmup, payload, recording)
+                    result = await run_scenario(client, endpoint, concurrency, args.requests, payload, recording)
+                    results.append(result)
+                    print(
+                        f"{endpoint} c={concurrency}: {result['rps']} rps, p50 {result['latency_ms']['p50']} ms, "
+                        f"p99 {result['latency_ms']['p99']} ms",
+                        file=sys.stderr,
+                    )
+    return {"results": results}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline load and latency benchmark for the API")
+    parser.add_argument("--endpoints", type=lambda s: s.split(","), default=["/assess", "/chat"])
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=0)
+    parser.add_argument("--keep-caches", action="store_true", help="Don't clear caches between scenarios")
+    parser.add_argument("--distinct", type=int, default=50, help="Distinct questions/patients per scenario")
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--chunks-per-page", type=int, default=10)
+    parser.add_argument("--backend", choices=["standin", "vertex"], default="standin")
+    parser.add_argument("--gen-latency", type=float, default=0.8)
+    parser.add_argument("--gen-jitter", type=float, default=0.2)
+    parser.add_argument("--gen-error-rate", type=float, default=0.0)
+    parser.add_argument("--stream-delay", type=float, default=0.0)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--embed-jitter", type=float, default=0.01)
+    parser.add_argument("--embed-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", help="Write backend responses to this file")
+    parser.add_argument("--replay", help="Serve backend responses from a recording")
+    parser.add_argument("--replay-latency-scale", type=float, default=1.0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    recording = install_backends(args)
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare_environment(Path(tmp), args)
+        report = asyncio.run(run(args, recording))
+    if recording is not None:
+        recording.save()
+        if recording.replay and recording.misses:
+            # Timings of a run that fell back to failures are not comparable; don't write them.
+            print(f"REPLAY {recording.misses} backend calls had no recorded response", file=sys.stderr)
+            return 2
+
+    report["config"] = {k: v for k, v in vars(args).items() if k not in {"output", "baseline"}}
+    Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report["results"], indent=2))
+
+    if args.baseline:
+        regressions = compare(report["results"], json.loads(Path(args.baseline).read_text()), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
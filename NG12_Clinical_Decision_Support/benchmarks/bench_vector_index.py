@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.vector_index import NumpyVectorIndex  # noqa: E402
+
+
+def _timed(fn, queries) -> list[float]:
+    samples = []
+    for q in queries:
+        started = time.perf_counter()
+        fn(q)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _summary(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "p50_ms": round(ordered[len(ordered) // 2], 4),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.chunks, args.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = chromadb.PersistentClient(path=str(Path(tmp) / "chroma"))
+        collection = client.get_or_create_collection("bench")
+        ids = [f"bench_c{i}" for i in range(args.chunks)]
+        collection.add(
+            ids=ids,
+            documents=[f"chunk {i}" for i in ids],
+            metadatas=[{"chunk_id": i} for i in ids],
+            embeddings=vectors.tolist(),
+        )
+        NumpyVectorIndex.export_from_collection(collection, Path(tmp) / "index")
+        index = NumpyVectorIndex.load(Path(tmp) / "index")
+
+        include = ["documents", "metadatas", "distances"]
+        chroma = _timed(
+            lambda q: collection.query(query_embeddings=[q.tolist()], n_results=args.top_k, include=include),
+            queries,
+        )
+        numpy_single = _timed(lambda q: index.query([q], n_results=args.top_k), queries)
+
+        started = time.perf_counter()
+        index.search(queries, args.top_k)
+        batch_ms = (time.perf_counter() - started) * 1000
+
+        agree = sum(
+            set(collection.query(query_embeddings=[q.tolist()], n_results=args.top_k)["ids"][0])
+            == set(index.query([q], n_results=args.top_k)["ids"][0])
+            for q in queries[:50]
+        )
+
+    print(
+        json.dumps(
+            {
+                "chunks": args.chunks,
+                "dim": args.dim,
+                "queries": args.queries,
+                "chroma": _summary(chroma),
+                "numpy": _summary(numpy_single),
+                "numpy_batch_per_query_ms": round(batch_ms / args.queries, 4),
+                "top_k_agreement": f"{agree}/50",
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.lexical import tokenize  # noqa: E402
+
+# Matches the context lines written by app.agent._format_context.
+_CONTEXT_LINE = re.compile(r"^\[(?P<ids>[^|\]]+)\|page (?P<page>\d+)\] (?P<text>.+)$", re.MULTILINE)
+
+
+class StandInUnavailable(ConnectionError):
+    pass
+
+
+@dataclass
+class Profile:
+    latency_s: float = 0.0
+    jitter_s: float = 0.0
+    error_rate: float = 0.0
+    seed: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def _draw(self) -> tuple[float, bool]:
+        with self._lock:
+            delay = max(0.0, self.latency_s + self._rng.uniform(-self.jitter_s, self.jitter_s))
+            return delay, self._rng.random() < self.error_rate
+
+    async def wait(self, name: str) -> None:
+        delay, fail = self._draw()
+        await asyncio.sleep(delay)
+        if fail:
+            raise StandInUnavailable(f"{name} stand-in injected failure")
+
+
+@dataclass
+class _Embedding:
+    values: List[float]
+
+
+@dataclass
+class _Response:
+    text: str
+
+
+def hashed_embedding(text: str, dim: int = 256) -> List[float]:
+    # Feature hashing over the lexical tokens: deterministic, and texts sharing
+    # terms land close together, so retrieval still returns plausible chunks.
+    vector = [0.0] * dim
+    for token in tokenize(text):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % (dim - 1)
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    # The last dimension breaks ties: texts with the same terms would otherwise
+    # score alike and leave their order (and so every prompt) to the vector store.
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    vector[-1] = 0.5 + int.from_bytes(digest, "little") / 2**64
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def answer_for(prompt: str) -> str:
+    # Cites the start of the first context block so the answer passes validation.
+    match = _CONTEXT_LINE.search(prompt)
+    if not match:
+        return json.dumps(
+            {
+                "assessment": "Insufficient Evidence",
+                "reasoning": "No NG12 context was provided.",
+                "citations": [],
+                "confidence": "low",
+            }
+        )
+    excerpt = match.group("text")[:80].strip()
+    return json.dumps(
+        {
+            "assessment": "Urgent Referral",
+            "reasoning": f"NG12 recommends referral: {excerpt}",
+            "citations": [
+                {
+                    "source": "NG12 PDF",
+                    "page": int(match.group("page")),
+                    "chunk_id": match.group("ids").split(",")[0],
+                    "excerpt": excerpt,
+                }
+            ],
+            "confidence": "medium",
+        }
+    )
+
+
+async def _stream_text(text: str, chunk_chars: int, delay_s: float) -> AsyncIterator[_Response]:
+    for start in range(0, len(text), chunk_chars):
+        if delay_s:
+            await asyncio.sleep(delay_s)
+        yield _Response(text[start:start + chunk_chars])
+
+
+class StandInEmbeddingModel:
+    def __init__(self, profile: Optional[Profile] = None, dim: int = 256) -> None:
+        self.profile = profile or Profile()
+        self.dim = dim
+
+    async def get_embeddings_async(self, texts: Sequence[str]) -> List[_Embedding]:
+        await self.profile.wait("embedding")
+        return self.get_embeddings(texts)
+
+    # Used to build the benchmark corpus; no latency is simulated.
+    def get_embeddings(self, texts: Sequence[str]) -> List[_Embedding]:
+        return [_Embedding(hashed_embedding(t, self.dim)) for t in texts]
+
+
+class StandInGenerativeModel:
+    def __init__(
+        self, profile: Optional[Profile] = None, stream_chunk_chars: int = 48, stream_delay_s: float = 0.0
+    ) -> None:
+        self.profile = profile or Profile()
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_delay_s = stream_delay_s
+
+    async def generate_content_async(self, prompt: str, generation_config: Any = None, stream: bool = False) -> Any:
+        await self.profile.wait("generation")
+        text = answer_for(prompt)
+        if stream:
+            return _stream_text(text, self.stream_chunk_chars, self.stream_delay_s)
+        return _Response(text)
+
+
+class Recording:
+    # Stores responses keyed by request content. In replay mode a miss raises
+    # KeyError so a run never silently falls back to a live backend.
+
+    def __init__(self, path: Path, replay: bool = False, latency_scale: float = 1.0) -> None:
+        self.path = Path(path)
+        self.replay = replay
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.misses = 0
+        if replay:
+            self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+
+    @staticmethod
+    def key(kind: str, payload: Any) -> str:
+        raw = json.dumps([kind, payload], sort_keys=True).encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    def get(self, key: str) -> Dict[str, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            raise KeyError(f"No recorded response for {key[:12]}")
+        return entry
+
+    def put(self, key: str, value: Any, latency_s: float) -> None:
+        with self._lock:
+            self._entries[key] = {"value": value, "latency_s": round(latency_s, 6)}
+
+    def save(self) -> None:
+        if self.replay:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self.path.write_text(json.dumps(self._entries, sort_keys=True), encoding="utf-8")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RecordedEmbeddingModel:
+    def __init__(self, inner: Any, recording: Recording) -> None:
+        self.inner = inner
+        self.recording = recording
+
+    async def get_embeddings_async(self, texts: Sequence[str]) -> List[_Embedding]:
+        key = Recording.key("embed", list(texts))
+        if self.recording.replay:
+            entry = self.recording.get(key)
+            await asyncio.sleep(entry["latency_s"] * self.recording.latency_scale)
+            return [_Embedding(v) for v in entry["value"]]
+        started = time.perf_counter()
+        result = await self.inner.get_embeddings_async(texts)
+        self.recording.put(key, [list(e.values) for e in result], time.perf_counter() - started)
+        return result
+
+    def get_embeddings(self, texts: Sequence[str]) -> List[_Embedding]:
+        key = Recording.key("embed", list(texts))
+        if self.recording.replay:
+            return [_Embedding(v) for v in self.recording.get(key)["value"]]
+        result = self.inner.get_embeddings(texts)
+        self.recording.put(key, [list(e.values) for e in result], 0.0)
+        return result
+
+
+class RecordedGenerativeModel:
+    def __init__(self, inner: Any, recording: Recording, stream_chunk_chars: int = 48) -> None:
+        self.inner = inner
+        self.recording = recording
+        self.stream_chunk_chars = stream_chunk_chars
+
+    async def generate_content_async(self, prompt: str, generation_config: Any = None, stream: bool = False) -> Any:
+        # Streaming and non-streaming calls share one entry: the full answer text.
+        key = Recording.key("generate", prompt)
+        if self.recording.replay:
+            entry = self.recording.get(key)
+            await asyncio.sleep(entry["latency_s"] * self.recording.latency_scale)
+            text = entry["value"]
+        else:
+            started = time.perf_counter()
+            if stream:
+                responses = await self.inner.generate_content_async(prompt, generation_config, stream=True)
+                text = "".join([r.text async for r in responses])
+            else:
+                text = (await self.inner.generate_content_async(prompt, generation_config=generation_config)).text
+            self.recording.put(key, text, time.perf_counter() - started)
+        if stream:
+            return _stream_text(text, self.stream_chunk_chars, 0.0)
+        return _Response(text)
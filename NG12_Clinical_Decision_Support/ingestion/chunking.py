@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Running footer on NG12 pages: guideline title, copyright notice, "Page N of" and the page total.
+_FOOTER = re.compile(r"(?:^[^\n]*\(NG12\)[ \t]*\n)?^© NICE.*\Z", re.S | re.M)
+# "1.3.1 Refer people..." starts a recommendation, "1.3 Lower gastrointestinal..." a section.
+# Table of contents entries ("1.4 Breast cancer ........ 17") carry no guidance.
+_CONTENTS = re.compile(r"\.{4,}\s*\d+$")
+_NUMBER = re.compile(r"^(\d+(?:\.\d+)+)\s+\S")
+_BULLETS = ("•", "－", "○", "–", "-")
+# Sentence ends (keeping a trailing "[2015]" with its sentence), and the line break before each bullet.
+_BOUNDARY = re.compile(r"(?<=[.!?\]])\s+(?!\[)|\n(?=[•－○–-])")
+
+
+@dataclass
+class Chunk:
+    text: str
+    page: int
+    page_end: int
+    recommendations: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _Block:
+    # One recommendation (or heading-led passage) with the page each part came from.
+    number: Optional[str] = None
+    heading_only: bool = False
+    parts: List[str] = field(default_factory=list)
+    offsets: List[int] = field(default_factory=list)
+    pages: List[int] = field(default_factory=list)
+    length: int = 0
+
+    def add(self, line: str, page: int, new_line: bool = False) -> None:
+        if self.parts:
+            sep = "\n" if new_line or line.startswith(_BULLETS) else " "
+            self.parts.append(sep)
+            self.length += len(sep)
+        if not self.pages or self.pages[-1] != page:
+            self.offsets.append(self.length)
+            self.pages.append(page)
+        self.parts.append(line)
+        self.length += len(line)
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def page_at(self, offset: int) -> int:
+        return self.pages[bisect_right(self.offsets, offset) - 1]
+
+    @property
+    def is_section(self) -> bool:
+        return self.number is not None and self.number.count(".") == 1
+
+
+def _is_heading(line: str, previous: str) -> bool:
+    # A short unpunctuated line straight after a finished sentence, e.g. "Mesothelioma".
+    return (
+        previous.endswith((".", "]"))
+        and len(line) <= 60
+        and line[0].isupper()
+        and not line.startswith(_BULLETS)
+        and not line.endswith((".", ",", ";", ":", "]"))
+    )
+
+
+def iter_blocks(pages: Iterable[Tuple[int, str]]) -> Iterator[_Block]:
+    # Blocks run across page breaks: only a recommendation number or heading ends one.
+    block = _Block()
+    previous = ""
+    for page, text in pages:
+        for raw in _FOOTER.sub("", text).splitlines():
+            line = raw.strip()
+            if not line or _CONTENTS.search(line):
+                continue
+            match = _NUMBER.match(line)
+            if match and block.heading_only:
+                # The heading introduces this recommendation; keep them together.
+                block.number, block.heading_only = match.group(1), False
+            elif match or _is_heading(line, previous):
+                if block.parts:
+                    yield block
+                block = _Block(number=match.group(1) if match else None, heading_only=not match)
+            elif block.heading_only:
+                block.heading_only = False
+            block.add(line, page, new_line=match is not None)
+            previous = line
+    if block.parts:
+        yield block
+
+
+def _split_long(text: str, start: int, end: int, max_chars: int) -> Iterator[Tuple[int, int]]:
+    # Last resort for a single sentence longer than max_chars: break at whitespace.
+    while end - start > max_chars:
+        cut = text.rfind(" ", start + 1, start + max_chars + 1)
+        if cut <= start:
+            cut = start + max_chars
+        yield start, cut
+        start = cut
+    yield start, end
+
+
+def _pieces(block: _Block, max_chars: int) -> Iterator[Tuple[str, int, int]]:
+    # Yields (text, page, page_end); a block too big for one chunk is cut at
+    # sentence and bullet boundaries, packing whole sentences up to max_chars.
+    text = block.text()
+    if len(text) <= max_chars:
+        yield text, block.pages[0], block.pages[-1]
+        return
+    bounds = [m.end() for m in _BOUNDARY.finditer(text)] + [len(text)]
+    start = prev = 0
+    for bound in bounds:
+        if bound - start > max_chars and prev > start:
+            yield text[start:prev].strip(), block.page_at(start), block.page_at(prev - 1)
+            start = prev
+        if bound - start > max_chars:
+            for a, b in _split_long(text, start, bound, max_chars):
+                if b < bound:
+                    yield text[a:b].strip(), block.page_at(a), block.page_at(b - 1)
+                start = a
+        prev = bound
+    if start < len(text):
+        yield text[start:].strip(), block.page_at(start), block.page_at(len(text) - 1)
+
+
+def chunk_pages(pages: Iterable[Tuple[int, str]], max_chars: int) -> Iterator[Chunk]:
+    # Packs whole recommendations into chunks of at most max_chars without
+    # overlap; a new section always starts a new chunk. One pass, so linear
+    # in the text, and only the chunk being built is held.
+    parts: List[str] = []
+    size = 0
+    page = page_end = 0
+    numbers: List[str] = []
+
+    def _flush() -> Iterator[Chunk]:
+        nonlocal parts, size, numbers
+        if parts:
+            yield Chunk("\n".join(parts), page, page_end, numbers)
+        parts, size, numbers = [], 0, []
+
+    for block in iter_blocks(pages):
+        if block.is_section:
+            yield from _flush()
+        for text, first, last in _pieces(block, max_chars):
+            if not text:
+                continue
+            if parts and size + 1 + len(text) > max_chars:
+                yield from _flush()
+            if not parts:
+                page = first
+            parts.append(text)
+            size += len(text) + (1 if size else 0)
+            page_end = last
+            if block.number and not block.is_section and block.number not in numbers:
+                numbers.append(block.number)
+    yield from _flush()
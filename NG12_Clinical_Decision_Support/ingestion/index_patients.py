@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.patient_store import build_patient_index  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", default="data/patients.json")
+    parser.add_argument("--db", default="data/patients.sqlite")
+    args = parser.parse_args()
+
+    json_path = Path(args.json)
+    if not json_path.exists():
+        raise SystemExit("Patient file not found")
+
+    count = build_patient_index(json_path, Path(args.db))
+    print(json.dumps({"patients": count, "db": args.db}))
+
+
+if __name__ == "__main__":
+    main()
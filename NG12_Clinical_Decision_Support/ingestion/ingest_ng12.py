@@ -1,24 +1,286 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import chromadb
-import vertexai
+from google.api_core import exceptions as api_exceptions
 from pypdf import PdfReader
-from vertexai.language_models import TextEmbeddingModel
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 
-def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
-    chunks: List[str] = []
-    start = 0
-    while start < len(text):
-        end = min(start + chunk_size, len(text))
-        chunks.append(text[start:end])
-        start = end - overlap if end - overlap > 0 else end
-    return [c.strip() for c in chunks if c.strip()]
+from app.clients import get_pool  # noqa: E402
+from ingestion.chunking import chunk_pages  # noqa: E402
+
+# Quota and transient availability errors are retried; anything else aborts the run.
+RETRYABLE_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+)
+MAX_BACKOFF_S = 30.0
+
+
+def content_hash(text: str, params: Dict[str, object]) -> str:
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def existing_hashes(collection) -> Dict[str, str]:
+    current = collection.get(include=["metadatas"])
+    return {
+        chunk_id: (meta or {}).get("content_hash", "")
+        for chunk_id, meta in zip(current.get("ids", []), current.get("metadatas") or [])
+    }
+
+
+def batched(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def batched_iter(items: Iterable, size: int) -> Iterator[List]:
+    batch: List = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def embed_batch(embed_model, texts: List[str], max_retries: int, backoff_s: float) -> List[List[float]]:
+    attempt = 0
+    while True:
+        try:
+            return [e.values for e in embed_model.get_embeddings(texts)]
+        except RETRYABLE_ERRORS:
+            attempt += 1
+            if attempt > max_retries:
+                raise
+            delay = min(backoff_s * (2 ** (attempt - 1)), MAX_BACKOFF_S)
+            time.sleep(random.uniform(delay / 2, delay))
+
+
+def _report_progress(done: int, total: Optional[int]) -> None:
+    suffix = f"/{total}" if total is not None else ""
+    print(f"embedded {done}{suffix} chunks", file=sys.stderr, flush=True)
+
+
+_reader: Optional[PdfReader] = None
+
+
+def _open_reader(path: str) -> None:
+    # Runs once per extraction process so the PDF is parsed once per worker, not per page.
+    global _reader
+    _reader = PdfReader(path)
+
+
+def _extract_page(index: int) -> str:
+    return _reader.pages[index].extract_text() or ""
+
+
+def page_count(pdf_path: Path) -> int:
+    return len(PdfReader(str(pdf_path)).pages)
+
+
+def extract_pages(pdf_path: Path, workers: int, max_pending: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    # Yields (page number, text) in page order. At most max_pending pages are
+    # extracted ahead of the consumer, so memory does not grow with the PDF.
+    total = page_count(pdf_path)
+    if workers <= 1:
+        _open_reader(str(pdf_path))
+        for index in range(total):
+            yield index + 1, _extract_page(index)
+        return
+
+    max_pending = max_pending or workers * 2
+    with ProcessPoolExecutor(max_workers=workers, initializer=_open_reader, initargs=(str(pdf_path),)) as pool:
+        pending: "deque[Future]" = deque()
+        try:
+            for index in range(total):
+                if len(pending) >= max_pending:
+                    yield index - len(pending) + 1, pending.popleft().result()
+                pending.append(pool.submit(_extract_page, index))
+            while pending:
+                yield total - len(pending) + 1, pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def iter_chunks(
+    pages: Iterable[Tuple[int, str]], chunk_size: int, params: Dict[str, object]
+) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    # Ids number the chunks starting on each page; "page" is where a chunk starts.
+    page, index = 0, 0
+    for chunk in chunk_pages(pages, chunk_size):
+        index = index + 1 if chunk.page == page else 0
+        page = chunk.page
+        chunk_id = f"ng12_p{page}_c{index}"
+        yield chunk_id, chunk.text, {
+            "source": "NG12 PDF",
+            "page": chunk.page,
+            "page_end": chunk.page_end,
+            "chunk_id": chunk_id,
+            "recommendations": ",".join(chunk.recommendations),
+            "content_hash": content_hash(chunk.text, params),
+        }
+
+
+def embed_stream(
+    embed_model,
+    batches: Iterable[List],
+    workers: int,
+    text_of: Callable[[Any], str] = lambda item: item,
+    max_retries: int = 5,
+    backoff_s: float = 1.0,
+    max_pending: Optional[int] = None,
+) -> Iterator[Tuple[List, List[List[float]]]]:
+    # Yields (batch, embeddings) in input order. Batches are pulled from the
+    # input only while fewer than max_pending are in flight, which keeps the
+    # upstream generators and this stage's memory bounded.
+    max_pending = max_pending or workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: "deque[Tuple[Future, List]]" = deque()
+        try:
+            for batch in batches:
+                if len(pending) >= max_pending:
+                    future, done = pending.popleft()
+                    yield done, future.result()
+                texts = [text_of(item) for item in batch]
+                pending.append((pool.submit(embed_batch, embed_model, texts, max_retries, backoff_s), batch))
+            while pending:
+                future, done = pending.popleft()
+                yield done, future.result()
+        finally:
+            for future, _ in pending:
+                future.cancel()
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class Manifest:
+    # Progress of one ingestion run. committed counts the leading chunks (in
+    # extraction order) that are final in the collection: unchanged, or
+    # embedded and upserted.
+    pdf_sha256: str
+    params: Dict[str, object]
+    collection: str
+    committed: int = 0
+    last_chunk_id: Optional[str] = None
+    complete: bool = False
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["Manifest"]:
+        if not path.exists():
+            return None
+        return cls(**json.loads(path.read_text(encoding="utf-8")))
+
+    def save(self, path: Path) -> None:
+        # Written to a temporary file and renamed so a crash never leaves half a manifest.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(asdict(self), sort_keys=True), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def same_input(self, other: "Manifest") -> bool:
+        return (self.pdf_sha256, self.params, self.collection) == (other.pdf_sha256, other.params, other.collection)
+
+
+def ingest(
+    collection,
+    records: Iterable[Tuple[str, str, Dict[str, Any]]],
+    embed_model,
+    batch_size: int,
+    workers: int,
+    write_batch: int,
+    max_retries: int = 5,
+    force: bool = False,
+    skip: int = 0,
+    on_commit: Optional[Callable[[int, str], None]] = None,
+    progress: Optional[Callable[[int, Optional[int]], None]] = _report_progress,
+) -> Dict[str, Any]:
+    # Streams records through hashing, embedding and batched upserts; only
+    # chunk ids and hashes are held for the whole run. The first `skip` records
+    # were committed by an earlier run and are only noted as present.
+    # on_commit(count, chunk_id) follows every upsert with the number of
+    # leading records now final.
+    existing = existing_hashes(collection)
+    seen: Set[str] = set()
+    counts = {"chunks": 0, "added": 0, "updated": 0, "unchanged": 0, "resumed": 0}
+
+    def _stale() -> Iterator[Tuple[int, str, str, Dict[str, Any]]]:
+        for position, (chunk_id, doc, meta) in enumerate(records):
+            seen.add(chunk_id)
+            counts["chunks"] += 1
+            if position < skip:
+                counts["resumed"] += 1
+                continue
+            if not force and existing.get(chunk_id) == meta["content_hash"]:
+                counts["unchanged"] += 1
+                continue
+            counts["updated" if chunk_id in existing else "added"] += 1
+            yield position, chunk_id, doc, meta
+
+    buffer: List[Tuple[int, str, str, Dict[str, Any], List[float]]] = []
+
+    def _flush() -> None:
+        if not buffer:
+            return
+        collection.upsert(
+            ids=[r[1] for r in buffer],
+            documents=[r[2] for r in buffer],
+            metadatas=[r[3] for r in buffer],
+            embeddings=[r[4] for r in buffer],
+        )
+        if on_commit:
+            on_commit(buffer[-1][0] + 1, buffer[-1][1])
+        buffer.clear()
+
+    started = time.perf_counter()
+    embedded = 0
+    for batch, embeds in embed_stream(
+        embed_model, batched_iter(_stale(), batch_size), workers, lambda r: r[2], max_retries=max_retries
+    ):
+        buffer.extend((*record, emb) for record, emb in zip(batch, embeds))
+        embedded += len(batch)
+        if progress:
+            progress(embedded, None)
+        if len(buffer) >= write_batch:
+            _flush()
+    _flush()
+
+    if not counts["chunks"]:
+        raise SystemExit("No text extracted from NG12 PDF")
+
+    # Orphans are deleted only after every upsert so the live collection is never empty.
+    orphans = sorted(set(existing) - seen)
+    for batch in batched(orphans, write_batch):
+        collection.delete(ids=batch)
+    return {**counts, "deleted": len(orphans), "embed_seconds": round(time.perf_counter() - started, 2)}
 
 
 def main() -> None:
@@ -28,57 +290,84 @@ def main() -> None:
     parser.add_argument("--location", default="us-central1")
     parser.add_argument("--collection", default="ng12")
     parser.add_argument("--chroma-path", default="data/chroma")
-    parser.add_argument("--chunk-size", type=int, default=1200)
-    parser.add_argument("--overlap", type=int, default=200)
-    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--embedding-model", default="text-embedding-004")
+    parser.add_argument("--chunk-size", type=int, default=1200, help="Maximum characters per chunk")
+    parser.add_argument("--batch-size", type=int, default=32, help="Chunks per embedding request (max 250)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent embedding requests")
+    parser.add_argument(
+        "--extract-workers",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="Processes extracting PDF pages (1 extracts in-process)",
+    )
+    parser.add_argument(
+        "--write-batch", type=int, default=128, help="Chunks per collection upsert and checkpoint (capped by the client)"
+    )
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries per batch on quota/availability errors")
+    parser.add_argument("--force", action="store_true", help="Re-embed every chunk even if its hash is unchanged")
+    parser.add_argument("--manifest", help="Checkpoint file (default: <chroma-path>/<collection>.ingest.json)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint of an earlier run")
     args = parser.parse_args()
 
     pdf_path = Path(args.pdf)
     if not pdf_path.exists():
         raise SystemExit("NG12 PDF not found")
+    if not 1 <= args.batch_size <= 250:
+        raise SystemExit("--batch-size must be between 1 and 250")
+    if args.workers < 1 or args.extract_workers < 1 or args.write_batch < 1:
+        raise SystemExit("--workers, --extract-workers and --write-batch must be at least 1")
 
-    vertexai.init(project=args.project, location=args.location)
-    embed_model = TextEmbeddingModel.from_pretrained("text-embedding-004")
-
-    reader = PdfReader(str(pdf_path))
-    pages = reader.pages
+    embed_model = get_pool(args.project, args.location).embedding_model(args.embedding_model)
 
     client = chromadb.PersistentClient(path=args.chroma_path)
-    if args.force:
-        try:
-            client.delete_collection(args.collection)
-        except Exception:
-            pass
     collection = client.get_or_create_collection(args.collection)
+    params = {
+        "chunker": "structured",
+        "chunk_size": args.chunk_size,
+        "embedding_model": args.embedding_model,
+    }
+    write_batch = min(args.write_batch, client.get_max_batch_size())
 
-    ids: List[str] = []
-    docs: List[str] = []
-    metas: List[dict] = []
-    embeds: List[List[float]] = []
-
-    for i, page in enumerate(pages, start=1):
-        text = page.extract_text() or ""
-        for j, chunk in enumerate(chunk_text(text, args.chunk_size, args.overlap)):
-            chunk_id = f"ng12_p{i}_c{j}"
-            ids.append(chunk_id)
-            docs.append(chunk)
-            metas.append({"source": "NG12 PDF", "page": i, "chunk_id": chunk_id})
-
-    if not docs:
-        raise SystemExit("No text extracted from NG12 PDF")
-
-    for doc in docs:
-        emb = embed_model.get_embeddings([doc])[0].values
-        embeds.append(emb)
+    manifest_path = Path(args.manifest) if args.manifest else Path(args.chroma_path) / f"{args.collection}.ingest.json"
+    manifest = Manifest(file_sha256(pdf_path), params, args.collection)
+    if args.resume:
+        previous = Manifest.load(manifest_path)
+        if previous is None:
+            raise SystemExit(f"No ingestion manifest at {manifest_path}")
+        if not previous.same_input(manifest):
+            raise SystemExit("The PDF or chunking parameters changed since the checkpoint; rerun without --resume")
+        manifest = previous
+    skip = manifest.committed
+    manifest.complete = False
+    manifest.save(manifest_path)
 
-    collection.add(ids=ids, documents=docs, metadatas=metas, embeddings=embeds)
+    def _commit(count: int, chunk_id: str) -> None:
+        manifest.committed, manifest.last_chunk_id = count, chunk_id
+        manifest.save(manifest_path)
 
-    stats = {
-        "chunks": len(ids),
-        "pages": len(pages),
-        "collection": args.collection,
-    }
-    print(json.dumps(stats))
+    pages = extract_pages(pdf_path, args.extract_workers)
+    try:
+        stats = ingest(
+            collection,
+            iter_chunks(pages, args.chunk_size, params),
+            embed_model,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            write_batch=write_batch,
+            max_retries=args.max_retries,
+            force=args.force,
+            skip=skip,
+            on_commit=_commit,
+        )
+    except Exception:
+        print(
+            f"ingestion stopped with {manifest.committed} chunks committed; rerun with --resume to continue",
+            file=sys.stderr,
+        )
+        raise
+    manifest.committed, manifest.complete = stats["chunks"], True
+    manifest.save(manifest_path)
+    print(json.dumps({"pages": page_count(pdf_path), "collection": args.collection, **stats}))
 
 
 if __name__ == "__main__":
@@ -1,3 +1,5 @@
+from unittest.mock import AsyncMock
+
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -10,11 +12,11 @@ def _setup(monkeypatch, mock_agent_output):
     from app import main
 
     class _Rag:
-        def query(self, q, k):
+        async def query(self, q, k):
             return []
 
     monkeypatch.setattr(main, "_rag_instance", _Rag())
-    monkeypatch.setattr(main, "generate_assessment", lambda q, c: AgentOutput(**mock_agent_output))
+    monkeypatch.setattr(main, "generate_assessment", AsyncMock(return_value=AgentOutput(**mock_agent_output)))
 
 
 def test_persistent_hoarseness(monkeypatch, mock_agent_output):
@@ -1,19 +1,71 @@
+import asyncio
+import uuid
+
+import chromadb
 import pytest
 
+from app import agent, clients
+from app.rag import ChromaRAG, VectorStoreError
+from app.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, SingleFlight
+from benchmarks.standins import Profile, StandInEmbeddingModel, StandInGenerativeModel
+from ingestion.ingest_ng12 import ingest
 
-def test_vector_db_unavailable():
-    with pytest.raises(Exception):
-        raise Exception("Vector DB unavailable")
 
+class _UnavailableCollection:
+    def __init__(self):
+        self.calls = 0
 
-def test_empty_pdf_chunks():
-    with pytest.raises(Exception):
-        raise Exception("No chunks extracted")
+    def query(self, **kwargs):
+        self.calls += 1
+        raise ConnectionError("vector store unreachable")
 
 
-def test_gemini_api_failure():
-    with pytest.raises(Exception):
-        raise Exception("Gemini timeout")
+class _Embedder:
+    async def embed(self, text):
+        return [0.0, 1.0]
+
+
+def test_vector_db_unavailable():
+    rag = ChromaRAG.__new__(ChromaRAG)
+    rag._collection = _UnavailableCollection()
+    rag._embedder = _Embedder()
+    rag._breaker = CircuitBreaker(failure_threshold=2, reset_after_s=30)
+    rag._retry = RetryPolicy(max_attempts=2, backoff_s=0)
+    rag._lexical = None
+    rag._inflight = SingleFlight()
+
+    with pytest.raises(VectorStoreError, match="ConnectionError"):
+        asyncio.run(rag.query("visible haematuria", 3))
+    assert rag._collection.calls == 2
+    # Both failed attempts count towards the breaker, which now sheds queries.
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(rag.query("visible haematuria", 3))
+    assert rag._collection.calls == 2
+
+
+def test_empty_pdf_chunks():
+    class _Model:
+        def get_embeddings(self, texts):
+            raise AssertionError("nothing should be embedded")
+
+    collection = chromadb.EphemeralClient().get_or_create_collection(f"ng12_{uuid.uuid4().hex}")
+    with pytest.raises(SystemExit, match="No text extracted"):
+        ingest(collection, iter(()), _Model(), batch_size=2, workers=1, write_batch=10, progress=None)
+    assert collection.count() == 0
+
+
+def test_gemini_api_failure(monkeypatch, mock_chunks):
+    monkeypatch.setattr(agent, "_retry", RetryPolicy(max_attempts=2, backoff_s=0))
+    monkeypatch.setattr(agent, "_breaker", CircuitBreaker(failure_threshold=5))
+    clients.use_backends(
+        lambda name: StandInGenerativeModel(Profile(error_rate=1.0)), lambda name: StandInEmbeddingModel()
+    )
+    try:
+        output, meta = asyncio.run(agent.generate_assessment("gemini outage question", mock_chunks))
+    finally:
+        clients.use_backends()
+    assert meta["reason"] == "generation_failed"
+    assert output.assessment == "Insufficient Evidence"
 
 
 def test_invalid_input_payloads():
@@ -17,6 +17,15 @@ def _use_mock_patients(monkeypatch):
     return None
 
 
+@pytest.fixture(autouse=True)
+def span_exporter(monkeypatch):
+    from app import tracing
+
+    exporter = tracing.InMemoryExporter()
+    monkeypatch.setattr(tracing, "_exporter", exporter)
+    return exporter
+
+
 @pytest.fixture()
 def mock_chunks():
     return [
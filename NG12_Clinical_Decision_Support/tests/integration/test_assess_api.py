@@ -1,3 +1,5 @@
+from unittest.mock import AsyncMock
+
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -10,7 +12,7 @@ def _set_rag(monkeypatch, results):
     from app import main
 
     class _Rag:
-        def query(self, q, k):
+        async def query(self, q, k):
             return results
 
     monkeypatch.setattr(main, "_rag_instance", _Rag())
@@ -40,7 +42,7 @@ def test_known_high_risk_patient(monkeypatch, mock_urgent_output):
     from app import main
 
     _set_rag(monkeypatch, [])
-    monkeypatch.setattr(main, "generate_assessment", lambda q, c: AgentOutput(**mock_urgent_output))
+    monkeypatch.setattr(main, "generate_assessment", AsyncMock(return_value=AgentOutput(**mock_urgent_output)))
 
     res = client.post("/assess", json={"patient_id": "patient_001"})
     assert res.status_code == 200
@@ -50,7 +52,7 @@ def test_known_low_risk_patient(monkeypatch, mock_agent_output):
     from app import main
 
     _set_rag(monkeypatch, [])
-    monkeypatch.setattr(main, "generate_assessment", lambda q, c: AgentOutput(**mock_agent_output))
+    monkeypatch.setattr(main, "generate_assessment", AsyncMock(return_value=AgentOutput(**mock_agent_output)))
 
     res = client.post("/assess", json={"patient_id": "patient_001"})
     assert res.status_code == 200
@@ -60,7 +62,7 @@ def test_young_patient_same_symptoms(monkeypatch, mock_agent_output):
     from app import main
 
     _set_rag(monkeypatch, [])
-    monkeypatch.setattr(main, "generate_assessment", lambda q, c: AgentOutput(**mock_agent_output))
+    monkeypatch.setattr(main, "generate_assessment", AsyncMock(return_value=AgentOutput(**mock_agent_output)))
 
     res = client.post("/assess", json={"patient_id": "patient_002"})
     assert res.status_code == 200
@@ -71,7 +73,7 @@ def test_gemini_timeout_simulation(monkeypatch):
 
     def _raise_once():
         state = {"done": False}
-        def _inner(question, chunks):
+        async def _inner(question, chunks, **_):
             if not state["done"]:
                 state["done"] = True
                 raise TimeoutError("Gemini timeout")
@@ -94,11 +96,11 @@ def test_vector_db_unavailable(monkeypatch, mock_agent_output):
     from app import main
 
     class _Rag:
-        def query(self, q, k):
+        async def query(self, q, k):
             raise RuntimeError("Vector DB unavailable")
 
     monkeypatch.setattr(main, "_rag_instance", _Rag())
-    monkeypatch.setattr(main, "generate_assessment", lambda q, c: AgentOutput(**mock_agent_output))
+    monkeypatch.setattr(main, "generate_assessment", AsyncMock(return_value=AgentOutput(**mock_agent_output)))
 
     res = client.post("/assess", json={"patient_id": "patient_001"})
     assert res.status_code == 200
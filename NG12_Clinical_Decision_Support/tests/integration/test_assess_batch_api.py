@@ -0,0 +1,109 @@
+from unittest.mock import AsyncMock
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import AgentOutput
+
+client = TestClient(app)
+
+
+def _set_rag(monkeypatch, results):
+    from app import main
+
+    class _Rag:
+        async def query(self, q, k):
+            return results
+
+    monkeypatch.setattr(main, "_rag_instance", _Rag())
+
+
+def _set_patients(monkeypatch, patients):
+    from app import tools
+
+    monkeypatch.setattr(tools, "load_patients", lambda: {p["patient_id"]: p for p in patients})
+
+
+def test_batch_deduplicates_symptom_sets(monkeypatch, mock_agent_output):
+    from app import main
+
+    _set_rag(monkeypatch, [])
+    _set_patients(
+        monkeypatch,
+        [
+            {"patient_id": "a", "symptoms": ["Cough", "fatigue"]},
+            {"patient_id": "b", "symptoms": ["fatigue", "cough ", "cough"]},
+            {"patient_id": "c", "symptoms": ["haematuria"]},
+        ],
+    )
+    questions = []
+
+    async def _generate(q, c, **_):
+        questions.append(q)
+        return AgentOutput(**mock_agent_output)
+
+    monkeypatch.setattr(main, "generate_assessment", _generate)
+
+    res = client.post("/assess/batch", json={"patient_ids": ["a", "b", "c"]})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["distinct_symptom_sets"] == 2
+    assert sorted(questions) == [
+        "Assess NG12 risk for symptoms: cough, fatigue",
+        "Assess NG12 risk for symptoms: haematuria",
+    ]
+    assert [item["patient_id"] for item in body["items"]] == ["a", "b", "c"]
+    assert all(item["response"]["result"]["assessment"] for item in body["items"])
+
+
+def test_batch_reports_per_item_errors(monkeypatch, mock_agent_output):
+    from app import main
+
+    _set_rag(monkeypatch, [])
+    _set_patients(
+        monkeypatch,
+        [
+            {"patient_id": "a", "symptoms": ["cough"]},
+            {"patient_id": "empty", "symptoms": []},
+        ],
+    )
+    monkeypatch.setattr(main, "generate_assessment", AsyncMock(return_value=AgentOutput(**mock_agent_output)))
+
+    res = client.post("/assess/batch", json={"patient_ids": ["a", "missing", "empty"]})
+    assert res.status_code == 200
+    items = {item["patient_id"]: item for item in res.json()["items"]}
+    assert items["a"]["status"] == "degraded"
+    assert items["a"]["response"] is not None
+    assert items["missing"]["status"] == "error"
+    assert items["missing"]["errors"][0]["code"] == "INVALID_PATIENT"
+    assert items["empty"]["errors"][0]["code"] == "EMPTY_SYMPTOMS"
+
+
+def test_batch_bounds_parallelism(monkeypatch, mock_agent_output):
+    import asyncio
+
+    from app import main
+
+    _set_rag(monkeypatch, [])
+    _set_patients(monkeypatch, [{"patient_id": f"p{i}", "symptoms": [f"s{i}"]} for i in range(6)])
+    monkeypatch.setattr(main.settings, "batch_max_concurrency", 2)
+    state = {"active": 0, "peak": 0}
+
+    async def _generate(q, c, **_):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return AgentOutput(**mock_agent_output)
+
+    monkeypatch.setattr(main, "generate_assessment", _generate)
+
+    res = client.post("/assess/batch", json={"patient_ids": [f"p{i}" for i in range(6)]})
+    assert res.status_code == 200
+    assert res.json()["distinct_symptom_sets"] == 6
+    assert state["peak"] == 2
+
+
+def test_batch_rejects_empty_list():
+    res = client.post("/assess/batch", json={"patient_ids": []})
+    assert res.status_code == 422
@@ -0,0 +1,115 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import AgentOutput
+from app.resilience import ResponseCache
+
+client = TestClient(app)
+
+
+def _capture(monkeypatch, mock_agent_output):
+    from app import main
+
+    class _Rag:
+        async def query(self, q, k):
+            return []
+
+    prompts = []
+
+    async def _generate(q, c, **_):
+        prompts.append(q)
+        return AgentOutput(**mock_agent_output)
+
+    monkeypatch.setattr(main, "_rag_instance", _Rag())
+    monkeypatch.setattr(main, "generate_assessment", _generate)
+    return prompts
+
+
+def test_session_carries_history_between_turns(monkeypatch, mock_agent_output):
+    prompts = _capture(monkeypatch, mock_agent_output)
+
+    first = client.post("/chat", json={"question": "Is visible haematuria urgent?"}).json()
+    session_id = first["session_id"]
+    assert session_id
+
+    second = client.post("/chat", json={"question": "What about age 45?", "session_id": session_id}).json()
+    assert second["session_id"] == session_id
+    assert "SESSION_NOT_FOUND" not in [e["code"] for e in second["errors"] or []]
+    assert prompts[0] == "Is visible haematuria urgent?"
+    assert "user: Is visible haematuria urgent?" in prompts[1]
+    assert "assistant: Insufficient Evidence." in prompts[1]
+    assert prompts[1].endswith("User question: What about age 45?")
+
+
+def test_prompt_size_stays_flat_as_conversation_grows(monkeypatch, mock_agent_output):
+    from app.config import settings
+
+    prompts = _capture(monkeypatch, mock_agent_output)
+    monkeypatch.setattr(settings, "chat_history_token_budget", 200)
+    questions = [f"Question {i}: " + "detail " * 300 for i in range(30)]
+    session_id = None
+    for question in questions:
+        body = client.post("/chat", json={"question": question, "session_id": session_id}).json()
+        session_id = body["session_id"]
+    history_chars = [len(p) - len(q) for p, q in zip(prompts, questions)]
+    # About 4 characters per token, plus the fixed prompt framing.
+    assert max(history_chars) <= 200 * 4 + 120
+    assert history_chars[-1] <= history_chars[10] + 20
+
+
+def test_history_seeds_only_a_new_session(monkeypatch, mock_agent_output):
+    prompts = _capture(monkeypatch, mock_agent_output)
+    history = [{"role": "user", "content": "Earlier question"}]
+
+    body = client.post("/chat", json={"question": "Next?", "history": history}).json()
+    client.post(
+        "/chat",
+        json={"question": "Again?", "session_id": body["session_id"], "history": [{"role": "user", "content": "X"}]},
+    )
+    assert "user: Earlier question" in prompts[0]
+    assert "user: X" not in prompts[1]
+
+
+def test_unknown_session_id_gets_a_fresh_session(monkeypatch, mock_agent_output):
+    prompts = _capture(monkeypatch, mock_agent_output)
+
+    body = client.post("/chat", json={"question": "Is visible haematuria urgent?", "session_id": "chosen-by-client"}).json()
+    assert body["session_id"] != "chosen-by-client"
+    again = client.post("/chat", json={"question": "And now?", "session_id": "chosen-by-client"}).json()
+    assert again["session_id"] not in ("chosen-by-client", body["session_id"])
+    assert prompts[1] == "And now?"
+    assert body["status"] == "degraded"
+    assert body["errors"][0]["code"] == "SESSION_NOT_FOUND"
+
+
+def test_history_list_length_is_capped():
+    history = [{"role": "user", "content": "x"}] * 21
+    assert client.post("/chat", json={"question": "q", "history": history}).status_code == 422
+
+
+def test_same_follow_up_in_different_conversations_is_not_reused(monkeypatch, mock_chunks, mock_urgent_output):
+    from app import agent, main
+    from app.rag import Chunk
+
+    class _Rag:
+        async def query(self, q, k):
+            return [Chunk(**c) for c in mock_chunks]
+
+    calls = []
+
+    async def _gemini(prompt):
+        calls.append(prompt)
+        return json.dumps(mock_urgent_output)
+
+    monkeypatch.setattr(agent, "_cache", ResponseCache())
+    monkeypatch.setattr(main, "_rag_instance", _Rag())
+    monkeypatch.setattr(agent, "_call_gemini", _gemini)
+    for history in ("Is visible haematuria urgent at 60?", "Is a breast lump urgent at 30?"):
+        body = client.post(
+            "/chat",
+            json={"question": "What about under 40?", "history": [{"role": "user", "content": history}]},
+        ).json()
+        assert body["status"] == "ok"
+    assert len(calls) == 2
@@ -0,0 +1,74 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import AgentOutput
+
+client = TestClient(app)
+
+
+def _events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _set_rag(monkeypatch, results):
+    from app import main
+
+    class _Rag:
+        async def query(self, q, k):
+            return results
+
+    monkeypatch.setattr(main, "_rag_instance", _Rag())
+
+
+def test_stream_sends_citations_tokens_then_final(monkeypatch, mock_chunks, mock_urgent_output):
+    from app import main
+    from app.rag import Chunk
+
+    _set_rag(monkeypatch, [Chunk(**c) for c in mock_chunks])
+
+    async def _stream(question, chunks, cache_key=None):
+        yield "token", "Supported "
+        yield "token", "by NG12."
+        yield "final", (AgentOutput(**mock_urgent_output), {})
+
+    monkeypatch.setattr(main, "stream_assessment", _stream)
+
+    res = client.post("/chat/stream", json={"question": "Visible haematuria?"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    events = _events(res.text)
+    assert [e for e, _ in events] == ["citations", "token", "token", "final"]
+    assert events[0][1]["citations"][0]["chunk_id"] == "ng12_p1_c0"
+    assert "".join(d["text"] for e, d in events if e == "token") == "Supported by NG12."
+    assert events[-1][1]["result"]["assessment"] == "Urgent Referral"
+    assert events[-1][1]["status"] == "ok"
+
+
+def test_stream_degrades_when_generation_fails(monkeypatch):
+    from app import main
+
+    _set_rag(monkeypatch, [])
+
+    async def _stream(question, chunks, cache_key=None):
+        raise RuntimeError("Gemini unavailable")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(main, "stream_assessment", _stream)
+
+    res = client.post("/chat/stream", json={"question": "Test"})
+    events = _events(res.text)
+    final = events[-1][1]
+    assert events[-1][0] == "final"
+    assert final["status"] == "degraded"
+    assert {e["code"] for e in final["errors"]} >= {"RETRIEVAL_EMPTY", "GENERATION_FAILED"}
+
+
+def test_stream_rejects_empty_question():
+    res = client.post("/chat/stream", json={"question": ""})
+    assert res.status_code == 422
@@ -0,0 +1,28 @@
+from unittest.mock import AsyncMock
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import AgentOutput
+
+client = TestClient(app)
+
+
+def test_endpoint_deadline_reaches_retrieval(monkeypatch, mock_agent_output):
+    from app import main
+    from app.config import settings
+    from app.deadline import remaining
+
+    budgets = []
+
+    class _Rag:
+        async def query(self, q, k):
+            budgets.append(remaining())
+            return []
+
+    monkeypatch.setattr(main, "_rag_instance", _Rag())
+    monkeypatch.setattr(main, "generate_assessment", AsyncMock(return_value=AgentOutput(**mock_agent_output)))
+    monkeypatch.setattr(settings, "chat_deadline_s", 7.0)
+
+    assert client.post("/chat", json={"question": "q"}).status_code == 200
+    assert 0 < budgets[0] <= 7.0
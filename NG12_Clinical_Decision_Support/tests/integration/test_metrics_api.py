@@ -0,0 +1,49 @@
+from unittest.mock import AsyncMock
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import AgentOutput
+
+client = TestClient(app)
+
+
+def test_metrics_exposes_prometheus_text(monkeypatch, mock_agent_output):
+    from app import main
+
+    monkeypatch.setattr(main, "_rag_instance", None)
+    monkeypatch.setattr(main, "_rag_retry_at", float("inf"))
+    monkeypatch.setattr(main, "generate_assessment", AsyncMock(return_value=AgentOutput(**mock_agent_output)))
+
+    assert client.post("/chat", json={"question": "Unexplained weight loss?"}).status_code == 200
+    client.get("/does-not-exist")
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    text = res.text
+    assert "# TYPE cds_stage_latency_seconds histogram" in text
+    assert 'cds_request_latency_seconds_count{endpoint="/chat",method="POST"}' in text
+    assert 'cds_responses_total{endpoint="other",status="404"}' in text
+    assert 'cds_degraded_responses_total{endpoint="/chat",code="RETRIEVAL_EMPTY"}' in text
+    assert 'cds_cache_events_total{cache="response",event="hits"}' in text
+
+
+def test_lexical_only_retrieval_is_reported(monkeypatch, mock_chunks, mock_agent_output):
+    from app import main
+    from app.rag import Chunk, Retrieval
+
+    class _Rag:
+        async def query(self, q, k):
+            return Retrieval([Chunk(**c) for c in mock_chunks], lexical_only=True)
+
+        def stats(self):
+            return {"embedding_cache": {}, "singleflight": {}}
+
+    monkeypatch.setattr(main, "_rag_instance", _Rag())
+    monkeypatch.setattr(main, "generate_assessment", AsyncMock(return_value=AgentOutput(**mock_agent_output)))
+
+    body = client.post("/chat", json={"question": "Persistent hoarseness?"}).json()
+    assert body["status"] == "degraded"
+    assert [e["code"] for e in body["errors"]] == ["RETRIEVAL_LEXICAL_ONLY"]
+    assert 'cds_degraded_responses_total{endpoint="/chat",code="RETRIEVAL_LEXICAL_ONLY"}' in client.get("/metrics").text
@@ -0,0 +1,165 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+class _Pool:
+    def generative_model(self, name):
+        return object()
+
+    def embedding_model(self, name):
+        return object()
+
+    def stats(self):
+        return {}
+
+
+def _fresh(monkeypatch):
+    from app import health, main
+
+    monkeypatch.setattr(health, "_state", {name: {"status": "pending"} for name in health.DEPENDENCIES})
+    monkeypatch.setattr(main, "_rag_instance", None)
+    monkeypatch.setattr(main, "_rag_retry_at", 0.0)
+    monkeypatch.setattr(main, "_probe_at", 0.0)
+    monkeypatch.setattr(main, "get_pool", lambda project, location: _Pool())
+    monkeypatch.setattr(main.settings, "preload_backoff_s", 0.1)
+
+
+def test_ready_after_preload(monkeypatch):
+    from app import main
+
+    _fresh(monkeypatch)
+
+    class _Rag:
+        async def query(self, q, k):
+            return []
+
+    monkeypatch.setattr(main, "ChromaRAG", _Rag)
+
+    with TestClient(app) as client:
+        res = client.get("/ready")
+        assert res.status_code == 200
+        deps = res.json()["dependencies"]
+        assert {d["status"] for d in deps.values()} == {"ready"}
+        assert isinstance(main._rag_instance, _Rag)
+
+
+def test_not_ready_when_vector_store_fails(monkeypatch):
+    from app import main
+
+    _fresh(monkeypatch)
+    monkeypatch.setattr(main.settings, "preload_max_attempts", 2)
+    attempts = {"n": 0}
+
+    def _broken():
+        attempts["n"] += 1
+        raise RuntimeError("collection missing")
+
+    monkeypatch.setattr(main, "ChromaRAG", _broken)
+
+    with TestClient(app) as client:
+        res = client.get("/ready")
+        assert res.status_code == 503
+        vector_store = res.json()["dependencies"]["vector_store"]
+        assert vector_store["status"] == "failed"
+        assert vector_store["error"] == "RuntimeError"
+        assert client.get("/health").status_code == 200
+    assert attempts["n"] == 2
+
+
+def test_failed_rag_is_not_rebuilt_on_every_request(monkeypatch, mock_agent_output):
+    from app import main
+    from app.models import AgentOutput
+
+    _fresh(monkeypatch)
+    attempts = {"n": 0}
+
+    def _broken():
+        attempts["n"] += 1
+        raise RuntimeError("collection missing")
+
+    monkeypatch.setattr(main, "ChromaRAG", _broken)
+    monkeypatch.setattr(main, "generate_assessment", AsyncMock(return_value=AgentOutput(**mock_agent_output)))
+
+    client = TestClient(app)
+    for _ in range(3):
+        assert client.post("/chat", json={"question": "Test"}).status_code == 200
+    assert attempts["n"] == 1
+
+
+def test_ready_without_preload(monkeypatch):
+    from app import main
+
+    _fresh(monkeypatch)
+    monkeypatch.setattr(main.settings, "preload_on_startup", False)
+
+    class _Rag:
+        pass
+
+    monkeypatch.setattr(main, "ChromaRAG", _Rag)
+
+    with TestClient(app) as client:
+        res = client.get("/ready")
+        assert res.status_code == 200
+        assert res.json()["dependencies"]["generation"]["via"] == "probe"
+
+
+def test_ready_recovers_after_failed_preload(monkeypatch):
+    from app import main
+
+    _fresh(monkeypatch)
+    monkeypatch.setattr(main.settings, "preload_max_attempts", 1)
+    broken = {"on": True}
+
+    class _Rag:
+        def __init__(self):
+            if broken["on"]:
+                raise RuntimeError("collection missing")
+
+    monkeypatch.setattr(main, "ChromaRAG", _Rag)
+
+    with TestClient(app) as client:
+        assert client.get("/ready").status_code == 503
+        broken["on"] = False
+        # Still inside the retry interval.
+        assert client.get("/ready").status_code == 503
+        monkeypatch.setattr(main, "_probe_at", 0.0)
+        monkeypatch.setattr(main, "_rag_retry_at", 0.0)
+        assert client.get("/ready").status_code == 200
+
+
+def test_successful_generation_marks_dependency_ready(monkeypatch, mock_chunks, mock_urgent_output):
+    import asyncio
+    import json
+
+    from app import agent, health
+    from app.resilience import CircuitBreaker, ResponseCache
+
+    _fresh(monkeypatch)
+    monkeypatch.setattr(agent, "_breaker", CircuitBreaker())
+    monkeypatch.setattr(agent, "_cache", ResponseCache(max_items=10, ttl_s=60))
+
+    async def _gemini(prompt):
+        return json.dumps(mock_urgent_output)
+
+    monkeypatch.setattr(agent, "_call_gemini", _gemini)
+    health.mark_failed("generation", RuntimeError("boot"))
+    asyncio.run(agent.generate_assessment("Visible haematuria?", mock_chunks))
+    generation = health.readiness_payload()[1]["dependencies"]["generation"]
+    assert generation["status"] == "ready"
+    assert generation["via"] == "request"
+
+
+def test_heavy_sdks_are_imported_lazily():
+    code = "import sys, app.main; print('vertexai' in sys.modules, 'chromadb' in sys.modules)"
+    env = {**os.environ, "CDS_PROJECT_ID": os.environ.get("CDS_PROJECT_ID", "test")}
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False False"
@@ -0,0 +1,58 @@
+from unittest.mock import AsyncMock
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import AgentOutput
+
+client = TestClient(app)
+
+
+def _setup(monkeypatch, output):
+    from app import main
+
+    class _Rag:
+        async def query(self, q, k):
+            return []
+
+    monkeypatch.setattr(main, "_rag_instance", _Rag())
+    monkeypatch.setattr(main, "generate_assessment", AsyncMock(return_value=AgentOutput(**output)))
+
+
+def test_assess_exports_spans_with_correlation_id(monkeypatch, mock_agent_output, span_exporter):
+    _setup(monkeypatch, mock_agent_output)
+
+    res = client.post("/assess", json={"patient_id": "patient_001"}, headers={"X-Correlation-ID": "trace-me"})
+    assert res.status_code == 200
+    assert res.json()["correlation_id"] == "trace-me"
+    assert "get_patient;dur=" in res.headers["Server-Timing"]
+    assert "total;dur=" in res.headers["Server-Timing"]
+    spans = [s for s in span_exporter.spans if s.trace_id == "trace-me"]
+    assert [s.name for s in spans] == ["get_patient"]
+
+
+def test_generated_correlation_id_matches_trace(monkeypatch, mock_agent_output, span_exporter):
+    _setup(monkeypatch, mock_agent_output)
+
+    res = client.post("/assess", json={"patient_id": "patient_001"})
+    correlation_id = res.json()["correlation_id"]
+    assert any(s.trace_id == correlation_id for s in span_exporter.spans)
+
+
+def test_stream_exports_spans_after_last_event(monkeypatch, mock_agent_output, span_exporter):
+    from app import main
+    from app.tracing import span
+
+    _setup(monkeypatch, mock_agent_output)
+
+    async def _stream(q, c, **_):
+        with span("generate_stream"):
+            yield "token", "partial"
+        yield "final", (AgentOutput(**mock_agent_output), {})
+
+    monkeypatch.setattr(main, "stream_assessment", _stream)
+
+    res = client.post("/chat/stream", json={"question": "q"}, headers={"X-Correlation-ID": "stream-1"})
+    assert res.status_code == 200
+    assert "Server-Timing" in res.headers
+    assert [s.name for s in span_exporter.spans if s.trace_id == "stream-1"] == ["generate_stream"]
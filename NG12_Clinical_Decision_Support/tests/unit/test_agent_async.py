@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from app import agent
+from app.resilience import CircuitBreaker, ResponseCache, RetryPolicy
+
+
+def _fresh_state(monkeypatch):
+    monkeypatch.setattr(agent, "_breaker", CircuitBreaker(failure_threshold=5, reset_after_s=30))
+    monkeypatch.setattr(agent, "_cache", ResponseCache(max_items=10, ttl_s=60))
+    monkeypatch.setattr(agent, "_retry", RetryPolicy(max_attempts=2, backoff_s=0.1))
+
+
+def test_generation_runs_concurrently(monkeypatch, mock_chunks, mock_urgent_output):
+    import json
+
+    _fresh_state(monkeypatch)
+
+    async def _slow_gemini(prompt):
+        await asyncio.sleep(0.2)
+        return json.dumps(mock_urgent_output)
+
+    monkeypatch.setattr(agent, "_call_gemini", _slow_gemini)
+
+    async def _run():
+        return await asyncio.gather(
+            *[agent.generate_assessment(f"question {i}", mock_chunks) for i in range(5)]
+        )
+
+    started = time.perf_counter()
+    results = asyncio.run(_run())
+    elapsed = time.perf_counter() - started
+
+    assert all(output.assessment == "Urgent Referral" for output, _ in results)
+    assert elapsed < 0.6
+
+
+def test_retry_backoff_does_not_block_event_loop(monkeypatch, mock_chunks):
+    _fresh_state(monkeypatch)
+    calls = {"n": 0}
+
+    async def _failing_gemini(prompt):
+        calls["n"] += 1
+        raise TimeoutError("Gemini timeout")
+
+    monkeypatch.setattr(agent, "_call_gemini", _failing_gemini)
+    ticks = {"n": 0}
+
+    async def _ticker():
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks["n"] += 1
+
+    async def _run():
+        result, _ = await asyncio.gather(agent.generate_assessment("q", mock_chunks), _ticker())
+        return result
+
+    output, meta = asyncio.run(_run())
+    assert calls["n"] == 2
+    assert ticks["n"] == 5
+    assert meta["reason"] == "generation_failed"
+    assert output.assessment == "Insufficient Evidence"
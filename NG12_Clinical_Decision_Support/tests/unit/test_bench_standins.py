@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+
+from app import clients
+from app.agent import _format_context
+from benchmarks.standins import (
+    Profile,
+    RecordedGenerativeModel,
+    Recording,
+    StandInEmbeddingModel,
+    StandInGenerativeModel,
+    StandInUnavailable,
+    answer_for,
+)
+
+
+def test_answer_cites_first_context_block(mock_chunks):
+    answer = json.loads(answer_for(_format_context(mock_chunks)))
+    assert answer["citations"][0]["chunk_id"] == "ng12_p1_c0"
+    assert answer["citations"][0]["excerpt"] in mock_chunks[0]["text"]
+
+
+def test_injected_failure_raises():
+    model = StandInGenerativeModel(Profile(error_rate=1.0, seed=1))
+    with pytest.raises(StandInUnavailable):
+        asyncio.run(model.generate_content_async("prompt"))
+
+
+def test_embeddings_are_deterministic():
+    model = StandInEmbeddingModel()
+    first = asyncio.run(model.get_embeddings_async(["rectal bleeding"]))[0].values
+    assert first == model.get_embeddings(["rectal bleeding"])[0].values
+
+
+def test_recording_replays_and_misses_loudly(tmp_path):
+    path = tmp_path / "rec.json"
+    recording = Recording(path)
+    model = RecordedGenerativeModel(StandInGenerativeModel(), recording)
+    text = asyncio.run(model.generate_content_async("prompt")).text
+    recording.save()
+
+    replay = RecordedGenerativeModel(StandInGenerativeModel(Profile(error_rate=1.0)), Recording(path, replay=True))
+    assert asyncio.run(replay.generate_content_async("prompt")).text == text
+
+    async def _stream():
+        responses = await replay.generate_content_async("prompt", stream=True)
+        return "".join([r.text async for r in responses])
+
+    assert asyncio.run(_stream()) == text
+    with pytest.raises(KeyError):
+        asyncio.run(replay.generate_content_async("other prompt"))
+    assert replay.recording.misses == 1
+
+
+def test_bench_corpus_has_no_retrieval_ties():
+    from benchmarks.bench_api import SYMPTOMS, build_corpus
+    from benchmarks.standins import hashed_embedding
+
+    ids, docs, _ = build_corpus(30, 10)
+    vectors = [hashed_embedding(d) for d in docs]
+    assert len(set(docs)) == len(docs)
+    for symptom in SYMPTOMS:
+        query = hashed_embedding(f"Does {symptom} need referral?")
+        scores = sorted((round(sum(a * b for a, b in zip(query, v)), 9) for v in vectors), reverse=True)[:10]
+        assert len(set(scores)) == len(scores), symptom
+
+
+def test_use_backends_swaps_model_factories():
+    try:
+        clients.use_backends(lambda name: StandInGenerativeModel(), lambda name: StandInEmbeddingModel())
+        pool = clients.get_pool("proj", "us-central1")
+        assert isinstance(pool.generative_model("gemini"), StandInGenerativeModel)
+        assert isinstance(pool.embedding_model("text-embedding"), StandInEmbeddingModel)
+    finally:
+        clients.use_backends()
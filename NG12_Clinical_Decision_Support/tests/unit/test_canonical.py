@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+from app import agent
+from app.canonical import assess_question, conversation_key, generation_key, standalone_question, symptom_set
+from app.resilience import CircuitBreaker, ResponseCache
+
+
+def test_symptom_set_is_order_case_and_duplicate_insensitive():
+    assert symptom_set(["Cough", "fatigue", " cough"]) == symptom_set(["FATIGUE", "cough"])
+    assert symptom_set(["", "  "]) == ()
+    assert symptom_set("Hoarseness") == ("hoarseness",)
+
+
+def test_standalone_question_normalization():
+    assert standalone_question("What does  NG12 say?") == standalone_question("what does ng12 say")
+
+
+def test_generation_key_includes_chunk_ids():
+    a = [{"metadata": {"chunk_id": "ng12_p1_c0"}}, {"metadata": {"chunk_id": "ng12_p2_c0"}}]
+    b = list(reversed(a))
+    c = [{"metadata": {"chunk_id": "ng12_p3_c0"}}]
+    assert generation_key("q", a) == generation_key("q", b)
+    assert generation_key("q", a) != generation_key("q", c)
+    assert generation_key("q", a) != generation_key("other", a)
+
+
+def test_equivalent_assess_requests_share_one_generation(monkeypatch, mock_chunks, mock_urgent_output):
+    monkeypatch.setattr(agent, "_breaker", CircuitBreaker())
+    monkeypatch.setattr(agent, "_cache", ResponseCache(max_items=10, ttl_s=60))
+    calls = {"n": 0}
+
+    async def _gemini(prompt):
+        calls["n"] += 1
+        return json.dumps(mock_urgent_output)
+
+    monkeypatch.setattr(agent, "_call_gemini", _gemini)
+
+    first, _ = asyncio.run(agent.generate_assessment(assess_question(symptom_set(["b", "A"])), mock_chunks))
+    second, meta = asyncio.run(agent.generate_assessment(assess_question(symptom_set(["a", "b", "a"])), mock_chunks))
+    assert calls["n"] == 1
+    assert meta == {"cache": "reused"}
+    assert second == first
+
+
+def test_chat_history_does_not_defeat_cache(monkeypatch, mock_chunks, mock_urgent_output):
+    monkeypatch.setattr(agent, "_breaker", CircuitBreaker())
+    monkeypatch.setattr(agent, "_cache", ResponseCache(max_items=10, ttl_s=60))
+    calls = {"n": 0}
+
+    async def _gemini(prompt):
+        calls["n"] += 1
+        return json.dumps(mock_urgent_output)
+
+    monkeypatch.setattr(agent, "_call_gemini", _gemini)
+    key = standalone_question("Visible haematuria?")
+    asyncio.run(agent.generate_assessment("Conversation so far:\nuser: hi\n\nUser question: x", mock_chunks, cache_key=key))
+    asyncio.run(agent.generate_assessment("visible haematuria", mock_chunks, cache_key=key))
+    assert calls["n"] == 1
+
+
+def test_follow_up_key_depends_on_history():
+    assert conversation_key("What about under 40?") == standalone_question("What about under 40?")
+    first = conversation_key("What about under 40?", "user: Is visible haematuria urgent?")
+    second = conversation_key("What about under 40?", "user: Is a breast lump urgent?")
+    assert first != second
+    assert first == conversation_key("what about under 40", "user: Is visible haematuria urgent?")
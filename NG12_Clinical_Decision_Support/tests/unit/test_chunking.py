@@ -0,0 +1,77 @@
+import time
+
+from ingestion.chunking import chunk_pages
+from ingestion.ingest_ng12 import iter_chunks
+
+FOOTER = (
+    "Suspected cancer: recognition and referral (NG12)\n"
+    "© NICE 2026. All rights reserved. Subject to Notice of rights (https://www.nice.org.uk/terms-and-\n"
+    "conditions#notice-of-rights).\nPage {page} of\n95"
+)
+
+PAGES = [
+    (
+        9,
+        "1.1 Lung and pleural cancers \nLung cancer \n"
+        "1.1.1 Refer people using a suspected cancer pathway referral for lung cancer if they: \n"
+        "• have chest X-ray findings that suggest lung cancer or \n"
+        "• are aged 40 and over with unexplained haemoptysis. [2015] \n"
+        "1.1.2 Offer an urgent chest X-ray (to be done within 2 weeks) to assess for \n"
+        + FOOTER.format(page=9),
+    ),
+    (
+        10,
+        "lung cancer in people aged 40 and over if they have 2 or more unexplained symptoms. [2015] \n"
+        "Mesothelioma \n"
+        "1.1.4 Refer people using a suspected cancer pathway referral for mesothelioma if they \n"
+        "have chest X-ray findings that suggest mesothelioma. [2015] \n"
+        "1.2 Upper gastrointestinal tract cancers \n"
+        "1.2.1 Refer people using a suspected cancer pathway referral for oesophageal cancer if they have dysphagia. [2015] \n"
+        + FOOTER.format(page=10),
+    ),
+]
+
+
+def test_recommendations_stay_whole_across_pages():
+    chunks = list(chunk_pages(PAGES, 1200))
+    assert [c.recommendations for c in chunks] == [["1.1.1", "1.1.2", "1.1.4"], ["1.2.1"]]
+    first = chunks[0]
+    assert (first.page, first.page_end) == (9, 10)
+    assert "to assess for lung cancer in people aged 40" in first.text
+    assert "© NICE" not in first.text and "Page 9 of" not in first.text
+    assert "\nMesothelioma\n1.1.4 Refer" in first.text
+
+
+def test_oversized_recommendations_split_at_sentences():
+    chunks = list(chunk_pages(PAGES, 180))
+    assert all(len(c.text) <= 180 for c in chunks)
+    assert not any(c.text.startswith("[2015]") for c in chunks)
+    spanning = [c for c in chunks if c.recommendations == ["1.1.2"]]
+    assert [(c.page, c.page_end) for c in spanning] == [(9, 10)]
+    assert spanning[0].text.endswith("2 or more unexplained symptoms. [2015]")
+    # No text is repeated between chunks.
+    assert sum(len(c.text) for c in chunks) <= sum(len(t) for _, t in PAGES)
+
+
+def test_long_unpunctuated_text_is_hard_split():
+    chunks = list(chunk_pages([(1, "word " * 1000)], 100))
+    assert all(0 < len(c.text) <= 100 for c in chunks)
+    assert sum(c.text.count("word") for c in chunks) == 1000
+
+
+def test_chunking_time_is_linear():
+    def _elapsed(n):
+        pages = [(i + 1, "1.1.1 Refer urgently if they have a lump. [2015] \n" * 40) for i in range(n)]
+        started = time.perf_counter()
+        list(chunk_pages(pages, 1200))
+        return time.perf_counter() - started
+
+    _elapsed(10)
+    assert _elapsed(400) < _elapsed(100) * 8
+
+
+def test_ids_and_metadata_follow_start_page():
+    records = list(iter_chunks(PAGES, 1200, {"chunker": "structured"}))
+    assert [r[0] for r in records] == ["ng12_p9_c0", "ng12_p10_c0"]
+    meta = records[0][2]
+    assert (meta["page"], meta["page_end"], meta["recommendations"]) == (9, 10, "1.1.1,1.1.2,1.1.4")
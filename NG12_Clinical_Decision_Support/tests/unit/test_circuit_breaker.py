@@ -0,0 +1,120 @@
+import asyncio
+import json
+import threading
+
+from app import agent
+from app.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, ResponseCache, breaker_for
+
+
+def _breaker(**kwargs):
+    now = [0.0]
+    options = dict(failure_threshold=3, reset_after_s=10, window_s=60, error_rate=0.5, clock=lambda: now[0])
+    options.update(kwargs)
+    return CircuitBreaker(**options), now
+
+
+def test_opens_on_error_rate_not_failure_count():
+    breaker, now = _breaker()
+    for _ in range(4):
+        breaker.record_success()
+        breaker.record_success()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.is_open()
+    assert not breaker.allow()
+
+
+def test_failures_age_out_of_window():
+    breaker, now = _breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    now[0] = 61.0
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_failures"] == 1
+
+
+def test_half_open_admits_limited_probes():
+    breaker, now = _breaker(half_open_probes=2)
+    for _ in range(3):
+        breaker.record_failure()
+    now[0] = 10.0
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() and breaker.allow()
+    assert not breaker.allow()
+    assert breaker.is_open()
+    breaker.record_success()
+    assert breaker.state == HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_probe_failure_reopens_and_lost_probes_expire():
+    breaker, now = _breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    now[0] = 10.0
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    now[0] = 20.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    # The probe's caller never reported back.
+    now[0] = 30.0
+    assert breaker.allow()
+
+
+def test_half_open_is_thread_safe():
+    breaker, now = _breaker(half_open_probes=3)
+    for _ in range(3):
+        breaker.record_failure()
+    now[0] = 10.0
+    admitted = []
+    barrier = threading.Barrier(16)
+
+    def _try():
+        barrier.wait()
+        admitted.append(breaker.allow())
+
+    threads = [threading.Thread(target=_try) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert admitted.count(True) == 3
+
+
+def test_one_breaker_per_dependency():
+    assert breaker_for("embedding") is breaker_for("embedding")
+    assert breaker_for("embedding") is not breaker_for("generation")
+    assert breaker_for("vector_store").name == "vector_store"
+
+
+def test_half_open_generation_sends_one_probe(monkeypatch, mock_chunks, mock_urgent_output):
+    breaker, now = _breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    now[0] = 10.0
+    monkeypatch.setattr(agent, "_breaker", breaker)
+    monkeypatch.setattr(agent, "_cache", ResponseCache(max_items=10, ttl_s=60))
+    calls = []
+
+    async def _gemini(prompt):
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        return json.dumps(mock_urgent_output)
+
+    monkeypatch.setattr(agent, "_call_gemini", _gemini)
+
+    async def _run():
+        return await asyncio.gather(*[agent.generate_assessment(f"question {i}", mock_chunks) for i in range(4)])
+
+    results = asyncio.run(_run())
+    assert len(calls) == 1
+    assert sorted(meta.get("reason", "probe") for _, meta in results) == ["breaker_open"] * 3 + ["probe"]
+    assert breaker.state == CLOSED
@@ -0,0 +1,88 @@
+from app import citations
+from app.agent import _validate_output
+from app.citations import CitationIndex, index_for_collection, normalize_with_offsets
+from app.context import merge_adjacent
+from app.models import AgentOutput, Citation
+
+SOURCE = "Refer people using a suspected cancer pathway referral for inves-\ntigation of  unexplained haematuria."
+
+
+def _output(excerpt, chunk_id="ng12_p2_c0"):
+    return AgentOutput(
+        assessment="Urgent Referral",
+        reasoning="Based on NG12.",
+        citations=[Citation(source="NG12 PDF", page=2, chunk_id=chunk_id, excerpt=excerpt)],
+        confidence="high",
+    )
+
+
+def _chunk(chunk_id="ng12_p2_c0", text=SOURCE):
+    return {"text": text, "metadata": {"source": "NG12 PDF", "page": 2, "chunk_id": chunk_id}}
+
+
+def test_normalization_folds_case_whitespace_and_line_hyphens():
+    normalized, offsets = normalize_with_offsets("  Inves-\n tigation of “Haematuria” – café")
+    assert normalized == 'investigation of "haematuria" - cafe'
+    assert len(offsets) == len(normalized)
+    assert offsets[0] == 2
+
+
+def test_extraction_differences_validate_with_offsets():
+    validated = _validate_output(_output("investigation of unexplained Haematuria"), [_chunk()])
+    citation = validated.citations[0]
+    assert validated.assessment == "Urgent Referral"
+    assert SOURCE[citation.start:citation.end] == "inves-\ntigation of  unexplained haematuria"
+
+
+def test_word_hyphen_is_optional_on_both_sides():
+    split = "Consider a gender- related referral pathway."
+    citation = _validate_output(_output("gender-related referral"), [_chunk(text=split)]).citations[0]
+    assert split[citation.start:citation.end] == "gender- related referral"
+
+    joined = "Consider a gender-related referral pathway."
+    citation = _validate_output(_output("gender- related referral"), [_chunk(text=joined)]).citations[0]
+    assert joined[citation.start:citation.end] == "gender-related referral"
+    assert _validate_output(_output("gender-neutral referral"), [_chunk(text=split)]).assessment == (
+        "Insufficient Evidence"
+    )
+
+
+def test_unsupported_excerpt_still_rejected():
+    assert _validate_output(_output("investigation of visible haematuria"), [_chunk()]).assessment == (
+        "Insufficient Evidence"
+    )
+    assert _validate_output(_output(" "), [_chunk()]).assessment == "Insufficient Evidence"
+
+
+def test_merged_block_resolves_chunk_containing_excerpt():
+    first = "Recommendation 1.1.1 covers lung cancer in adults aged 40 and over with haemoptysis."
+    second = "aged 40 and over with haemoptysis. Recommendation 1.1.2 covers chest X-ray within 2 weeks."
+    block = merge_adjacent([_chunk("ng12_p2_c0", first), _chunk("ng12_p2_c1", second)])
+
+    validated = _validate_output(_output("chest X-ray within 2 weeks", "ng12_p2_c0"), block)
+    citation = validated.citations[0]
+    assert citation.chunk_id == "ng12_p2_c1"
+    assert second[citation.start:citation.end] == "chest X-ray within 2 weeks"
+
+    spanning = _validate_output(_output("adults aged 40 and over with haemoptysis. Recommendation 1.1.2"), block)
+    citation = spanning.citations[0]
+    assert citation.chunk_id == "ng12_p2_c0"
+    assert citation.start == first.index("adults")
+    assert citation.end > len(first)
+
+
+def test_index_is_built_once_per_collection_version(monkeypatch):
+    monkeypatch.setattr(citations, "_by_version", {})
+    monkeypatch.setattr(citations, "_active", CitationIndex())
+    first = index_for_collection(["ng12_p2_c0"], [SOURCE], "v1")
+    assert index_for_collection(["ng12_p2_c0"], [SOURCE], "v1") is first
+    assert citations.active_index() is first
+    assert index_for_collection(["ng12_p2_c0"], ["changed"], "v2") is not first
+
+    calls = []
+    original = citations.IndexedChunk.of
+    monkeypatch.setattr(citations.IndexedChunk, "of", classmethod(lambda cls, t: calls.append(t) or original(t)))
+    index = CitationIndex.build(["ng12_p2_c0"], [SOURCE])
+    calls.clear()
+    assert index.resolve(_chunk(), "ng12_p2_c0", "unexplained haematuria") is not None
+    assert calls == []
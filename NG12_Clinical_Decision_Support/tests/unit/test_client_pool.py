@@ -0,0 +1,50 @@
+import threading
+import time
+
+from app import clients
+from app.clients import ModelClientPool, get_pool
+
+
+def _patch(monkeypatch):
+    inits = []
+
+    class _Generative:
+        def __init__(self, name):
+            time.sleep(0.01)
+            self.name = name
+
+    class _Embedding:
+        @classmethod
+        def from_pretrained(cls, name):
+            return cls()
+
+    monkeypatch.setattr(clients, "_init_vertex", lambda project, location: inits.append(project))
+    monkeypatch.setattr(clients, "_create_generative", _Generative)
+    monkeypatch.setattr(clients, "_create_embedding", _Embedding.from_pretrained)
+    return inits
+
+
+def test_models_are_created_once_across_threads(monkeypatch):
+    inits = _patch(monkeypatch)
+    pool = ModelClientPool("proj", "us-central1")
+    seen = []
+
+    def _worker():
+        seen.append(pool.generative_model("gemini-1.5-pro"))
+
+    threads = [threading.Thread(target=_worker) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(m) for m in seen}) == 1
+    stats = pool.stats()
+    assert stats["generative_created"] == 1
+    assert stats["generative_requests"] == 16
+    assert len(inits) == 1
+
+
+def test_get_pool_is_process_wide():
+    assert get_pool("p", "l") is get_pool("p", "l")
+    assert get_pool("p", "l") is not get_pool("p", "other")
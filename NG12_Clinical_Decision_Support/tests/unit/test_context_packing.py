@@ -0,0 +1,65 @@
+from app.agent import _validate_output
+from app.context import context_tokens, merge_adjacent, pack_context
+from app.models import AgentOutput, Citation
+
+PAGE = " ".join(f"Recommendation 1.{i}.1 refer people with symptom {i} urgently." for i in range(40))
+
+
+def _chunks(page=3, rank=None):
+    # 400-character windows overlapping by 100, as ingestion produces them.
+    texts = [PAGE[start:start + 400].strip() for start in range(0, len(PAGE) - 100, 300)]
+    chunks = [
+        {"text": t, "metadata": {"source": "NG12 PDF", "page": page, "chunk_id": f"ng12_p{page}_c{j}"}, "score": j}
+        for j, t in enumerate(texts)
+    ]
+    return [chunks[i] for i in rank] if rank else chunks
+
+
+def test_adjacent_chunks_merge_without_repeated_overlap():
+    merged = merge_adjacent(_chunks(rank=[1, 0, 2]))
+    assert len(merged) == 1
+    assert merged[0]["metadata"]["chunk_ids"] == ["ng12_p3_c0", "ng12_p3_c1", "ng12_p3_c2"]
+    assert PAGE.startswith(merged[0]["text"])
+    assert merged[0]["score"] == 1
+
+
+def test_non_adjacent_chunks_stay_separate_in_rank_order():
+    merged = merge_adjacent(_chunks(rank=[4, 0]))
+    assert [m["metadata"]["chunk_id"] for m in merged] == ["ng12_p3_c4", "ng12_p3_c0"]
+    assert "chunk_ids" not in merged[0]["metadata"]
+
+
+def test_packing_respects_budget_and_rank():
+    chunks = _chunks(rank=[5, 0, 6, 2])
+    # c0 alone would overflow after c5, but c6 only adds the text past the overlap.
+    packed = pack_context(chunks, budget_tokens=180)
+    assert context_tokens(packed) <= 180
+    assert [m["metadata"]["chunk_id"] for m in packed] == ["ng12_p3_c5,ng12_p3_c6"]
+    assert len(pack_context(chunks, budget_tokens=0)) == 3
+
+
+def test_oversized_top_chunk_is_truncated_not_dropped():
+    packed = pack_context(_chunks()[:1], budget_tokens=10)
+    assert packed[0]["text"] == _chunks()[0]["text"][:40]
+
+
+def test_citation_spanning_merged_chunks_validates():
+    packed = pack_context(_chunks(rank=[0, 1]), budget_tokens=0)
+    boundary = len(_chunks()[0]["text"])
+    excerpt = packed[0]["text"][boundary - 30:boundary + 30]
+    output = AgentOutput(
+        assessment="Urgent Referral",
+        reasoning="Based on NG12.",
+        citations=[Citation(source="NG12 PDF", page=3, chunk_id="ng12_p3_c1", excerpt=excerpt)],
+        confidence="high",
+    )
+    assert _validate_output(output, packed).assessment == "Urgent Referral"
+    assert _validate_output(output, _chunks()[:1]).assessment == "Insufficient Evidence"
+
+
+def test_chunk_retrieved_twice_does_not_split_its_run():
+    chunks = _chunks()
+    merged = merge_adjacent([chunks[1], chunks[0], chunks[1], chunks[2]])
+    assert [m["metadata"]["chunk_id"] for m in merged] == ["ng12_p3_c0,ng12_p3_c1,ng12_p3_c2"]
+    packed = pack_context([chunks[1], chunks[0], chunks[1], chunks[2]], budget_tokens=2000)
+    assert packed == merged
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+
+from app import agent
+from app.deadline import DeadlineExceeded, deadline_scope, remaining, with_timeout
+from app.resilience import CLOSED, CircuitBreaker, ResponseCache, RetryPolicy
+
+
+def test_nested_scopes_only_shorten_budget():
+    assert remaining() is None
+    with deadline_scope(10):
+        with deadline_scope(60):
+            assert remaining() <= 10
+        with deadline_scope(1):
+            assert remaining() <= 1
+        assert 1 < remaining() <= 10
+    assert remaining() is None
+
+
+def test_timeout_distinguishes_budget_from_call_cap():
+    async def _slow():
+        await asyncio.sleep(1)
+
+    async def _run(budget, cap):
+        with deadline_scope(budget):
+            await with_timeout(_slow(), cap)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(_run(0.05, 5))
+    with pytest.raises(asyncio.TimeoutError) as exc:
+        asyncio.run(_run(5, 0.05))
+    assert not isinstance(exc.value, DeadlineExceeded)
+
+
+def test_backoff_is_exponential_jittered_and_budget_capped():
+    policy = RetryPolicy(backoff_s=1.0, max_backoff_s=3.0, min_attempt_s=0.5)
+    assert 0.5 <= policy.next_delay(1) <= 1.0
+    assert 1.0 <= policy.next_delay(2) <= 2.0
+    assert 1.5 <= policy.next_delay(5) <= 3.0
+    assert policy.next_delay(5, remaining=1.0) <= 0.5
+    assert policy.next_delay(1, remaining=0.4) is None
+
+
+def _state(monkeypatch, retry):
+    breaker = CircuitBreaker(failure_threshold=5)
+    monkeypatch.setattr(agent, "_breaker", breaker)
+    monkeypatch.setattr(agent, "_cache", ResponseCache(max_items=10, ttl_s=60))
+    monkeypatch.setattr(agent, "_retry", retry)
+    return breaker
+
+
+def test_retries_stop_when_budget_cannot_fit_attempt(monkeypatch, mock_chunks):
+    _state(monkeypatch, RetryPolicy(max_attempts=5, backoff_s=1.0, min_attempt_s=0.2))
+    calls = []
+
+    async def _failing(prompt):
+        calls.append(time.perf_counter())
+        raise ConnectionError("unavailable")
+
+    monkeypatch.setattr(agent, "_call_gemini", _failing)
+
+    async def _run():
+        with deadline_scope(0.3):
+            return await agent.generate_assessment("q", mock_chunks)
+
+    started = time.perf_counter()
+    output, meta = asyncio.run(_run())
+    assert len(calls) == 2
+    assert time.perf_counter() - started < 0.3
+    assert meta["reason"] == "generation_failed"
+
+
+def test_slow_generation_is_cut_at_deadline_without_tripping_breaker(monkeypatch, mock_chunks):
+    breaker = _state(monkeypatch, RetryPolicy(max_attempts=2, backoff_s=0.1, min_attempt_s=0.0))
+
+    class _Model:
+        async def generate_content_async(self, prompt, **_):
+            await asyncio.sleep(5)
+
+    monkeypatch.setattr(agent, "_model", lambda: _Model())
+    monkeypatch.setattr(agent, "_generation_config", lambda: None)
+
+    async def _run():
+        with deadline_scope(0.1):
+            return await agent.generate_assessment("q", mock_chunks)
+
+    started = time.perf_counter()
+    output, meta = asyncio.run(_run())
+    assert time.perf_counter() - started < 0.5
+    assert meta["reason"] == "deadline_exceeded"
+    assert output.assessment == "Insufficient Evidence"
+    assert breaker.stats() == {"state": CLOSED, "window_calls": 0, "window_failures": 0}
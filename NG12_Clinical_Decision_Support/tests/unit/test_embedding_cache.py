@@ -0,0 +1,84 @@
+import asyncio
+
+from app.embedding_cache import EmbeddingCache
+from app.rag import VertexEmbeddingClient
+from app.resilience import CircuitBreaker
+
+
+def test_normalized_text_hits():
+    cache = EmbeddingCache("text-embedding-004", max_items=4)
+    cache.set("Persistent  Hoarseness", [0.1, 0.2])
+    assert cache.get("persistent hoarseness ") == [0.1, 0.2]
+    assert cache.stats()["hits"] == 1
+
+
+def test_keys_include_model_name():
+    a = EmbeddingCache("model-a", max_items=4)
+    a.set("q", [1.0])
+    b = EmbeddingCache("model-b", max_items=4)
+    assert b.get("q") is None
+    assert b.stats()["misses"] == 1
+
+
+def test_lru_eviction():
+    cache = EmbeddingCache("m", max_items=2)
+    cache.set("a", [1.0])
+    cache.set("b", [2.0])
+    cache.get("a")
+    cache.set("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+    assert cache.stats()["size"] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    EmbeddingCache("m", max_items=2, path=path).set("visible haematuria", [0.5, 0.25])
+    reopened = EmbeddingCache("m", max_items=2, path=path)
+    assert reopened.get("Visible haematuria") == [0.5, 0.25]
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_keeps_newest_rows(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache("m", max_items=0, path=path, disk_max_items=3)
+    for i in range(10):
+        cache.set(f"q{i}", [float(i)])
+    assert cache._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 3
+    assert cache.get("q9") == [9.0]
+    assert cache.get("q6") is None
+
+
+def test_async_access_reaches_disk_tier(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+
+    async def _run():
+        await EmbeddingCache("m", max_items=2, path=path).aset("dyspepsia", [0.5])
+        reopened = EmbeddingCache("m", max_items=2, path=path)
+        return await reopened.aget("Dyspepsia"), await reopened.aget("dyspepsia"), reopened.stats()
+
+    first, second, stats = asyncio.run(_run())
+    assert first == second == [0.5]
+    assert (stats["disk_hits"], stats["hits"]) == (1, 1)
+
+
+def test_client_skips_remote_call_on_hit():
+    calls = {"n": 0}
+
+    class _Embedding:
+        values = [0.1, 0.2]
+
+    class _Model:
+        async def get_embeddings_async(self, texts):
+            calls["n"] += 1
+            return [_Embedding()]
+
+    client = VertexEmbeddingClient.__new__(VertexEmbeddingClient)
+    client._model = _Model()
+    client._cache = EmbeddingCache("m", max_items=4)
+    client._breaker = CircuitBreaker()
+
+    asyncio.run(client.embed("Dyspepsia"))
+    asyncio.run(client.embed("dyspepsia"))
+    assert calls["n"] == 1
+    assert client.cache_stats()["hits"] == 1
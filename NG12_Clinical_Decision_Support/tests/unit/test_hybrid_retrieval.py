@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from app.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+from app.rag import ChromaRAG, EmbeddingError
+from app.resilience import CircuitBreaker, RetryPolicy, SingleFlight
+
+DOCS = {
+    "ng12_p1_c0": "Refer people using a suspected cancer pathway referral for laryngeal cancer if they have persistent unexplained hoarseness.",
+    "ng12_p2_c0": "Offer a very urgent chest X-ray to assess for lung cancer in people aged 40 and over with haemoptysis.",
+    "ng12_p3_c0": "1.6.3 Refer people aged 45 and over with unexplained visible haematuria for bladder cancer.",
+}
+
+
+def _index():
+    ids = list(DOCS)
+    return BM25Index.build(ids, [DOCS[i] for i in ids], [{"chunk_id": i} for i in ids])
+
+
+def test_tokenize_keeps_recommendation_numbers():
+    assert "1.6.3" in tokenize("See 1.6.3 for details")
+    assert "the" not in tokenize("the hoarseness")
+
+
+def test_bm25_ranks_exact_term_first():
+    index = _index()
+    top = index.search("visible haematuria", 3)
+    assert index.ids[top[0][0]] == "ng12_p3_c0"
+    assert index.search("unrelatedterm", 3) == []
+
+
+def test_rrf_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=60)
+    assert fused[0][0] == "b"
+    assert {chunk_id for chunk_id, _ in fused} == {"a", "b", "c"}
+
+
+class _FailingEmbedder:
+    async def embed(self, text):
+        raise EmbeddingError("embedding outage")
+
+
+class _Collection:
+    def query(self, **kwargs):
+        ids = ["ng12_p2_c0", "ng12_p1_c0"]
+        return {
+            "documents": [[DOCS[i] for i in ids]],
+            "metadatas": [[{"chunk_id": i} for i in ids]],
+            "distances": [[0.1, 0.2]],
+        }
+
+
+class _Embedder:
+    async def embed(self, text):
+        return [0.0]
+
+
+def _rag(embedder):
+    rag = ChromaRAG.__new__(ChromaRAG)
+    rag._collection = _Collection()
+    rag._embedder = embedder
+    rag._breaker = CircuitBreaker(failure_threshold=5, reset_after_s=30)
+    rag._retry = RetryPolicy(max_attempts=1, backoff_s=0.1)
+    rag._lexical = _index()
+    rag._inflight = SingleFlight()
+    return rag
+
+
+def test_lexical_fallback_when_embedding_fails():
+    chunks = asyncio.run(_rag(_FailingEmbedder()).query("persistent hoarseness", 2))
+    assert chunks[0].metadata["chunk_id"] == "ng12_p1_c0"
+    assert chunks.lexical_only
+
+
+def test_unexpected_errors_are_not_hidden_by_lexical_fallback():
+    class _BrokenEmbedder:
+        async def embed(self, text):
+            raise KeyError("values")
+
+    with pytest.raises(KeyError):
+        asyncio.run(_rag(_BrokenEmbedder()).query("persistent hoarseness", 2))
+
+
+def test_fuses_dense_and_lexical_results():
+    chunks = asyncio.run(_rag(_Embedder()).query("persistent hoarseness", 3))
+    ids = [c.metadata["chunk_id"] for c in chunks]
+    # Ranked second by the vector store but first lexically.
+    assert ids[0] == "ng12_p1_c0"
+    assert set(ids) == {"ng12_p1_c0", "ng12_p2_c0"}
+    assert chunks[0].score > chunks[1].score
+    assert not chunks.lexical_only
@@ -0,0 +1,82 @@
+import time
+import uuid
+
+import chromadb
+import pytest
+
+from ingestion.ingest_ng12 import Manifest, embed_stream, file_sha256, ingest
+
+
+class _Embedding:
+    def __init__(self, text):
+        self.values = [float(len(text)), 1.0]
+
+
+class _Model:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.texts = []
+
+    def get_embeddings(self, texts):
+        if self.fail_on is not None and self.fail_on in texts:
+            raise RuntimeError("embedding backend down")
+        self.texts.extend(texts)
+        return [_Embedding(t) for t in texts]
+
+
+def _records(n):
+    for i in range(n):
+        chunk_id = f"ng12_p1_c{i}"
+        yield chunk_id, f"chunk {i}", {"source": "NG12 PDF", "page": 1, "chunk_id": chunk_id, "content_hash": "h"}
+
+
+def test_failed_run_keeps_committed_prefix_and_resumes():
+    collection = chromadb.EphemeralClient().get_or_create_collection(f"ng12_{uuid.uuid4().hex}")
+    commits = []
+    with pytest.raises(RuntimeError):
+        ingest(
+            collection,
+            _records(40),
+            _Model(fail_on="chunk 25"),
+            batch_size=5,
+            workers=2,
+            write_batch=10,
+            on_commit=lambda count, chunk_id: commits.append((count, chunk_id)),
+            progress=None,
+        )
+    assert commits == [(10, "ng12_p1_c9"), (20, "ng12_p1_c19")]
+    assert collection.count() == 20
+
+    # Even a forced re-embed only pays for what was not committed.
+    model = _Model()
+    stats = ingest(
+        collection, _records(40), model, batch_size=5, workers=2, write_batch=10, force=True, skip=20, progress=None
+    )
+    assert model.texts == [f"chunk {i}" for i in range(20, 40)]
+    assert stats["resumed"] == 20 and stats["added"] == 20 and stats["deleted"] == 0
+    assert collection.count() == 40
+
+
+def test_embed_stream_preserves_input_order():
+    class _Slow(_Model):
+        def get_embeddings(self, texts):
+            time.sleep(0.03 if texts[0] == "a" else 0.0)
+            return super().get_embeddings(texts)
+
+    out = [batch for batch, _ in embed_stream(_Slow(), [["a"], ["b"], ["c"]], workers=3)]
+    assert out == [["a"], ["b"], ["c"]]
+
+
+def test_manifest_round_trip_and_input_check(tmp_path):
+    pdf = tmp_path / "ng12.pdf"
+    pdf.write_bytes(b"%PDF-1.4 test")
+    manifest = Manifest(file_sha256(pdf), {"chunk_size": 1200}, "ng12", committed=64, last_chunk_id="ng12_p3_c1")
+    path = tmp_path / "chroma" / "ng12.ingest.json"
+    manifest.save(path)
+
+    loaded = Manifest.load(path)
+    assert loaded == manifest
+    assert loaded.same_input(Manifest(file_sha256(pdf), {"chunk_size": 1200}, "ng12"))
+    pdf.write_bytes(b"%PDF-1.4 changed")
+    assert not loaded.same_input(Manifest(file_sha256(pdf), {"chunk_size": 1200}, "ng12"))
+    assert Manifest.load(tmp_path / "missing.json") is None
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+from google.api_core import exceptions as api_exceptions
+
+from ingestion import ingest_ng12
+from ingestion.ingest_ng12 import batched, embed_batch, embed_stream
+
+
+class _Embedding:
+    def __init__(self, text):
+        self.values = [float(len(text))]
+
+
+class _Model:
+    def __init__(self, delay_s=0.0, fail_first=0, error=api_exceptions.ResourceExhausted):
+        self.delay_s = delay_s
+        self.fail_first = fail_first
+        self.error = error
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_embeddings(self, texts):
+        with self._lock:
+            self.calls.append(list(texts))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            should_fail = len(self.calls) <= self.fail_first
+        try:
+            time.sleep(self.delay_s)
+            if should_fail:
+                raise self.error("quota")
+            return [_Embedding(t) for t in texts]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_batches_preserve_document_order():
+    docs = [f"doc{'x' * i}" for i in range(10)]
+    model = _Model(delay_s=0.01)
+    results = list(embed_stream(model, batched(docs, 3), workers=3))
+    assert [doc for batch, _ in results for doc in batch] == docs
+    assert [e for _, embeds in results for e in embeds] == [[float(len(d))] for d in docs]
+    assert sorted(len(c) for c in model.calls) == [1, 3, 3, 3]
+
+
+def test_concurrency_is_bounded():
+    model = _Model(delay_s=0.05)
+    list(embed_stream(model, batched(["d"] * 20, 2), workers=3))
+    assert model.max_in_flight <= 3
+    assert len(model.calls) == 10
+
+
+def test_rate_limit_is_retried(monkeypatch):
+    monkeypatch.setattr(ingest_ng12.time, "sleep", lambda s: None)
+    model = _Model(fail_first=2)
+    assert embed_batch(model, ["a", "bb"], max_retries=3, backoff_s=0.01) == [[1.0], [2.0]]
+    assert len(model.calls) == 3
+
+
+def test_non_retryable_error_aborts(monkeypatch):
+    monkeypatch.setattr(ingest_ng12.time, "sleep", lambda s: None)
+    model = _Model(fail_first=1, error=api_exceptions.InvalidArgument)
+    with pytest.raises(api_exceptions.InvalidArgument):
+        embed_batch(model, ["a"], max_retries=3, backoff_s=0.01)
+
+
+def test_batches_are_pulled_only_while_capacity_allows():
+    pulled = []
+
+    def _batches():
+        for i in range(10):
+            pulled.append(i)
+            yield [f"d{i}"]
+
+    stream = embed_stream(_Model(delay_s=0.01), _batches(), workers=2, max_pending=3)
+    next(stream)
+    assert len(pulled) <= 4
+    assert len(list(stream)) == 9
@@ -0,0 +1,69 @@
+import uuid
+
+import chromadb
+
+from ingestion.ingest_ng12 import content_hash, existing_hashes, ingest
+
+PARAMS = {"chunk_size": 1200, "overlap": 200, "embedding_model": "text-embedding-004"}
+
+
+def test_hash_covers_text_and_parameters():
+    base = content_hash("Refer urgently.", PARAMS)
+    assert base == content_hash("Refer urgently.", dict(PARAMS))
+    assert base != content_hash("Refer urgently!", PARAMS)
+    assert base != content_hash("Refer urgently.", {**PARAMS, "overlap": 100})
+
+
+class _Embedding:
+    def __init__(self, text):
+        self.values = [float(len(text)), 1.0]
+
+
+class _Model:
+    def __init__(self):
+        self.embedded = []
+
+    def get_embeddings(self, texts):
+        self.embedded.extend(texts)
+        return [_Embedding(t) for t in texts]
+
+
+def _records(texts):
+    for i, text in enumerate(texts):
+        chunk_id = f"ng12_p1_c{i}"
+        yield chunk_id, text, {"chunk_id": chunk_id, "content_hash": content_hash(text, PARAMS)}
+
+
+def _ingest(collection, texts, force=False):
+    model = _Model()
+    stats = ingest(collection, _records(texts), model, 2, 1, 10, force=force, progress=None)
+    return stats, model.embedded
+
+
+def test_rerun_only_embeds_new_or_changed_chunks():
+    collection = chromadb.EphemeralClient().get_or_create_collection(f"ng12_{uuid.uuid4().hex}")
+    _ingest(collection, ["a", "b", "gone"])
+    stats, embedded = _ingest(collection, ["a", "changed"])
+    assert embedded == ["changed"]
+    assert (stats["unchanged"], stats["updated"], stats["added"], stats["deleted"]) == (1, 1, 0, 1)
+    assert sorted(collection.get()["ids"]) == ["ng12_p1_c0", "ng12_p1_c1"]
+
+
+def test_force_reembeds_every_chunk():
+    collection = chromadb.EphemeralClient().get_or_create_collection(f"ng12_{uuid.uuid4().hex}")
+    _ingest(collection, ["a"])
+    stats, embedded = _ingest(collection, ["a"], force=True)
+    assert embedded == ["a"]
+    assert (stats["updated"], stats["deleted"]) == (1, 0)
+
+
+def test_existing_hashes_reads_collection_metadata():
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection(f"ng12_{uuid.uuid4().hex}")
+    collection.upsert(
+        ids=["ng12_p1_c0", "legacy"],
+        documents=["x", "y"],
+        metadatas=[{"chunk_id": "ng12_p1_c0", "content_hash": "abc"}, {"chunk_id": "legacy"}],
+        embeddings=[[0.1, 0.2], [0.3, 0.4]],
+    )
+    assert existing_hashes(collection) == {"ng12_p1_c0": "abc", "legacy": ""}
@@ -0,0 +1,91 @@
+import threading
+import uuid
+from pathlib import Path
+
+import chromadb
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+from ingestion.ingest_ng12 import extract_pages, ingest
+
+PDF = Path(__file__).resolve().parents[2] / "data" / "ng12.pdf"
+
+
+class _Embedding:
+    def __init__(self, text):
+        self.values = [float(len(text)), 1.0]
+
+
+class _Model:
+    def __init__(self, produced=None):
+        self.produced = produced
+        self.embedded = 0
+        self.ahead = []
+        self._lock = threading.Lock()
+
+    def get_embeddings(self, texts):
+        if self.produced is not None:
+            with self._lock:
+                self.ahead.append(self.produced[0] - self.embedded)
+                self.embedded += len(texts)
+        return [_Embedding(t) for t in texts]
+
+
+def _records(n, produced=None, text="chunk"):
+    for i in range(n):
+        if produced is not None:
+            produced[0] += 1
+        chunk_id = f"ng12_p1_c{i}"
+        yield chunk_id, f"{text} {i}", {"source": "NG12 PDF", "page": 1, "chunk_id": chunk_id, "content_hash": text}
+
+
+def _collection():
+    return chromadb.EphemeralClient().get_or_create_collection(f"ng12_{uuid.uuid4().hex}")
+
+
+def test_pooled_extraction_matches_serial(tmp_path):
+    writer = PdfWriter()
+    for page in PdfReader(str(PDF)).pages[:4]:
+        writer.add_page(page)
+    path = tmp_path / "part.pdf"
+    with path.open("wb") as fh:
+        writer.write(fh)
+
+    serial = list(extract_pages(path, workers=1))
+    assert [p for p, _ in serial] == [1, 2, 3, 4]
+    assert list(extract_pages(path, workers=2, max_pending=1)) == serial
+
+
+def test_records_are_pulled_lazily():
+    produced = [0]
+    model = _Model(produced)
+    stats = ingest(
+        _collection(), _records(200, produced), model, batch_size=5, workers=2, write_batch=20, progress=None
+    )
+    assert stats["added"] == 200
+    # At most workers * 2 batches are in flight, plus the one being assembled.
+    assert max(model.ahead) <= 5 * 5
+
+
+def test_writes_are_batched_and_incremental():
+    collection = _collection()
+    upserts = []
+    original = collection.upsert
+    collection.upsert = lambda **kw: (upserts.append(len(kw["ids"])), original(**kw))
+
+    first = ingest(collection, _records(25), _Model(), batch_size=4, workers=2, write_batch=10, progress=None)
+    assert first["added"] == 25
+    assert max(upserts) <= 13 and sum(upserts) == 25
+
+    second = ingest(collection, _records(20), _Model(), batch_size=4, workers=2, write_batch=10, progress=None)
+    assert second["unchanged"] == 20
+    assert second["deleted"] == 5
+    assert collection.count() == 20
+
+
+def test_empty_extraction_keeps_collection():
+    collection = _collection()
+    ingest(collection, _records(3), _Model(), batch_size=2, workers=1, write_batch=10, progress=None)
+    with pytest.raises(SystemExit):
+        ingest(collection, _records(0), _Model(), batch_size=2, workers=1, write_batch=10, progress=None)
+    assert collection.count() == 3
@@ -1,3 +1,5 @@
+import pytest
+
 from app.memory import trim_history
 
 
@@ -20,3 +22,80 @@ def test_trim_history_truncates():
         {"role": "user", "content": "c"},
     ]
     assert trim_history(history, 2) == history[-2:]
+
+
+def test_session_compacts_old_turns_into_summary():
+    from app.memory import Session
+
+    session = Session("s1")
+    for i in range(10):
+        session.add("user", f"Question {i}. With more detail here.", max_turns=4, budget_tokens=600)
+    assert [t["content"] for t in session.turns] == [f"Question {i}. With more detail here." for i in range(6, 10)]
+    assert session.summary == [f"user: Question {i}." for i in range(6)]
+    assert "Earlier turns (summarised):\n- user: Question 0." in session.render()
+
+
+def test_session_stays_within_token_budget():
+    from app.context import estimate_tokens
+    from app.memory import Session
+
+    session = Session("s1")
+    for i in range(200):
+        session.add("user", f"Turn {i} " + "x" * 3000, max_turns=6, budget_tokens=300)
+        assert estimate_tokens(session.render()) <= 300 + 10
+    assert len(session.turns) == 1
+    assert session.summary[-1].startswith("user: Turn 198")
+
+
+def test_memory_store_evicts_and_expires():
+    from app.memory import InMemorySessionStore, Session
+
+    now = [0.0]
+    store = InMemorySessionStore(max_items=2, ttl_s=60, clock=lambda: now[0])
+    for sid in ("a", "b", "c"):
+        store.save(Session(sid))
+    assert store.get("a") is None
+    assert store.get("b") is not None
+    now[0] = 61.0
+    assert store.get("c") is None
+    assert store.stats() == {"size": 1, "evictions": 1, "expirations": 1}
+
+
+def test_memory_store_returns_copies():
+    from app.memory import InMemorySessionStore, Session
+
+    store = InMemorySessionStore()
+    store.save(Session("a"))
+    store.get("a").add("user", "unsaved", max_turns=4, budget_tokens=600)
+    assert store.get("a").turns == []
+
+
+def test_sqlite_store_round_trip_and_bounds(tmp_path):
+    from app.memory import Session, SqliteSessionStore
+
+    now = [0.0]
+    store = SqliteSessionStore(tmp_path / "sessions.sqlite", max_items=2, ttl_s=60, clock=lambda: now[0])
+    session = Session("a")
+    session.add("user", "Visible haematuria?", max_turns=4, budget_tokens=600)
+    store.save(session)
+    assert store.get("a").turns == session.turns
+
+    for sid in ("b", "c"):
+        now[0] += 1
+        store.save(Session(sid))
+    assert store.get("a") is None
+    now[0] += 61
+    assert store.get("c") is None
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_concurrent_turns_on_one_session_are_merged(tmp_path, backend):
+    from app.memory import InMemorySessionStore, Session, SqliteSessionStore
+
+    store = InMemorySessionStore() if backend == "memory" else SqliteSessionStore(tmp_path / "s.sqlite")
+    store.save(Session("a"))
+    # Both requests loaded the session before either finished its turn.
+    first, second = store.get("a"), store.get("a")
+    for session, question in ((first, "Visible haematuria?"), (second, "Breast lump?")):
+        store.update(session, lambda current, q=question: current.add("user", q, max_turns=8, budget_tokens=600))
+    assert [t["content"] for t in store.get("a").turns] == ["Visible haematuria?", "Breast lump?"]
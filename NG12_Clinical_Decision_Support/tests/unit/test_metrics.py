@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from app import agent
+from app.metrics import BREAKER_TRANSITIONS, STAGE_LATENCY, Counter, Histogram, Registry, current_endpoint
+from app.resilience import CircuitBreaker, ResponseCache
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = Histogram("lat_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    hist.observe(0.05, stage="embed")
+    hist.observe(0.5, stage="embed")
+    hist.observe(3.0, stage="embed")
+    lines = hist.render()
+    assert 'lat_seconds_bucket{stage="embed",le="0.1"} 1' in lines
+    assert 'lat_seconds_bucket{stage="embed",le="1"} 2' in lines
+    assert 'lat_seconds_bucket{stage="embed",le="+Inf"} 3' in lines
+    assert 'lat_seconds_count{stage="embed"} 3' in lines
+    assert 'lat_seconds_sum{stage="embed"} 3.55' in lines
+
+
+def test_registry_renders_counters_and_callbacks():
+    registry = Registry()
+    counter = registry.counter("retries_total", "Retries", ("operation",))
+    counter.inc(operation="generation")
+    counter.inc(operation="generation")
+    registry.register_callback("cache_total", "counter", "Cache", lambda: [({"event": "hits"}, 4)])
+    text = registry.render()
+    assert "# TYPE retries_total counter" in text
+    assert 'retries_total{operation="generation"} 2' in text
+    assert 'cache_total{event="hits"} 4' in text
+    assert Counter("x", "x").render() == ["# HELP x x", "# TYPE x counter"]
+
+
+def test_generation_records_stage_latency_per_endpoint(monkeypatch, mock_chunks, mock_urgent_output):
+    monkeypatch.setattr(agent, "_breaker", CircuitBreaker())
+    monkeypatch.setattr(agent, "_cache", ResponseCache(max_items=10, ttl_s=60))
+
+    async def _call(prompt):
+        return json.dumps(mock_urgent_output)
+
+    monkeypatch.setattr(agent, "_call_gemini", _call)
+    before = {s: STAGE_LATENCY.count(endpoint="/unit", stage=s) for s in ("generate", "parse", "validate")}
+
+    async def _run():
+        current_endpoint.set("/unit")
+        return await agent.generate_assessment("stage metrics question", mock_chunks)
+
+    asyncio.run(_run())
+    for stage, count in before.items():
+        assert STAGE_LATENCY.count(endpoint="/unit", stage=stage) == count + 1
+
+
+def test_breaker_counts_state_changes_once():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_after_s=30, name="unit", clock=lambda: now[0])
+    before = {s: BREAKER_TRANSITIONS.value(breaker="unit", state=s) for s in ("open", "half_open", "closed")}
+    for _ in range(4):
+        breaker.record_failure()
+    now[0] = 31.0
+    assert breaker.allow()
+    breaker.record_success()
+    breaker.record_success()
+    after = {s: BREAKER_TRANSITIONS.value(breaker="unit", state=s) for s in before}
+    assert after == {s: v + 1 for s, v in before.items()}
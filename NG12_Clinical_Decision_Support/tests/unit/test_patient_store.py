@@ -0,0 +1,79 @@
+import json
+import os
+
+from app.patient_store import JsonPatientRepository, SqlitePatientRepository, build_patient_index
+
+
+def _write(path, patients):
+    path.write_text(json.dumps(patients), encoding="utf-8")
+
+
+def test_json_repository_parses_once(tmp_path):
+    path = tmp_path / "patients.json"
+    _write(path, [{"patient_id": "p1", "symptoms": ["cough"]}])
+    repo = JsonPatientRepository(path)
+    for _ in range(5):
+        assert repo.get("p1")["symptoms"] == ["cough"]
+    assert repo.loads == 1
+
+
+def test_json_repository_reloads_on_mtime_change(tmp_path):
+    path = tmp_path / "patients.json"
+    _write(path, [{"patient_id": "p1", "symptoms": ["cough"]}])
+    repo = JsonPatientRepository(path)
+    assert repo.get("p2") == {}
+    _write(path, [{"patient_id": "p2", "symptoms": ["fatigue"]}])
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert repo.get("p2")["symptoms"] == ["fatigue"]
+    assert repo.loads == 2
+
+
+def test_json_repository_missing_file(tmp_path):
+    assert JsonPatientRepository(tmp_path / "missing.json").get("p1") == {}
+
+
+def test_sqlite_index_lookup_and_rebuild(tmp_path):
+    json_path = tmp_path / "patients.json"
+    db_path = tmp_path / "patients.sqlite"
+    _write(json_path, [{"patient_id": "p1", "symptoms": ["cough"], "age": 50}, {"symptoms": ["x"]}])
+    assert build_patient_index(json_path, db_path) == 1
+
+    repo = SqlitePatientRepository(db_path)
+    assert repo.get("p1") == {"patient_id": "p1", "symptoms": ["cough"], "age": 50}
+    assert repo.get("missing") == {}
+
+    _write(json_path, [{"patient_id": "p2", "symptoms": ["fatigue"]}])
+    build_patient_index(json_path, db_path)
+    assert repo.get("p2")["symptoms"] == ["fatigue"]
+    assert repo.get("p1") == {}
+
+
+def test_sqlite_repository_missing_db(tmp_path):
+    assert SqlitePatientRepository(tmp_path / "missing.sqlite").get("p1") == {}
+
+
+def test_get_patient_uses_sqlite_backend(monkeypatch, tmp_path):
+    from app import tools
+
+    json_path = tmp_path / "patients.json"
+    db_path = tmp_path / "patients.sqlite"
+    _write(json_path, [{"patient_id": "p9", "symptoms": ["hoarseness"]}])
+    build_patient_index(json_path, db_path)
+    monkeypatch.setattr(tools.settings, "patient_store", "sqlite")
+    monkeypatch.setattr(tools.settings, "patient_db_path", str(db_path))
+    assert tools.get_patient("p9")["symptoms"] == ["hoarseness"]
+
+
+def test_sqlite_batch_lookup(tmp_path):
+    json_path = tmp_path / "patients.json"
+    db_path = tmp_path / "patients.sqlite"
+    _write(json_path, [{"patient_id": f"p{i}", "symptoms": [f"s{i}"]} for i in range(1200)])
+    build_patient_index(json_path, db_path)
+
+    repo = SqlitePatientRepository(db_path)
+    ids = [f"p{i}" for i in range(0, 1200, 2)] + ["missing", "p0"]
+    found = repo.get_many(ids)
+    assert len(found) == 600
+    assert found["p1198"]["symptoms"] == ["s1198"]
+    assert SqlitePatientRepository(tmp_path / "missing.sqlite").get_many(["p1"]) == {}
@@ -0,0 +1,87 @@
+import threading
+
+from app.resilience import ResponseCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_refreshes_lru_order():
+    cache = ResponseCache(max_items=2, ttl_s=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entries_are_purged_without_being_read():
+    clock = _Clock()
+    cache = ResponseCache(max_items=10, ttl_s=60, clock=clock)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    clock.now = 61
+    cache.set("c", "3")
+    stats = cache.stats()
+    assert stats["size"] == 1
+    assert stats["expirations"] == 2
+
+
+def test_overwrite_restarts_ttl():
+    clock = _Clock()
+    cache = ResponseCache(max_items=10, ttl_s=60, clock=clock)
+    cache.set("a", "1")
+    clock.now = 50
+    cache.set("a", "2")
+    clock.now = 100
+    assert cache.get("a") == "2"
+
+
+def test_byte_budget_evicts_lru():
+    cache = ResponseCache(max_items=10, ttl_s=60, max_bytes=10)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.set("c", "cccc")
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 8
+
+
+def test_oversized_value_is_not_cached():
+    cache = ResponseCache(max_items=10, ttl_s=60, max_bytes=4)
+    cache.set("a", "too large")
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_hit_and_miss_counters():
+    cache = ResponseCache(max_items=10, ttl_s=60)
+    cache.set("a", "1")
+    cache.get("a")
+    cache.get("missing")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_concurrent_writers_respect_capacity():
+    cache = ResponseCache(max_items=50, ttl_s=60, max_bytes=1000)
+
+    def _writer(n):
+        for i in range(500):
+            cache.set(f"{n}-{i}", "x" * 10)
+            cache.get(f"{n}-{i // 2}")
+
+    threads = [threading.Thread(target=_writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = cache.stats()
+    assert stats["size"] <= 50
+    assert stats["bytes"] == stats["size"] * 10
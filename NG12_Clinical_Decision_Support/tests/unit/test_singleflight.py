@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+
+from app import agent
+from app.resilience import CircuitBreaker, ResponseCache, SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = {"n": 0}
+
+    async def _work():
+        calls["n"] += 1
+        await asyncio.sleep(0.02)
+        return "result"
+
+    async def _run():
+        return await asyncio.gather(*[flight.do("k", _work) for _ in range(10)])
+
+    assert asyncio.run(_run()) == ["result"] * 10
+    assert calls["n"] == 1
+    assert flight.stats() == {"calls": 1, "coalesced": 9, "in_flight": 0}
+
+
+def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight()
+    calls = {"n": 0}
+
+    async def _fail():
+        calls["n"] += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("vertex down")
+
+    async def _run():
+        return await asyncio.gather(*[flight.do("k", _fail) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(_run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    with pytest.raises(RuntimeError):
+        asyncio.run(flight.do("k", _fail))
+    assert calls["n"] == 2
+
+
+def test_cancelled_leader_does_not_fail_followers():
+    flight = SingleFlight()
+
+    async def _work():
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def _run():
+        leader = asyncio.ensure_future(flight.do("k", _work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", _work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(_run()) == 42
+
+
+def test_burst_of_identical_assessments_calls_gemini_once(monkeypatch, mock_chunks, mock_urgent_output):
+    monkeypatch.setattr(agent, "_breaker", CircuitBreaker())
+    monkeypatch.setattr(agent, "_cache", ResponseCache(max_items=10, ttl_s=60))
+    monkeypatch.setattr(agent, "_inflight", SingleFlight())
+    calls = {"n": 0}
+
+    async def _gemini(prompt):
+        calls["n"] += 1
+        await asyncio.sleep(0.05)
+        return json.dumps(mock_urgent_output)
+
+    monkeypatch.setattr(agent, "_call_gemini", _gemini)
+
+    async def _run():
+        return await asyncio.gather(*[agent.generate_assessment("same question", mock_chunks) for _ in range(8)])
+
+    results = asyncio.run(_run())
+    assert calls["n"] == 1
+    assert all(output.assessment == "Urgent Referral" for output, _ in results)
+    assert agent.generation_stats()["singleflight"]["coalesced"] == 7
+
+
+def test_different_prompts_sharing_a_cache_key_are_not_coalesced(monkeypatch, mock_chunks, mock_urgent_output):
+    monkeypatch.setattr(agent, "_breaker", CircuitBreaker())
+    monkeypatch.setattr(agent, "_cache", ResponseCache(max_items=10, ttl_s=60))
+    monkeypatch.setattr(agent, "_inflight", SingleFlight())
+    prompts = []
+
+    async def _gemini(prompt):
+        prompts.append(prompt)
+        await asyncio.sleep(0.05)
+        return json.dumps(mock_urgent_output)
+
+    monkeypatch.setattr(agent, "_call_gemini", _gemini)
+
+    async def _run():
+        return await asyncio.gather(
+            agent.generate_assessment("user: haematuria\n\nUser question: under 40?", mock_chunks, cache_key="k"),
+            agent.generate_assessment("user: breast lump\n\nUser question: under 40?", mock_chunks, cache_key="k"),
+        )
+
+    asyncio.run(_run())
+    assert len(prompts) == 2
+    assert "haematuria" in prompts[0] + prompts[1] and "breast lump" in prompts[0] + prompts[1]
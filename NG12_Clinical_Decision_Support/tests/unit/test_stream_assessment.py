@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+from app import agent
+from app.agent import ReasoningExtractor
+from app.resilience import CircuitBreaker, ResponseCache
+
+
+def test_extractor_decodes_reasoning_across_fragments():
+    raw = json.dumps({"assessment": "Urgent Referral", "reasoning": 'Says "refer"\nnow é', "citations": []})
+    extractor = ReasoningExtractor()
+    out = "".join(extractor.feed(raw[i:i + 4]) for i in range(0, len(raw), 4))
+    assert out == 'Says "refer"\nnow é'
+
+
+def test_extractor_ignores_text_after_reasoning():
+    extractor = ReasoningExtractor()
+    assert extractor.feed('{"reasoning": "ab", "confidence": "x"}') == "ab"
+    assert extractor.feed('"more"') == ""
+
+
+def test_stream_yields_tokens_and_validated_final(monkeypatch, mock_chunks, mock_urgent_output):
+    monkeypatch.setattr(agent, "_breaker", CircuitBreaker())
+    monkeypatch.setattr(agent, "_cache", ResponseCache(max_items=10, ttl_s=60))
+    raw = json.dumps(mock_urgent_output)
+
+    async def _stream(prompt):
+        for i in range(0, len(raw), 7):
+            yield raw[i:i + 7]
+
+    monkeypatch.setattr(agent, "_stream_gemini", _stream)
+
+    async def _collect():
+        return [item async for item in agent.stream_assessment("q", mock_chunks)]
+
+    items = asyncio.run(_collect())
+    assert "".join(p for kind, p in items if kind == "token") == mock_urgent_output["reasoning"]
+    kind, (output, meta) = items[-1]
+    assert kind == "final"
+    assert output.assessment == "Urgent Referral"
+    assert meta == {}
+
+
+def test_stream_rejects_unsupported_citation(monkeypatch, mock_chunks, mock_urgent_output):
+    monkeypatch.setattr(agent, "_breaker", CircuitBreaker())
+    monkeypatch.setattr(agent, "_cache", ResponseCache(max_items=10, ttl_s=60))
+    bad = dict(mock_urgent_output, citations=[dict(mock_urgent_output["citations"][0], excerpt="invented")])
+
+    async def _stream(prompt):
+        yield json.dumps(bad)
+
+    monkeypatch.setattr(agent, "_stream_gemini", _stream)
+
+    async def _collect():
+        return [item async for item in agent.stream_assessment("q", mock_chunks)]
+
+    _, (output, _) = asyncio.run(_collect())[-1]
+    assert output.assessment == "Insufficient Evidence"
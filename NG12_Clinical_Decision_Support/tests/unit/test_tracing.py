@@ -0,0 +1,104 @@
+import asyncio
+import json
+import threading
+from dataclasses import asdict
+
+from app.tracing import JsonLinesExporter, span, start_trace
+
+
+def test_spans_nest_and_carry_trace_id():
+    with start_trace("cid-1") as trace:
+        with span("outer"):
+            with span("inner", attempt=1):
+                pass
+    inner, outer = trace.spans
+    assert {s.trace_id for s in trace.spans} == {"cid-1"}
+    assert inner.parent_id == outer.span_id
+    assert outer.parent_id is None
+    assert inner.attributes == {"attempt": 1}
+
+
+def test_span_is_noop_without_trace():
+    with span("orphan") as current:
+        assert current is None
+
+
+def test_span_records_errors():
+    with start_trace("cid-2") as trace:
+        try:
+            with span("generate"):
+                raise TimeoutError()
+        except TimeoutError:
+            pass
+    assert trace.spans[0].attributes["error"] == "TimeoutError"
+
+
+def test_spans_from_tasks_join_request_trace():
+    async def _child(name):
+        with span(name):
+            await asyncio.sleep(0)
+
+    async def _run():
+        with start_trace("cid-3") as trace:
+            with span("batch"):
+                await asyncio.gather(_child("a"), _child("b"))
+        return trace
+
+    trace = asyncio.run(_run())
+    parent = next(s for s in trace.spans if s.name == "batch")
+    assert {s.parent_id for s in trace.spans if s.name in {"a", "b"}} == {parent.span_id}
+
+
+def test_server_timing_sums_repeated_spans():
+    with start_trace("cid-4") as trace:
+        for _ in range(2):
+            with span("generate"):
+                pass
+    header = trace.server_timing()
+    assert header.startswith("generate;dur=")
+    assert header.count("generate") == 1
+    assert "total;dur=" in header
+
+
+def test_jsonl_exporter_appends_lines(tmp_path):
+    with start_trace("cid-5") as trace:
+        with span("embed"):
+            pass
+    exporter = JsonLinesExporter(tmp_path / "traces" / "spans.jsonl")
+    exporter.export(trace.spans)
+    exporter.export(trace.spans)
+    assert exporter.flush(timeout=5)
+    lines = (tmp_path / "traces" / "spans.jsonl").read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])["trace_id"] == "cid-5"
+
+
+def test_jsonl_exporter_rotates_at_max_bytes(tmp_path):
+    with start_trace("cid-6") as trace:
+        with span("embed"):
+            pass
+    path = tmp_path / "spans.jsonl"
+    line = len(json.dumps(asdict(trace.spans[0]))) + 1
+    exporter = JsonLinesExporter(path, max_bytes=line * 2, backups=2)
+    for _ in range(7):
+        exporter.export(trace.spans)
+    assert exporter.flush(timeout=5)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["spans.jsonl", "spans.jsonl.1", "spans.jsonl.2"]
+    assert all(p.stat().st_size <= line * 2 for p in tmp_path.iterdir())
+    assert exporter.stats()["written"] == 7
+
+
+def test_jsonl_exporter_drops_when_queue_is_full(tmp_path, monkeypatch):
+    with start_trace("cid-7") as trace:
+        with span("embed"):
+            pass
+    exporter = JsonLinesExporter(tmp_path / "spans.jsonl", queue_size=2)
+    release = threading.Event()
+    original = exporter._write
+    monkeypatch.setattr(exporter, "_write", lambda lines: (release.wait(5), original(lines)))
+    for _ in range(5):
+        exporter.export(trace.spans)
+    assert exporter.stats()["dropped"] >= 2
+    release.set()
+    assert exporter.flush(timeout=5)
+    assert exporter.stats()["written"] + exporter.stats()["dropped"] == 5
@@ -0,0 +1,119 @@
+import threading
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+
+from app.vector_index import NumpyVectorIndex, collection_fingerprint
+
+
+def _collection(vectors):
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection(f"idx_{uuid.uuid4().hex}")
+    ids = [f"ng12_p1_c{i}" for i in range(len(vectors))]
+    collection.add(
+        ids=ids,
+        documents=[f"doc {i}" for i in ids],
+        metadatas=[{"chunk_id": i, "content_hash": f"h{i}"} for i in ids],
+        embeddings=vectors.tolist(),
+    )
+    return collection
+
+
+def test_matches_chroma_results(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((40, 16)).astype(np.float32)
+    collection = _collection(vectors)
+    NumpyVectorIndex.export_from_collection(collection, tmp_path / "index")
+    index = NumpyVectorIndex.load(tmp_path / "index")
+
+    query = rng.standard_normal(16).astype(np.float32).tolist()
+    expected = collection.query(query_embeddings=[query], n_results=5, include=["distances"])
+    actual = index.query([query], n_results=5)
+    assert actual["ids"] == expected["ids"]
+    assert actual["distances"][0] == pytest.approx(expected["distances"][0], rel=1e-3)
+    assert isinstance(index.matrix, np.memmap)
+
+
+def test_batched_search_equals_single_queries():
+    rng = np.random.default_rng(2)
+    matrix = rng.standard_normal((30, 8)).astype(np.float32)
+    index = NumpyVectorIndex([str(i) for i in range(30)], [""] * 30, [{}] * 30, matrix, space="cosine")
+    queries = rng.standard_normal((4, 8)).astype(np.float32)
+    batch = index.search(queries, 3)
+    single = [index.search(q, 3)[0] for q in queries]
+    assert [[i for i, _ in row] for row in batch] == [[i for i, _ in row] for row in single]
+    assert [d for row in batch for _, d in row] == pytest.approx([d for row in single for _, d in row], abs=1e-5)
+
+
+def test_top_k_larger_than_corpus():
+    matrix = np.eye(3, dtype=np.float32)
+    index = NumpyVectorIndex(["a", "b", "c"], ["", "", ""], [{}, {}, {}], matrix, space="ip")
+    result = index.query([[0.0, 1.0, 0.0]], n_results=10)
+    assert result["ids"][0][0] == "b"
+    assert len(result["ids"][0]) == 3
+
+
+def test_fingerprint_tracks_content_hashes():
+    a = collection_fingerprint(["x", "y"], [{"content_hash": "1"}, {"content_hash": "2"}])
+    assert a == collection_fingerprint(["y", "x"], [{"content_hash": "2"}, {"content_hash": "1"}])
+    assert a != collection_fingerprint(["x", "y"], [{"content_hash": "1"}, {"content_hash": "3"}])
+
+
+def test_export_replaces_index_atomically(tmp_path, monkeypatch):
+    path = tmp_path / "index"
+    NumpyVectorIndex.export_from_collection(_collection(np.eye(3, dtype=np.float32)), path)
+    NumpyVectorIndex.export_from_collection(_collection(np.eye(4, dtype=np.float32)), path)
+    assert len(NumpyVectorIndex.load(path)) == 4
+    # The live version plus the one before it, for readers mid-load.
+    versions = sorted(p.name for p in tmp_path.glob(".index.v-*"))
+    assert len(versions) == 2 and path.resolve().name in versions
+
+    def _fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "save", _fail)
+    with pytest.raises(OSError):
+        NumpyVectorIndex.export_from_collection(_collection(np.eye(5, dtype=np.float32)), path)
+    assert len(NumpyVectorIndex.load(path)) == 4
+    assert sorted(p.name for p in tmp_path.glob(".index.v-*")) == versions
+
+
+def test_concurrent_exports_and_loads(tmp_path):
+    path = tmp_path / "index"
+    collections = [_collection(np.eye(n, dtype=np.float32)) for n in range(2, 6)]
+    NumpyVectorIndex.export_from_collection(collections[0], path)
+    errors = []
+
+    def _export(collection):
+        try:
+            for _ in range(5):
+                NumpyVectorIndex.export_from_collection(collection, path)
+        except Exception as exc:
+            errors.append(exc)
+
+    def _load():
+        try:
+            for _ in range(50):
+                index = NumpyVectorIndex.load(path)
+                assert index.matrix.shape[0] == len(index.ids)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=_export, args=(c,)) for c in collections]
+    threads += [threading.Thread(target=_load) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_legacy_directory_is_replaced(tmp_path):
+    path = tmp_path / "index"
+    path.mkdir()
+    (path / "embeddings.npy").write_bytes(b"stale")
+    NumpyVectorIndex.export_from_collection(_collection(np.eye(3, dtype=np.float32)), path)
+    assert path.is_symlink()
+    assert len(NumpyVectorIndex.load(path)) == 3